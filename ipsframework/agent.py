@@ -0,0 +1,260 @@
+# -------------------------------------------------------------------------------
+# Copyright 2006-2022 UT-Battelle, LLC. See LICENSE for more information.
+# -------------------------------------------------------------------------------
+"""
+Node-local task launch agents of the pilot mode, ``MPIRUN = agent``.
+
+The framework starts one agent per node with ``python -m ipsframework.agent``
+at the beginning of the simulation.  The components send the command of
+each task to the agent of the first node of its allocation, instead of
+starting a parallel launcher per task, and the agent reports the exit
+status of the task back on the same connection.
+"""
+import argparse
+import os
+import shlex
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+from multiprocessing.connection import Client, Listener
+
+#: environment variable holding the key authenticating the connections to the agents
+AUTHKEY_ENV = 'IPS_AGENT_AUTHKEY'
+
+
+class TaskAgent:
+    """
+    Launch the tasks received on the connections accepted by *listener*,
+    and send back their exit status.  A single thread reaps all the child
+    processes.
+    """
+
+    def __init__(self, listener):
+        self.listener = listener
+        self.lock = threading.Condition()
+        self.children = {}  # pid -> (process, connection, send lock, task_id, tasks of the connection)
+
+    def serve_forever(self):
+        """
+        Accept connections until the agent is terminated.
+        """
+        threading.Thread(target=self._reap_children, daemon=True).start()
+        while True:
+            try:
+                connection = self.listener.accept()
+            except Exception as e:
+                print(f'IPS agent: rejected connection: {e}', file=sys.stderr)
+                continue
+            threading.Thread(target=self._serve_connection, args=(connection,), daemon=True).start()
+
+    def _serve_connection(self, connection):
+        send_lock = threading.Lock()
+        tasks = {}  # task_id -> pid
+        while True:
+            try:
+                msg = connection.recv()
+            except (EOFError, OSError):
+                break
+            if msg[0] == 'launch':
+                self._launch(connection, send_lock, tasks, *msg[1:])
+            elif msg[0] == 'kill':
+                _, task_id, signum = msg
+                with self.lock:
+                    pid = tasks.get(task_id)
+                    if pid is not None:
+                        os.kill(pid, signum)
+        # the component is gone, so are its tasks
+        with self.lock:
+            for pid in tasks.values():
+                os.kill(pid, signal.SIGKILL)
+
+    def _launch(self, connection, send_lock, tasks, task_id, cmd_lst, working_dir, env_update, log_filename, err_filename):
+        env = None
+        if env_update:
+            env = os.environ.copy()
+            env.update(env_update)
+        task_stdout = None
+        task_stderr = subprocess.STDOUT
+        # the child is registered before the reaper can look for it
+        with self.lock:
+            try:
+                if log_filename:
+                    task_stdout = open(log_filename, 'w')
+                if err_filename:
+                    task_stderr = open(err_filename, 'w')
+                process = subprocess.Popen(cmd_lst, stdout=task_stdout, stderr=task_stderr, cwd=working_dir, env=env)
+            except OSError as e:
+                print(f'IPS agent: error executing command {" ".join(cmd_lst)} : {e}', file=sys.stderr)
+                self._send(connection, send_lock, ('exit', task_id, 127))
+                return
+            finally:
+                for f in (task_stdout, task_stderr):
+                    if hasattr(f, 'close'):
+                        f.close()
+            tasks[task_id] = process.pid
+            self.children[process.pid] = (process, connection, send_lock, task_id, tasks)
+            self.lock.notify()
+
+    def _reap_children(self):
+        while True:
+            with self.lock:
+                while not self.children:
+                    self.lock.wait()
+            pid, status = os.waitpid(-1, 0)
+            if os.WIFSIGNALED(status):
+                returncode = -os.WTERMSIG(status)
+            else:
+                returncode = os.WEXITSTATUS(status)
+            with self.lock:
+                try:
+                    process, connection, send_lock, task_id, tasks = self.children.pop(pid)
+                except KeyError:
+                    continue  # a child that failed to execute, already reported
+                # subprocess must not try to reap it again
+                process.returncode = returncode
+                del tasks[task_id]
+            self._send(connection, send_lock, ('exit', task_id, returncode))
+
+    @staticmethod
+    def _send(connection, send_lock, msg):
+        with send_lock:
+            try:
+                connection.send(msg)
+            except OSError:
+                pass  # the component is gone
+
+
+class AgentClient:
+    """
+    Connection of a component process to the agent listening at *address*.
+    """
+
+    def __init__(self, address, authkey):
+        self.connection = Client(tuple(address), authkey=authkey)
+        self.processes = {}  # task_id -> AgentProcess of the running tasks
+
+    def fileno(self):
+        return self.connection.fileno()
+
+    def launch(self, task_id, cmd_lst, working_dir, env_update=None, log_filename=None, err_filename=None):
+        """
+        Launch command *cmd_lst* of task *task_id* in *working_dir*.  The
+        output of the task is written to *log_filename* and *err_filename*,
+        or to the output of the agent.
+
+        :rtype: :class:`AgentProcess`
+        """
+        process = AgentProcess(self, task_id, cmd_lst)
+        self.processes[task_id] = process
+        self.connection.send(('launch', task_id, cmd_lst, working_dir, env_update, log_filename, err_filename))
+        return process
+
+    def receive(self, timeout=0.0):
+        """
+        Receive the exit status of the finished tasks, waiting up to
+        *timeout* seconds, or forever if ``None``, for the first one.
+        """
+        while self.connection.poll(timeout):
+            _, task_id, returncode = self.connection.recv()
+            process = self.processes.pop(task_id, None)
+            if process is not None:
+                process.returncode = returncode
+            timeout = 0.0
+
+
+class AgentProcess:
+    """
+    Task launched by an agent, with the methods of
+    :class:`subprocess.Popen` used by the services.
+    """
+
+    def __init__(self, client, task_id, args):
+        self.agent_client = client
+        self.task_id = task_id
+        self.args = args
+        self.pid = None
+        self.returncode = None
+
+    def poll(self):
+        if self.returncode is None:
+            self.agent_client.receive()
+        return self.returncode
+
+    def wait(self, timeout=None):
+        deadline = None if timeout is None else time.time() + timeout
+        while self.returncode is None:
+            remaining = None
+            if deadline is not None:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    raise subprocess.TimeoutExpired(self.args, timeout)
+            self.agent_client.receive(remaining)
+        return self.returncode
+
+    def send_signal(self, sig):
+        if self.returncode is None:
+            self.agent_client.connection.send(('kill', self.task_id, sig))
+
+    def terminate(self):
+        self.send_signal(signal.SIGTERM)
+
+    def kill(self):
+        self.send_signal(signal.SIGKILL)
+
+
+def start_agents(nodes, launcher='', authkey=None):
+    """
+    Start an agent on each of *nodes*.  The agents are started with
+    *launcher*, formatted with the name of the node, e.g. ``srun -N 1 -n 1
+    -w {node}``, or all on the local host if *launcher* is empty.  The
+    connections are authenticated with *authkey*, by default a new key.
+
+    :return: the agent processes, the address of the agent of each node and the authentication key
+    :rtype: tuple(list, dict, bytes)
+    """
+    if authkey is None:
+        authkey = os.urandom(16)
+    env = os.environ.copy()
+    env[AUTHKEY_ENV] = authkey.hex()
+    # the agents run the same ipsframework as the framework
+    package_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [package_dir, env.get('PYTHONPATH')]))
+    processes = []
+    for node in nodes:
+        cmd = [sys.executable, '-m', 'ipsframework.agent']
+        if launcher:
+            cmd = shlex.split(launcher.format(node=node)) + cmd
+        else:
+            cmd += ['--host', '127.0.0.1']
+        processes.append(subprocess.Popen(cmd, stdout=subprocess.PIPE, env=env, universal_newlines=True))
+    addresses = {}
+    for node, process in zip(nodes, processes):
+        line = process.stdout.readline()
+        process.stdout.close()
+        if not line:
+            raise RuntimeError(f'Failed to start the task launch agent of node {node}')
+        host, port = line.split()
+        addresses[node] = (host, int(port))
+    return processes, addresses, authkey
+
+
+def main(argv=None):
+    """
+    Run an agent, printing the address it listens at.
+    """
+    parser = argparse.ArgumentParser(description='IPS node-local task launch agent')
+    parser.add_argument('--host', default=socket.gethostname(),
+                        help='host name or address to listen at, default the host name')
+    args = parser.parse_args(argv)
+    listener = Listener((args.host, 0), authkey=bytes.fromhex(os.environ[AUTHKEY_ENV]))
+    print(*listener.address, flush=True)
+    # the output of the tasks without log file goes with that of the agent
+    os.dup2(2, 1)
+    TaskAgent(listener).serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -100,6 +100,9 @@ class Topic:
     def sendEvent(self, eventName, eventBody):
         _proxy.sendEvent(self.topicName, eventName, eventBody)
 
+    def sendEvents(self, eventName, eventBodies):
+        _proxy.sendEvents(self.topicName, eventName, eventBodies)
+
 
 class Subscription:
     def __init__(self, subscriberid, subscriptionName):
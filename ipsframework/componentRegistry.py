@@ -62,6 +62,13 @@ class ComponentID:
     def __eq__(self, other):
         return str(self) == str(other)
 
+    def __reduce__(self):
+        """
+        Pickle as the serialization, which is unpickled to the id already
+        known by the receiving process.
+        """
+        return (_intern_component_id, (self.get_serialization(),))
+
     def get_instance_name(self):
         """
         Return instance name of component id.
@@ -97,6 +104,24 @@ class ComponentID:
         return self.seq_num
 
 
+def _intern_component_id(serialization):
+    """
+    Return the component id of *serialization*, creating it if it is not
+    known by this process.
+    """
+    try:
+        return ComponentID.all_ids[serialization]
+    except KeyError:
+        pass
+    comp_id = ComponentID.__new__(ComponentID)
+    comp_id.sim_name, comp_id.class_name, seq_num = serialization.rsplit(ComponentID.delimiter, 2)
+    comp_id.seq_num = int(seq_num)
+    comp_id.serialization = serialization
+    comp_id.instance_name = serialization
+    ComponentID.all_ids[serialization] = comp_id
+    return comp_id
+
+
 class ComponentRegistry(metaclass=SingletonMeta):
 
     class RegistryEntry:
@@ -15,6 +15,8 @@ from configobj import ConfigObj
 from . import ipsLogging
 from .services import ServicesProxy
 from .componentRegistry import ComponentID, ComponentRegistry
+from .transport import TRANSPORTS, new_queue
+from .resourceManager import PLACEMENT_POLICIES
 
 # Try using fork for starting subprocesses, this is the default on
 # Linux but not macOS with python >= 3.8
@@ -83,6 +85,10 @@ class ConfigurationManager:
         self.sim_root_list = None
         self.log_file_list = None
         self.log_dynamic_sim_queue = Queue(0)
+        # seconds to wait for components to exit before terminating them,
+        # see COMPONENT_TERMINATE_TIMEOUT
+        self.terminate_timeout = 2.0
+        self.message_transport = 'queue'
 
         class Unbuffered:
             def __init__(self, stream):
@@ -214,6 +220,12 @@ class ConfigurationManager:
             self.fwk.exception("missing value or bad type for NODE_ALLOCATION_MODE.  expected 'EXCLUSIVE' or 'SHARED'.")
             raise
 
+        placement_policy = self.platform_conf.get('PLACEMENT_POLICY', 'FIRST_FIT').upper()
+        if placement_policy not in PLACEMENT_POLICIES:
+            self.fwk.error("bad value for PLACEMENT_POLICY. expected one of %s.", ', '.join(PLACEMENT_POLICIES))
+            raise ValueError(f"bad value for PLACEMENT_POLICY. expected one of {', '.join(PLACEMENT_POLICIES)}.")
+        self.platform_conf['PLACEMENT_POLICY'] = placement_policy
+
         uan_val = self.platform_conf.get('USE_ACCURATE_NODES', 'ON').upper()
         if uan_val in ['OFF', 'FALSE']:
             use_accurate_nodes = False
@@ -226,8 +238,20 @@ class ConfigurationManager:
         self.platform_conf['CORES_PER_NODE'] = int(self.platform_conf.get('CORES_PER_NODE', 0))
         self.platform_conf['SOCKETS_PER_NODE'] = int(self.platform_conf.get('SOCKETS_PER_NODE', 0))
         self.platform_conf['GPUS_PER_NODE'] = int(self.platform_conf.get('GPUS_PER_NODE', 0))
+        self.platform_conf['MEMORY_PER_NODE'] = int(self.platform_conf.get('MEMORY_PER_NODE', 0))
+        self.platform_conf['RESERVATION_THRESHOLD'] = float(self.platform_conf.get('RESERVATION_THRESHOLD', 300))
         self.platform_conf['USE_ACCURATE_NODES'] = use_accurate_nodes
         self.platform_conf['MPIRUN_VERSION'] = mpirun_version
+        self.terminate_timeout = float(self.platform_conf.get('COMPONENT_TERMINATE_TIMEOUT', self.terminate_timeout))
+        self.platform_conf['COMPONENT_TERMINATE_TIMEOUT'] = self.terminate_timeout
+
+        # transport of the service requests and responses
+        self.message_transport = self.platform_conf.get('MESSAGE_TRANSPORT', self.message_transport).lower()
+        if self.message_transport not in TRANSPORTS:
+            self.fwk.error("bad value for MESSAGE_TRANSPORT. expected one of %s.", ', '.join(TRANSPORTS))
+            raise ValueError(f"bad value for MESSAGE_TRANSPORT. expected one of {', '.join(TRANSPORTS)}.")
+        self.platform_conf['MESSAGE_TRANSPORT'] = self.message_transport
+        self.fwk.in_queue = new_queue(self.message_transport)
 
         """
         Simulation Configuration
@@ -501,7 +525,9 @@ class ConfigurationManager:
 
         # SIMYAN: removed else conditional, copying files in runspaceInit
         # component now
-        svc_response_q = Queue(0)
+        svc_response_q = new_queue(self.message_transport)
+        # the component only reads its invocations between calls, so they
+        # keep the unbounded queue
         invocation_q = Queue(0)
         component_id = ComponentID(class_name, sim_name)
         fwk_inq = self.fwk.get_inq()
@@ -585,7 +611,7 @@ class ConfigurationManager:
         Invokes public configuration manager method for a component.  Return
         method's return value.
         """
-        self.fwk.debug('Configuration Manager received message: %s', str(msg.__dict__))
+        self.fwk.debug('Configuration Manager received message: %s', msg)
         sim_name = msg.sender_id.get_sim_name()
         method = getattr(self, msg.target_method)
         self.fwk.debug('Configuration manager dispatching method %s on simulation %s',
@@ -726,9 +752,17 @@ in configuration file %s', config_file)
         msg = 'END_SIM %s' % (sim_data.log_pipe_name)
         self.log_dynamic_sim_queue.put(msg)
         proc_list = sim_data.process_list
+        # Give the components a chance to act on the terminate message and
+        # exit on their own.  Events are sent to the framework without
+        # waiting for a response, so a component may still be flushing its
+        # framework queue, and killing it while it holds the queue's shared
+        # write lock would block every other component writing to it.
+        deadline = time.time() + self.terminate_timeout
         for p in proc_list:
-            p.terminate()
-            p.join()
+            p.join(max(0, deadline - time.time()))
+            if p.is_alive():
+                p.terminate()
+                p.join()
         try:
             os.remove(sim_data.log_pipe_name)
         except Exception:
@@ -49,7 +49,7 @@ class EventService:
         if fwk:
             service_methods = ['getTopic', 'existsTopic', 'registerSubscriber',
                                'unregisterSubscriber', 'getSubscription',
-                               'processEvents', 'sendEvent', 'createListener',
+                               'processEvents', 'sendEvent', 'sendEvents', 'createListener',
                                'registerEventListener', 'unregisterEventListener',
                                'removeSubscription']
             fwk.register_service_handler(service_methods,
@@ -188,12 +188,22 @@ class EventService:
     """
 
     def sendEvent(self, topicName, eventName, eventBody):
+        self.sendEvents(topicName, eventName, [eventBody])
+
+    """
+    sendEvents adds several events, with the same name, to the topic's
+    TopicManager object.
+    """
+
+    def sendEvents(self, topicName, eventName, eventBodies):
         if topicName in self.topicDirectory:
-            eventHeader = {}
-            eventHeader[eventName] = eventName
-            theEvent = Event(eventHeader, eventBody)
-            debug.output("Event %s sent to topic %s" % (theEvent, topicName))
-            self.topicDirectory[topicName].sendEvent(theEvent)
+            topic = self.topicDirectory[topicName]
+            for eventBody in eventBodies:
+                eventHeader = {}
+                eventHeader[eventName] = eventName
+                theEvent = Event(eventHeader, eventBody)
+                debug.output("Event %s sent to topic %s" % (theEvent, topicName))
+                topic.sendEvent(theEvent)
         else:
             raise EventServiceException("Topic not recognized.")
 
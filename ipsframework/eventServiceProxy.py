@@ -25,6 +25,9 @@ class EventServiceProxy:
     def sendEvent(self, topicName, eventName, eventBody):
         pass
 
+    def sendEvents(self, topicName, eventName, eventBodies):
+        pass
+
     def createListener(self):
         pass
 
@@ -71,6 +74,9 @@ class EventServiceFwkProxy(EventServiceProxy):
     def sendEvent(self, topicName, eventName, eventBody):
         self.event_service.sendEvent(topicName, eventName, eventBody)
 
+    def sendEvents(self, topicName, eventName, eventBodies):
+        self.event_service.sendEvents(topicName, eventName, eventBodies)
+
     def createListener(self):
         return self.event_service.createListener()
 
@@ -139,9 +145,14 @@ class EventServiceCmpProxy(EventServiceProxy):
                     self.listenerDirectory[listenerid].processEvent(topicName, theEvent)
 
     def sendEvent(self, topicName, eventName, eventBody):
-        msg_id = self.service_proxy._invoke_service(self.service_proxy.fwk.component_id,
-                                                    'sendEvent', topicName, eventName, eventBody)
-        self.service_proxy._get_service_response(msg_id, True)
+        # one-way, errors are reported in the framework log
+        self.service_proxy._notify_service(self.service_proxy.fwk.component_id,
+                                           'sendEvent', topicName, eventName, eventBody)
+
+    def sendEvents(self, topicName, eventName, eventBodies):
+        # one-way, errors are reported in the framework log
+        self.service_proxy._notify_service(self.service_proxy.fwk.component_id,
+                                           'sendEvents', topicName, eventName, eventBodies)
 
     def createListener(self):
         msg_id = self.service_proxy._invoke_service(self.service_proxy.fwk.component_id,
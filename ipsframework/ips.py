@@ -60,8 +60,13 @@ import logging
 import os
 import time
 import hashlib
+import itertools
+import heapq
+import queue
+from collections import deque
 from ipsframework import platformspec
 from ipsframework.messages import Message, ServiceRequestMessage, \
+    ServiceNotificationMessage, ServiceRequestBatchMessage, \
     ServiceResponseMessage, MethodInvokeMessage, MethodResultMessage
 from ipsframework.configurationManager import ConfigurationManager
 from ipsframework.taskManager import TaskManager
@@ -69,6 +74,7 @@ from ipsframework.resourceManager import ResourceManager
 from ipsframework.dataManager import DataManager
 from ipsframework.componentRegistry import ComponentRegistry, ComponentID
 from ipsframework.ipsExceptions import BlockedMessageException
+from ipsframework.metrics import FrameworkMetrics
 from ipsframework.eventService import EventService
 from ipsframework.cca_es_spec import initialize_event_service
 from ipsframework.ips_es_spec import eventManager
@@ -135,7 +141,8 @@ class Framework:
             self.log_file = sys.stdout
         else:
             self.log_file = open(os.path.abspath(log_file_name), 'w')
-        # the multiprocessing queue
+        # the multiprocessing queue, replaced by a queue of the
+        # MESSAGE_TRANSPORT once the platform configuration is read
         self.in_queue = multiprocessing.Queue(0)
         # registry of components for calling
         self.comp_registry = ComponentRegistry()
@@ -156,6 +163,8 @@ class Framework:
         self.host = socket.gethostname()
         self.logger = None
         self.service_handler = {}
+        self.metrics = FrameworkMetrics()
+        self.register_service_handler(['get_framework_metrics'], self.get_framework_metrics)
         self.cur_time = time.time()
         self.start_time = self.cur_time
         self.event_service = EventService(self)
@@ -185,6 +194,15 @@ class Framework:
         self.verbose_debug = verbose_debug
         self.outstanding_calls_list = {}
         self.call_queue_map = {}
+        # blocked service requests, indexed by what they are waiting for
+        self.blocked_messages = []  # no known wait condition, retried on every message
+        self.blocked_calls = {}  # call_id -> messages waiting for that call
+        self.blocked_allocations = {}  # nproc -> heap of (seq, msg) waiting for that many cores
+        self.blocked_order = {}  # message_id -> position in the allocation wait-list
+        self.blocked_seq = itertools.count()
+        self.woken_messages = deque()
+        self.batch_responses = {}  # message_id -> responses of a partially handled batch
+        self.messages_per_wakeup = self.metrics.messages_per_wakeup  # number of messages received -> number of wake-ups
 
         # add the handler to the root logger
         try:
@@ -201,11 +219,11 @@ class Framework:
                                              self.config_manager,
                                              cmd_nodes,
                                              cmd_ppn)
+            self.task_manager.start_agents()
         except Exception:
             self.exception("Problem initializing managers")
             self.terminate_all_sims(status=Message.FAILURE)
             raise
-        self.blocked_messages = []
         # SIMYAN: determine the sim_root for the Framework to use later
         fwk_comps = self.config_manager.get_framework_components()
         main_fwk_comp = self.comp_registry.getEntry(fwk_comps[0])
@@ -214,7 +232,7 @@ class Framework:
     def get_inq(self):
         """
         :return: handle to the Framework's input queue object
-        :rtype: :class:`multiprocessing.Queue`
+        :rtype: :class:`multiprocessing.Queue` or :class:`ipsframework.transport.PipeQueue`
         """
         return self.in_queue
 
@@ -241,44 +259,186 @@ class Framework:
         :class:`messages.ServiceResponseMessage`.  All exceptions are passed
         on to the caller, except for the
         :class:`ipsExceptions.BlockedMessageException`, which causes the
-        message to be blocked until the request can be satisfied.
+        message to be blocked until the request can be satisfied (see
+        :meth:`_block_message`).
+
+        *msg* may also be a :class:`messages.ServiceRequestBatchMessage`, in
+        which case the requests it contains are handled in order and the
+        caller receives the list of their responses.  If one of the requests
+        blocks, the whole batch is blocked, and resumes from that request
+        when retried.
+
+        No response is sent for a :class:`messages.ServiceNotificationMessage`,
+        a failure is only logged.
         """
-        method_name = msg.target_method
         comp_id = msg.sender_id
-        self.debug('Framework dispatching method: %s from %s', method_name, str(comp_id))
         try:
-            handler = self.service_handler[method_name]
-        except KeyError:
-            self.exception("Unsupported method : %s", method_name)
-            response_msg = ServiceResponseMessage(self.component_id,
-                                                  comp_id,
-                                                  msg.message_id,
-                                                  Message.FAILURE,
-                                                  Exception("Unsupported method : %s" % (method_name)))
-        else:
-            try:
-                ret_val = handler(msg)
-            except BlockedMessageException as e:
-                if self.verbose_debug:
-                    self.debug('Blocked message : %s', str(e))
-                self.blocked_messages.append(msg)
-                return
-            except Exception as e:
-                # self.exception('Exception handling service message: %s - %s', str(msg.__dict__), str(e))
+            if isinstance(msg, ServiceRequestBatchMessage):
+                responses = self.batch_responses.setdefault(msg.message_id, [])
+                while len(responses) < len(msg.requests):
+                    responses.append(self._handle_service_request(msg.requests[len(responses)]))
+                del self.batch_responses[msg.message_id]
                 response_msg = ServiceResponseMessage(self.component_id,
                                                       comp_id,
                                                       msg.message_id,
-                                                      Message.FAILURE, e)
+                                                      Message.SUCCESS, responses)
             else:
-                response_msg = ServiceResponseMessage(self.component_id,
-                                                      comp_id,
-                                                      msg.message_id,
-                                                      Message.SUCCESS, ret_val)
+                response_msg = self._handle_service_request(msg)
+        except BlockedMessageException as e:
+            if self.verbose_debug:
+                self.debug('Blocked message : %s', str(e))
+            self._block_message(msg, e)
+            return
+        self.blocked_order.pop(msg.message_id, None)
+
+        if isinstance(msg, ServiceNotificationMessage):
+            if response_msg.status == Message.FAILURE:
+                self.error('Error handling %s notification from %s : %s',
+                           msg.target_method, str(comp_id), str(response_msg.args[0]))
+            return
 
         response_q = self.comp_registry.getComponentArtifact(comp_id,
                                                              'svc_response_q')
         response_q.put(response_msg)
 
+    def _handle_service_request(self, msg):
+        """
+        Execute the handler for the service request *msg*, and return the
+        :class:`messages.ServiceResponseMessage` holding its result.
+        :class:`ipsExceptions.BlockedMessageException` is raised to the
+        caller, any other exception is returned in a failure response.
+        """
+        method_name = msg.target_method
+        comp_id = msg.sender_id
+        self.debug('Framework dispatching method: %s from %s', method_name, str(comp_id))
+        try:
+            handler = self.service_handler[method_name]
+        except KeyError:
+            self.exception("Unsupported method : %s", method_name)
+            return ServiceResponseMessage(self.component_id,
+                                          comp_id,
+                                          msg.message_id,
+                                          Message.FAILURE,
+                                          Exception("Unsupported method : %s" % (method_name)))
+        start_time = time.perf_counter()
+        try:
+            ret_val = handler(msg)
+        except BlockedMessageException:
+            self.metrics.record_service(method_name, time.perf_counter() - start_time, blocked=True)
+            raise
+        except Exception as e:
+            self.metrics.record_service(method_name, time.perf_counter() - start_time, failed=True)
+            # self.exception('Exception handling service message: %s - %s', str(msg.__dict__), str(e))
+            return ServiceResponseMessage(self.component_id,
+                                          comp_id,
+                                          msg.message_id,
+                                          Message.FAILURE, e)
+        self.metrics.record_service(method_name, time.perf_counter() - start_time)
+        return ServiceResponseMessage(self.component_id,
+                                      comp_id,
+                                      msg.message_id,
+                                      Message.SUCCESS, ret_val)
+
+    def _block_message(self, msg, blocked):
+        """
+        Park *msg* on the wait-list matching the condition reported by the
+        :class:`ipsExceptions.BlockedMessageException` *blocked*, so that it
+        is only retried once that condition may have changed:
+
+          * waiting on a call: until :meth:`notify_call_finished` is invoked for that call.
+          * waiting on resources: until :meth:`notify_resources_released` finds
+            enough available cores for the request.
+          * otherwise: the message is retried after every incoming message.
+        """
+        if blocked.call_id is not None:
+            self.blocked_calls.setdefault(blocked.call_id, []).append(msg)
+        elif blocked.nproc is not None:
+            seq = self.blocked_order.setdefault(msg.message_id, next(self.blocked_seq))
+            heapq.heappush(self.blocked_allocations.setdefault(blocked.nproc, []), (seq, msg))
+        else:
+            self.blocked_messages.append(msg)
+
+    def notify_call_finished(self, call_id):
+        """
+        Wake up the messages blocked waiting for the result of *call_id*.
+        """
+        self.woken_messages.extend(self.blocked_calls.pop(call_id, []))
+
+    def notify_resources_released(self):
+        """
+        Wake up the blocked allocation requests that the cores currently
+        available can satisfy together, in the order they were first
+        blocked.  Requests too large for the remaining cores are skipped,
+        the others stay blocked until the next release.
+        """
+        avail_cores = self.resource_manager.avail_cores
+        while True:
+            sizes = [n for n in self.blocked_allocations if n <= avail_cores]
+            if not sizes:
+                break
+            # the heads of the heaps are the oldest request of each size
+            nproc = min(sizes, key=lambda n: self.blocked_allocations[n][0][0])
+            waiters = self.blocked_allocations[nproc]
+            _, msg = heapq.heappop(waiters)
+            if not waiters:
+                del self.blocked_allocations[nproc]
+            self.woken_messages.append(msg)
+            avail_cores -= nproc
+
+    def notify_capacity_changed(self):
+        """
+        Wake up all the blocked allocation requests, in the order they were
+        first blocked, after nodes were added, drained or removed.  The
+        requests that no longer fit on the remaining nodes fail.
+        """
+        waiters = [waiter for heap in self.blocked_allocations.values() for waiter in heap]
+        self.blocked_allocations = {}
+        self.woken_messages.extend(msg for _, msg in sorted(waiters, key=lambda waiter: waiter[0]))
+
+    def _receive_messages(self):
+        """
+        Wait for a message on the input queue, and return it in a list along
+        with all the messages already queued behind it, so that they are
+        processed in one pass.  The number of messages of each wake-up is
+        counted in :attr:`messages_per_wakeup`.
+        """
+        messages = [self.in_queue.get()]
+        while True:
+            try:
+                messages.append(self.in_queue.get_nowait())
+            except queue.Empty:
+                break
+        self.metrics.sample_queue(len(messages), self._blocked_message_count())
+        return messages
+
+    def _blocked_message_count(self):
+        """
+        Return the number of messages on the wait-lists.
+        """
+        return (len(self.blocked_messages) +
+                sum(len(msgs) for msgs in self.blocked_calls.values()) +
+                sum(len(waiters) for waiters in self.blocked_allocations.values()))
+
+    def get_framework_metrics(self, msg):
+        """
+        Return a snapshot of the framework metrics, see
+        :meth:`metrics.FrameworkMetrics.snapshot`.
+        """
+        return self.metrics.snapshot()
+
+    def _pending_messages(self, messages):
+        """
+        Yield the list of *messages* followed by the blocked messages that
+        are due for a retry: those without a wait condition, and those woken
+        up while processing the previous messages.
+        """
+        retry_list = list(messages) + self.blocked_messages
+        self.blocked_messages = []
+        for retry_msg in retry_list:
+            yield retry_msg
+        while self.woken_messages:
+            yield self.woken_messages.popleft()
+
     def log(self, msg, *args):
         """
         Wrapper for :meth:`Framework.info`.
@@ -335,20 +495,19 @@ class Framework:
             msg = ServiceRequestMessage(self.component_id,
                                         self.component_id, comp_id,
                                         'init_call', method_name, 0)
-            self.debug('Framework sending message %s ', msg.__dict__)
+            self.debug('Framework sending message %s ', msg)
             call_id = self.task_manager.init_call(msg, manage_return=False)
             outstanding_fwk_calls.append(call_id)
 
         self.blocked_messages = []
         while len(outstanding_fwk_calls) > 0:
             self.debug("Framework waiting for message")
-            msg = self.in_queue.get()
-            self.debug("Framework received Message : %s", str(msg.__dict__))
-            msg_list = [msg] + self.blocked_messages
-            self.blocked_messages = []
-            for msg in msg_list:
+            messages = self._receive_messages()
+            for msg in messages:
+                self.debug("Framework received Message : %s", msg)
+            for msg in self._pending_messages(messages):
                 self.debug('Framework processing message %s ', msg.message_id)
-                if isinstance(msg, ServiceRequestMessage):
+                if isinstance(msg, (ServiceRequestMessage, ServiceRequestBatchMessage)):
                     self._dispatch_service_request(msg)
                     continue
                 elif isinstance(msg, MethodResultMessage):
@@ -362,7 +521,7 @@ class Framework:
                         outstanding_fwk_calls.remove(msg.call_id)
                 else:
                     self.error('Framework received unexpected message : %s',
-                               str(msg.__dict__))
+                               msg)
 
     def run(self):
         """
@@ -463,7 +622,7 @@ class Framework:
         try:
             for sim_name, msg_list in outstanding_sim_calls.items():
                 msg, sim_name, comp, method, arg = msg_list.pop(0)
-                self.debug('Framework sending message %s ', msg.__dict__)
+                self.debug('Framework sending message %s ', msg)
                 if sim_name is not None:
                     self._send_monitor_event(sim_name=sim_name,
                                              comment=f'Target = {comp}:{method}({arg})',
@@ -479,85 +638,110 @@ class Framework:
         while len(self.outstanding_calls_list) > 0:
             if self.verbose_debug:
                 self.debug("Framework waiting for message")
-            # get new messages
+            # get new messages, along with those already queued behind them
             try:
-                msg = self.in_queue.get()
+                messages = self._receive_messages()
             except Exception:
                 continue
             if self.verbose_debug:
-                self.debug("Framework received Message : %s", str(msg.__dict__))
-
-            # add blocked messages to message list for reprocessing
-            msg_list = [msg] + self.blocked_messages
-            self.blocked_messages = []
-            # process new and blocked messages
-            for msg in msg_list:
-                if self.verbose_debug:
-                    self.debug('Framework processing message %s ', msg.message_id)
-
-                sim_name = msg.sender_id.get_sim_name()
-                if isinstance(msg, ServiceRequestMessage):
-                    try:
-                        self._dispatch_service_request(msg)
-                    except Exception:
-                        self.exception('Error dispatching service request message.')
-                        self.terminate_all_sims(status=Message.FAILURE)
-                        return False
-                    continue
-                elif isinstance(msg, MethodResultMessage):
-                    if msg.call_id not in self.outstanding_calls_list:
-                        self.task_manager.return_call(msg)
-                        continue
-                    # Message is a result from a framework invocation
-                    sim_name, comp, method, arg, start_time = self.outstanding_calls_list.pop(msg.call_id)
-                    if sim_name is not None:
-                        self._send_monitor_event(sim_name=sim_name,
-                                                 comment=f'Target = {comp}:{method}({arg})',
-                                                 eventType='IPS_CALL_END',
-                                                 start_time=start_time,
-                                                 end_time=time.time(),
-                                                 target=comp,
-                                                 operation=f'{method}({arg})',
-                                                 call_id=msg.call_id)
-                    sim_msg_list = self.call_queue_map[msg.call_id]
-                    del self.call_queue_map[msg.call_id]
-                    if msg.status == Message.FAILURE:
-                        self.error('received a failure message from component %s : %s',
-                                   msg.sender_id, str(msg.args))
-                        # No need to process remaining messages for this simulation
-                        sim_msg_list = []
-                        comment = 'Simulation Execution Error'
-                        ok = False
-                        # self.terminate_sim(status=Message.FAILURE)
-                        # return False
-                        self.send_terminate_msg(sim_name, Message.FAILURE)
-                    else:
-                        comment = 'Simulation Ended'
-                        ok = True
-                    try:
-                        next_call_msg, sim_name, comp, method, arg = sim_msg_list.pop(0)
-                        if sim_name is not None:
-                            self._send_monitor_event(sim_name=sim_name,
-                                                     comment=f'Target = {comp}:{method}({arg})',
-                                                     eventType='IPS_CALL_BEGIN')
-                        call_id = self.task_manager.init_call(next_call_msg,
-                                                              manage_return=False)
-                        self.outstanding_calls_list[call_id] = sim_name, comp, method, arg, time.time()
-                        self.call_queue_map[call_id] = sim_msg_list
-                    except IndexError:
-                        sim_comps = self.config_manager.get_component_map()  # Get any new dynamic simulations
-                        if sim_name in sim_comps:
-                            self._send_monitor_event(sim_name, 'IPS_END',
-                                                     comment, ok)
-                            self._send_dynamic_sim_event(sim_name, 'IPS_END', ok)
-                            self.send_terminate_msg(sim_name, Message.SUCCESS)
-                            self.config_manager.terminate_sim(sim_name)
+                for msg in messages:
+                    self.debug("Framework received Message : %s", msg)
+
+            # process new messages and any blocked messages they unblocked.
+            # The service requests are dispatched first, then the results
+            # of the calls are handled together, which may unblock more
+            # messages.
+            while True:
+                results = []
+                for msg in self._pending_messages(messages):
+                    if self.verbose_debug:
+                        self.debug('Framework processing message %s ', msg.message_id)
+
+                    if isinstance(msg, (ServiceRequestMessage, ServiceRequestBatchMessage)):
+                        try:
+                            self._dispatch_service_request(msg)
+                        except Exception:
+                            self.exception('Error dispatching service request message.')
+                            self.terminate_all_sims(status=Message.FAILURE)
+                            return False
+                    elif isinstance(msg, MethodResultMessage):
+                        results.append(msg)
+                if not results:
+                    break
+                self._handle_call_results(results)
+                messages = []
 
         self.terminate_all_sims(Message.SUCCESS)
         self.event_service._print_stats()
+        try:
+            self.metrics.dump(os.path.join(self.sim_root, 'framework_metrics.json'))
+        except OSError:
+            self.exception('Error writing the framework metrics')
         self.logger.removeHandler(self.ch)
         return True
 
+    def _handle_call_results(self, results):
+        """
+        Handle the :class:`messages.MethodResultMessage` list *results*.
+        The results of calls made by the framework start the next call of
+        their simulation, or end it, and the monitor events of those calls
+        are published together.
+        """
+        monitor_events = []
+        for msg in results:
+            if msg.call_id not in self.outstanding_calls_list:
+                self.task_manager.return_call(msg)
+                continue
+            # Message is a result from a framework invocation
+            sim_name, comp, method, arg, start_time = self.outstanding_calls_list.pop(msg.call_id)
+            if sim_name is not None:
+                monitor_events.append(self._monitor_event_body(sim_name=sim_name,
+                                                               comment=f'Target = {comp}:{method}({arg})',
+                                                               eventType='IPS_CALL_END',
+                                                               start_time=start_time,
+                                                               end_time=time.time(),
+                                                               target=comp,
+                                                               operation=f'{method}({arg})',
+                                                               call_id=msg.call_id))
+            sim_msg_list = self.call_queue_map[msg.call_id]
+            del self.call_queue_map[msg.call_id]
+            if msg.status == Message.FAILURE:
+                self.error('received a failure message from component %s : %s',
+                           msg.sender_id, str(msg.args))
+                # No need to process remaining messages for this simulation
+                sim_msg_list = []
+                comment = 'Simulation Execution Error'
+                ok = False
+                # self.terminate_sim(status=Message.FAILURE)
+                # return False
+                self.send_terminate_msg(sim_name, Message.FAILURE)
+            else:
+                comment = 'Simulation Ended'
+                ok = True
+            try:
+                next_call_msg, sim_name, comp, method, arg = sim_msg_list.pop(0)
+                if sim_name is not None:
+                    monitor_events.append(self._monitor_event_body(sim_name=sim_name,
+                                                                   comment=f'Target = {comp}:{method}({arg})',
+                                                                   eventType='IPS_CALL_BEGIN'))
+                call_id = self.task_manager.init_call(next_call_msg,
+                                                      manage_return=False)
+                self.outstanding_calls_list[call_id] = sim_name, comp, method, arg, time.time()
+                self.call_queue_map[call_id] = sim_msg_list
+            except IndexError:
+                sim_comps = self.config_manager.get_component_map()  # Get any new dynamic simulations
+                if sim_name in sim_comps:
+                    # the events of the simulation are published before it ends
+                    monitor_events.append(self._monitor_event_body(sim_name, 'IPS_END',
+                                                                   comment, ok))
+                    self.event_manager.publish_many('_IPS_MONITOR', 'IPS_SIM', monitor_events)
+                    monitor_events = []
+                    self._send_dynamic_sim_event(sim_name, 'IPS_END', ok)
+                    self.send_terminate_msg(sim_name, Message.SUCCESS)
+                    self.config_manager.terminate_sim(sim_name)
+        if monitor_events:
+            self.event_manager.publish_many('_IPS_MONITOR', 'IPS_SIM', monitor_events)
+
     def initiate_new_simulation(self, sim_name):
         '''
         This is to be called by the configuration manager as part of dynamically creating
@@ -577,7 +761,7 @@ class Framework:
 
         # send off first round of invocations...
         msg, sim_name, comp, method, arg = msg_list.pop(0)
-        self.debug('Framework sending message %s ', msg.__dict__)
+        self.debug('Framework sending message %s ', msg)
         call_id = self.task_manager.init_call(msg, manage_return=False)
         self.call_queue_map[call_id] = msg_list
         self.outstanding_calls_list[call_id] = sim_name, comp, method, arg, time.time()
@@ -586,7 +770,16 @@ class Framework:
         """
         Publish a portal monitor event to the *_IPS_MONITOR* event topic.
         Event topics that start with an underscore are reserved for use by the
-        IPS Framework and services.
+        IPS Framework and services.  See :meth:`_monitor_event_body` for the
+        arguments.
+        """
+        event_body = self._monitor_event_body(sim_name, eventType, comment, ok, target,
+                                              operation, start_time, end_time, call_id)
+        self.event_manager.publish('_IPS_MONITOR', 'IPS_SIM', event_body)
+
+    def _monitor_event_body(self, sim_name='', eventType='', comment='', ok=True, target=None, operation=None, start_time=None, end_time=None, call_id=0):
+        """
+        Return the body of a portal monitor event.
 
           * *sim_name*: The name of the simulation to which this even belongs.
           * *eventType*: The type of the event.
@@ -597,7 +790,7 @@ class Framework:
         """
         event_time = time.time()
         if self.verbose_debug:
-            self.debug('_send_monitor_event(%s - %s)', sim_name, eventType)
+            self.debug('_monitor_event_body(%s - %s)', sim_name, eventType)
         portal_data = {}
         portal_data['code'] = 'Framework'
         # eventData['portal_runid'] = self.portalRunId
@@ -607,7 +800,6 @@ class Framework:
         portal_data['walltime'] = '%.2f' % (event_time - self.config_manager.sim_map[sim_name].start_time)
         portal_data['time'] = getTimeString(time.localtime(event_time))
 
-        topic_name = '_IPS_MONITOR'
         # portal_data['phystimestamp'] = self.timeStamp
         get_config = self.config_manager.get_config_parameter
         if eventType == 'IPS_START':
@@ -688,7 +880,7 @@ class Framework:
 
         if self.verbose_debug:
             self.debug('Publishing %s', str(event_body))
-        self.event_manager.publish(topic_name, 'IPS_SIM', event_body)
+        return event_body
 
     def _send_dynamic_sim_event(self, sim_name='', event_type='', ok=True):
         self.debug('_send_dynamic_sim_event(%s:%s)', event_type, sim_name)
@@ -745,6 +937,8 @@ class Framework:
             self.config_manager.terminate(status)
         except Exception:
             self.exception('exception encountered while cleaning up config_manager')
+        self.task_manager.stop_agents()
+        self.resource_manager.close_report()
         # sys.exit(status)
 
 
@@ -7,13 +7,19 @@ class BlockedMessageException(Exception):
     """ Exception Raised by the any manager when a blocking service
         invocation is made, and the invocation result is not readily
         available.
+
+        *call_id* or *nproc* identify what the message is waiting for, the
+        result of a call or that number of cores being freed, so the
+        framework only retries the message once that happens.
     """
 
-    def __init__(self, msg, reason):
+    def __init__(self, msg, reason, call_id=None, nproc=None):
         super().__init__(msg)
         self.msg = msg
         self.reason = reason
-        self.args = (msg, reason)
+        self.call_id = call_id
+        self.nproc = nproc
+        self.args = (msg, reason, call_id, nproc)
 
     def __str__(self):
         return 'message blocked because %s' % self.reason
@@ -94,6 +100,26 @@ class GPUResourceRequestMismatchException(Exception):
         return s
 
 
+class MemoryResourceRequestMismatchException(Exception):
+    """ Exception raised by the resource manager when it is not possible to
+    provide the requested memory per process on a node
+    """
+
+    def __init__(self, caller_id, tid, ppn, mem, max_mem):
+        super().__init__()
+        self.caller_id = caller_id
+        self.task_id = tid
+        self.ppn = ppn
+        self.mem = mem
+        self.max_mem = max_mem
+        self.args = (caller_id, tid, ppn, mem, max_mem)
+
+    def __str__(self):
+        s = "component %s requested %d processes per node with %d MB of memory per process, which is greater than the available %d MB MEMORY_PER_NODE" % (
+            self.caller_id, self.ppn, self.mem, self.max_mem)
+        return s
+
+
 class ResourceRequestUnequalPartitioningException(Exception):
     """Exception raised by the resource manager when it is possible to
     launch the requested number of processes, but the requested number
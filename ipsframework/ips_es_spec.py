@@ -19,16 +19,28 @@ class eventManager:
         self.objcache = {}
         self.publisher = "self.publisher"
         self.subscriber = "self.subscriber"
+        self.topics = {}
+
+    def _get_topic(self, topicName):
+        # topics are never removed from the event service, so they are
+        # only looked up on the first publish
+        try:
+            return self.topics[topicName]
+        except KeyError:
+            if self.publisher in self.objcache:
+                pub = self.objcache[self.publisher]
+            else:
+                pub = PublisherEventService()
+                self.objcache[self.publisher] = pub
+            topic = pub.getTopic(topicName)
+            self.topics[topicName] = topic
+            return topic
 
     def publish(self, topicName, eventName, eventBody):
-        if self.publisher in self.objcache:
-            pub = self.objcache[self.publisher]
-        else:
-            pub = PublisherEventService()
-            self.objcache[self.publisher] = pub
+        self._get_topic(topicName).sendEvent(eventName, eventBody)
 
-        topic = pub.getTopic(topicName)
-        topic.sendEvent(eventName, eventBody)
+    def publish_many(self, topicName, eventName, eventBodies):
+        self._get_topic(topicName).sendEvents(eventName, eventBodies)
 
     def subscribe(self, topicName, callback):
         if not callable(callback):
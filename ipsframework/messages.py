@@ -1,13 +1,26 @@
 # -------------------------------------------------------------------------------
 # Copyright 2006-2022 UT-Battelle, LLC. See LICENSE for more information.
 # -------------------------------------------------------------------------------
+from functools import lru_cache
+
+
+@lru_cache(maxsize=None)
+def _slot_names(cls):
+    """
+    Return the names of the slots of message class *cls*, base classes first.
+    """
+    return tuple(name for c in reversed(cls.__mro__) for name in c.__dict__.get('__slots__', ()))
 
 
 class Message:
     """
     Base class for all IPS messages. **Should not be used in actual
     communication.**
+
+    Messages have no instance dictionary, and are pickled as the tuple of
+    their slot values.
     """
+    __slots__ = ('sender_id', 'receiver_id', 'message_id')
     SUCCESS = 0
     FAILURE = 1
     delimiter = ''
@@ -19,6 +32,17 @@ class Message:
         self.receiver_id = receiver_id
         self.message_id = None
 
+    def __repr__(self):
+        fields = ', '.join(f'{name}={getattr(self, name)!r}' for name in _slot_names(type(self)))
+        return f'{type(self).__name__}({fields})'
+
+    def __getstate__(self):
+        return tuple(getattr(self, name) for name in _slot_names(type(self)))
+
+    def __setstate__(self, state):
+        for name, value in zip(_slot_names(type(self)), state):
+            setattr(self, name, value)
+
     def get_message_id(self):
         if self.message_id is None:
             delim = self.delimiter
@@ -41,6 +65,7 @@ class ServiceRequestMessage(Message):
       * *target_method*: name of method to be invoked on component *target_comp_id*
       * *\*args*: any number of arguments.  These are specific to the target method.
     """
+    __slots__ = ('target_comp_id', 'target_method', 'args', 'keywords')
     counter = 0
     delimiter = '|'
     identifier = 'REQUEST'
@@ -54,6 +79,46 @@ class ServiceRequestMessage(Message):
         self.message_id = self.get_message_id()
 
 
+class ServiceNotificationMessage(ServiceRequestMessage):
+    r"""
+    One-way :class:`ServiceRequestMessage`, used by components to invoke a
+    service without waiting for its result.  The framework sends no
+    response, errors are reported in the framework log.
+
+      * *sender_id*: component id of the sender
+      * *receiver_id*: component id of the receiver (framework)
+      * *target_comp_id*: component id of target component (typically framework)
+      * *target_method*: name of method to be invoked on component *target_comp_id*
+      * *\*args*: any number of arguments.  These are specific to the target method.
+    """
+    __slots__ = ()
+    counter = 0
+    delimiter = '|'
+    identifier = 'NOTIFY'
+
+
+class ServiceRequestBatchMessage(Message):
+    r"""
+    Message used by components to send several service requests to the
+    framework at once.  The requests are handled in order, and answered with
+    a single :class:`ServiceResponseMessage` whose argument is the list of
+    :class:`ServiceResponseMessage` for each request.
+
+      * *sender_id*: component id of the sender
+      * *receiver_id*: component id of the receiver (framework)
+      * *requests*: list of :class:`ServiceRequestMessage`
+    """
+    __slots__ = ('requests',)
+    counter = 0
+    delimiter = '|'
+    identifier = 'BATCH_REQUEST'
+
+    def __init__(self, sender_id, receiver_id, requests):
+        super().__init__(sender_id, receiver_id)
+        self.requests = requests
+        self.message_id = self.get_message_id()
+
+
 class ServiceResponseMessage(Message):
     r"""
     Message used by managers to respond with the result of the service action
@@ -65,6 +130,7 @@ class ServiceResponseMessage(Message):
       * *status*: either Message.SUCCESS or Message.FAILURE
       * *\*args*: any number of arguments.  These are specific to type of response.
     """
+    __slots__ = ('request_msg_id', 'status', 'args')
     counter = 0
     delimiter = '|'
     identifier = 'RESPONSE'
@@ -91,6 +157,7 @@ class MethodInvokeMessage(Message):
       * *target_method*: method to be invoked on the receiver
       * *\*args*: arguments to be passed to the *target_method*
     """
+    __slots__ = ('call_id', 'target_method', 'args', 'keywords')
     counter = 0
     delimiter = '|'
     identifier = 'INVOKE'
@@ -114,6 +181,7 @@ class MethodResultMessage(Message):
       * *status*: either Message.SUCCESS or Message.FAILURE indicating the success of failure of the invocation.
       * *\*args*: other information to be passed back to the caller.
     """
+    __slots__ = ('call_id', 'args', 'status')
     counter = 0
     delimiter = '|'
     identifier = 'RESULT'
@@ -0,0 +1,124 @@
+# -------------------------------------------------------------------------------
+# Copyright 2006-2022 UT-Battelle, LLC. See LICENSE for more information.
+# -------------------------------------------------------------------------------
+"""
+Counters and latency histograms of the framework hot paths.
+"""
+import json
+import time
+from collections import Counter, defaultdict
+
+
+class LatencyHistogram:
+    """
+    Count, total, maximum and distribution of the durations of an
+    operation.  The histogram buckets are bounded by powers of ten seconds.
+    """
+    bounds = (1e-5, 1e-4, 1e-3, 1e-2, 1e-1, 1.0, 10.0)
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(self.bounds) + 1)
+
+    def add(self, elapsed):
+        """
+        Add a duration of *elapsed* seconds.
+        """
+        self.count += 1
+        self.total += elapsed
+        if elapsed > self.max:
+            self.max = elapsed
+        for i, bound in enumerate(self.bounds):
+            if elapsed <= bound:
+                self.buckets[i] += 1
+                return
+        self.buckets[-1] += 1
+
+    def to_dict(self):
+        """
+        :return: the statistics of the durations, in seconds
+        :rtype: dict
+        """
+        labels = [f'<={bound:g}' for bound in self.bounds] + [f'>{self.bounds[-1]:g}']
+        return {'count': self.count,
+                'total': self.total,
+                'mean': self.total / self.count if self.count else 0.0,
+                'max': self.max,
+                'histogram': dict(zip(labels, self.buckets))}
+
+
+class FrameworkMetrics:
+    """
+    Metrics of the framework: latency of each service, by *target_method*,
+    time spent in internal operations, depth of the input queue seen at each
+    wake-up of the framework, and number of blocked messages.
+    """
+
+    def __init__(self):
+        self.start_time = time.time()
+        self.services = defaultdict(LatencyHistogram)
+        self.failed = defaultdict(int)
+        self.blocked = defaultdict(int)
+        self.operations = defaultdict(LatencyHistogram)
+        self.messages_per_wakeup = Counter()  # number of messages received -> number of wake-ups
+        self.blocked_messages = 0
+        self.max_blocked_messages = 0
+
+    def record_service(self, method_name, elapsed, failed=False, blocked=False):
+        """
+        Record the handling of a request for service *method_name* that
+        took *elapsed* seconds, and whether it *failed* or was *blocked*.
+        """
+        self.services[method_name].add(elapsed)
+        if failed:
+            self.failed[method_name] += 1
+        if blocked:
+            self.blocked[method_name] += 1
+
+    def record_operation(self, name, elapsed):
+        """
+        Record *elapsed* seconds spent in operation *name*.
+        """
+        self.operations[name].add(elapsed)
+
+    def sample_queue(self, depth, blocked_messages):
+        """
+        Record the number of messages, *depth*, received at once from the
+        input queue, and the number of *blocked_messages* at that time.
+        """
+        self.messages_per_wakeup[depth] += 1
+        self.blocked_messages = blocked_messages
+        if blocked_messages > self.max_blocked_messages:
+            self.max_blocked_messages = blocked_messages
+
+    def snapshot(self):
+        """
+        :return: the current metrics
+        :rtype: dict
+        """
+        services = {}
+        for method_name, histogram in sorted(self.services.items()):
+            services[method_name] = histogram.to_dict()
+            services[method_name]['failed'] = self.failed[method_name]
+            services[method_name]['blocked'] = self.blocked[method_name]
+        wakeups = sum(self.messages_per_wakeup.values())
+        messages = sum(depth * count for depth, count in self.messages_per_wakeup.items())
+        return {'elapsed_time': time.time() - self.start_time,
+                'services': services,
+                'operations': {name: histogram.to_dict() for name, histogram in sorted(self.operations.items())},
+                'in_queue': {'wakeups': wakeups,
+                             'messages': messages,
+                             'mean_depth': messages / wakeups if wakeups else 0.0,
+                             'max_depth': max(self.messages_per_wakeup, default=0),
+                             'messages_per_wakeup': dict(sorted(self.messages_per_wakeup.items()))},
+                'blocked_messages': {'current': self.blocked_messages,
+                                     'max': self.max_blocked_messages}}
+
+    def dump(self, file_name):
+        """
+        Write the current metrics to *file_name* in JSON.
+        """
+        with open(file_name, 'w') as f:
+            json.dump(self.snapshot(), f, indent=2)
@@ -4,6 +4,7 @@
 """
 Node structures for RM are implemented here for convenience.
 """
+from functools import lru_cache
 
 # local version
 
@@ -13,21 +14,31 @@ class Node:
     Models a node in the allocation.
 
       * *name*: name of node, typically actual name from resource detection phase.
+      * *tasks*: maps the identifier of each task using the node to its component and the list of sockets it uses.
       * *task_ids*, *owners*: identifiers for the tasks and components that are currently using the node.
       * *allocated*, *available*: list of sockets that have cores allocated and available.  A socket may appear in both lists if it is only partially allocated.
       * *sockets*: list of sockets belonging to this node
       * *avail_cores*: number of cores that are currently available.
       * *total_cores*: total number of cores that can be allocated on this node.
+      * *free_gpus*: bit mask of the GPUs that are available, bit *i* for GPU *i*.
+      * *task_gpus*: maps the identifier of each task using GPUs of the node to the mask of its GPUs.
+      * *avail_gpus*, *total_gpus*: number of GPUs that are available, and of the node.
+      * *avail_mem*, *total_mem*: memory in MB that is available, and of the node, 0 if it is not tracked.
+      * *task_mem*: maps the identifier of each task using memory of the node to the memory it uses.
       * *status*: indicates if the node is 'UP' or 'DOWN'.  Currently not used, all nodes are considered functional..
     """
 
-    def __init__(self, name, socks, cores, p):
+    def __init__(self, name, socks, cores, p, gpus=0, mem=0):
         self.status = 'UP'
         self.name = name
-        self.task_ids = []
-        self.owners = []
-        self.allocated = []  # sockets allocated
-        self.available = []  # sockets available
+        self.tasks = {}  # tid: (owner, sockets)
+        self.total_gpus = gpus
+        self.avail_gpus = gpus
+        self.free_gpus = (1 << gpus) - 1
+        self.task_gpus = {}  # tid: mask
+        self.total_mem = mem
+        self.avail_mem = mem
+        self.task_mem = {}  # tid: MB
         self.sockets = []
         if isinstance(p, int):
             self.avail_cores = p
@@ -46,7 +57,6 @@ class Node:
                 else:
                     self.sockets.append(Socket(s, cps, p[i:cps]))
                     i += cps
-                self.available.append(s)
                 s += 1
                 c += cps
             else:
@@ -57,120 +67,167 @@ class Node:
                     self.sockets.append(Socket(s, len(p) - c, p[i:]))
                     i = len(p)
                     c = len(p)
-                self.available.append(s)
+
+    @property
+    def task_ids(self):
+        return list(self.tasks)
+
+    @property
+    def owners(self):
+        return [o for o, _ in self.tasks.values()]
+
+    @property
+    def allocated(self):
+        return [sock.name for sock in self.sockets if sock.avail_cores < sock.total_cores]
+
+    @property
+    def available(self):
+        return [sock.name for sock in self.sockets if sock.avail_cores > 0]
 
     def print_sockets(self, fname=''):
         """
         Pretty print of state of sockets.
         """
-        if fname:
-            for sock in self.sockets:
-                print("    socket:", sock.name, file=fname)
-                print("    availablilty:", sock.avail_cores, file=fname)
-                print("    task ids:", sock.task_ids, file=fname)
-                print("    owners:", sock.owners, file=fname)
-                print("    cores:", sock.total_cores, file=fname)
-                sock.print_cores(fname)
+        fname = fname or None
+        for sock in self.sockets:
+            print("    socket:", sock.name, file=fname)
+            print("    availablilty:", sock.avail_cores, file=fname)
+            print("    task ids:", sock.task_ids, file=fname)
+            print("    owners:", sock.owners, file=fname)
+            print("    cores:", sock.total_cores, file=fname)
+            sock.print_cores(fname)
 
-        else:
-            for sock in self.sockets:
-                print("    socket:", sock.name)
-                print("    availablilty:", sock.avail_cores)
-                print("    task ids:", sock.task_ids)
-                print("    owners:", sock.owners)
-                print("    cores:", sock.total_cores)
-                sock.print_cores()
-
-    def allocate(self, whole_nodes, whole_sockets, tid, o, procs):
+    def allocate(self, whole_nodes, whole_sockets, tid, o, procs, socket_local=False):
         """
         Mark *procs* number of cores as allocated subject to the values of
-        *whole_nodes* and *whole_sockets*.  Return the number of cores
-        allocated and their corresponding slots, a list of strings of the form:
+        *whole_nodes* and *whole_sockets*.  If *socket_local* is ``True``,
+        the cores are taken from the socket with the fewest available cores
+        that can hold them all, or else from the fewest sockets, otherwise
+        from the first sockets.  Return the number of cores allocated and
+        their corresponding slots, a list of strings of the form:
 
           <socket name>:<core name>
         """
-        # add tid and o to lists
         slots = []
-        self.task_ids.append(tid)
-        self.owners.append(o)
+        used = []  # sockets allocated to tid
         k = 0   # number of cores allocated
 
         if whole_nodes:
             for sock in self.sockets:
                 slots.extend(sock.allocate(whole_sockets, tid, o,
                                            sock.avail_cores))
-                self.available.remove(sock.name)
-                self.allocated.append(sock.name)
+                used.append(sock)
                 k += sock.total_cores
         elif whole_sockets:
             for sock in self.sockets:
                 if sock.avail_cores == sock.total_cores:
                     slots.extend(sock.allocate(whole_sockets, tid, o,
                                                sock.avail_cores))
-                    self.available.remove(sock.name)
-                    self.allocated.append(sock.name)
+                    used.append(sock)
                     k += sock.total_cores
                     if k >= procs:
                         break
         else:
-            for sock in self.sockets:
+            for sock in self._local_sockets(procs) if socket_local else self.sockets:
                 if sock.avail_cores > procs - k:
                     slots.extend(sock.allocate(whole_sockets, tid, o,
                                                procs - k))
+                    used.append(sock)
                     k = procs
-                    if sock.name not in self.allocated:
-                        self.allocated.append(sock.name)
-                    if sock.avail_cores == 0:
-                        self.available.remove(sock.name)
-
                 elif sock.avail_cores > 0:  # sock.avail_cores < procs - k
                     k += sock.avail_cores
                     slots.extend(sock.allocate(whole_sockets, tid, o,
                                                sock.avail_cores))
-                    if sock.name not in self.allocated:
-                        self.allocated.append(sock.name)
-                    if sock.avail_cores == 0:
-                        self.available.remove(sock.name)
+                    used.append(sock)
                 if k >= procs:
                     break
 
+        if tid in self.tasks:
+            used = self.tasks[tid][1] + [sock for sock in used if sock not in self.tasks[tid][1]]
+        self.tasks[tid] = (o, used)
         self.avail_cores -= k
         return k, slots
 
+    def _local_sockets(self, procs):
+        """
+        Return the sockets to allocate *procs* cores from with the fewest
+        sockets.
+        """
+        fit = [sock for sock in self.sockets if sock.avail_cores >= procs]
+        if fit:
+            return [min(fit, key=lambda sock: sock.avail_cores)]
+        return sorted(self.sockets, key=lambda sock: -sock.avail_cores)
+
+    def allocate_gpus(self, tid, count):
+        """
+        Mark *count* GPUs as allocated to task *tid*, the available GPUs
+        with the lowest ids.  Return the list of their ids.
+        """
+        if count > self.avail_gpus:
+            raise RuntimeError("trying to allocate GPUs that are not available")
+        gpus = []
+        mask = 0
+        free = self.free_gpus
+        while len(gpus) < count:
+            gpu = free & -free  # lowest available GPU
+            free ^= gpu
+            mask |= gpu
+            gpus.append(gpu.bit_length() - 1)
+        self.free_gpus = free
+        self.avail_gpus -= count
+        self.task_gpus[tid] = self.task_gpus.get(tid, 0) | mask
+        return gpus
+
+    def allocate_memory(self, tid, mem):
+        """
+        Mark *mem* MB of memory as allocated to task *tid*.
+        """
+        if mem > self.avail_mem:
+            raise RuntimeError("trying to allocate memory that is not available")
+        self.avail_mem -= mem
+        self.task_mem[tid] = self.task_mem.get(tid, 0) + mem
+
     def release(self, tid, o):
         """
-        Mark cores used by task *tid* and component *o* as available.  Return
-        the number of cores released.
+        Mark cores, GPUs and memory used by task *tid* and component *o* as
+        available.  Return the number of cores released.
         """
-        # remove tid and o from lists
-        self.task_ids.remove(tid)
-        self.owners.remove(o)
-        ac = 0
-        start = self.avail_cores
-        for s in self.sockets:
-            if tid in s.task_ids:
-                s.release(tid)
-                if s.name not in self.available:
-                    self.available.append(s.name)
-                elif s.avail_cores == s.total_cores:
-                    self.allocated.remove(s.name)
-            ac += s.avail_cores
-
-        # update avail_cores
-        self.avail_cores = ac
-        return self.avail_cores - start
+        mask = self.task_gpus.pop(tid, 0)
+        self.free_gpus |= mask
+        self.avail_gpus += bin(mask).count('1')
+        self.avail_mem += self.task_mem.pop(tid, 0)
+        _, used = self.tasks.pop(tid)
+        k = 0
+        for sock in used:
+            k += sock.release(tid)
+        self.avail_cores += k
+        return k
+
+
+@lru_cache(maxsize=None)
+def _slots(name, cores):
+    """
+    Return the slots of the *cores* of socket *name*, shared by the sockets
+    of all the nodes.
+    """
+    return tuple(str(name) + ":" + str(c) for c in cores)
 
 
 class Socket:
     """
-    Models a socket in a node.
+    Models a socket in a node.  The state of the cores is kept in integer
+    bit masks, where bit *i* stands for the core ``cores[i]``.
 
       * *name*: identifier for the socket
+      * *tasks*: maps the identifier of each task using the socket to its
+        component, the mask of its cores and their number.
       * *task_ids*, *owners*: identifiers for the tasks and components that
         are currently using the socket.
+      * *free*: mask of the cores that are available.
       * *allocated*, *available*: lists of cores that are allocated
         and available.
-      * *cores*: list of :py:class:`.Core` objects belonging to this socket
+      * *cores*: names of the cores belonging to this socket
+      * *slots*: strings ``<socket name>:<core name>`` of the cores
       * *avail_cores*: number of cores that are currently available.
       * *total_cores*: total number of cores that can be allocated on this
         socket.
@@ -182,43 +239,42 @@ class Socket:
         c = number of cores (per node)
         """
         self.name = name
-        self.task_ids = []
-        self.owners = []
-        self.allocated = []
-        self.available = []
-        self.cores = []
+        self.cores = tuple(coreids) if coreids else tuple(range(cps))
+        self.slots = _slots(name, self.cores)
         self.avail_cores = cps
         self.total_cores = cps
-        self.my_tasks = {}  # tid: (owner, cores, num_procs)
-        if coreids:
-            for c in coreids:
-                self.cores.append(Core(c))
-                self.available.append(c)
-        else:
-            for c in range(cps):
-                self.cores.append(Core(c))
-                self.available.append(c)
+        self.free = (1 << len(self.cores)) - 1
+        self.tasks = {}  # tid: (owner, mask, cores)
+
+    @property
+    def task_ids(self):
+        return list(self.tasks)
+
+    @property
+    def owners(self):
+        return [o for o, _, _ in self.tasks.values()]
+
+    @property
+    def allocated(self):
+        return [c for i, c in enumerate(self.cores) if not self.free >> i & 1]
+
+    @property
+    def available(self):
+        return [c for i, c in enumerate(self.cores) if self.free >> i & 1]
 
     def print_cores(self, fname=''):
         """
         Pretty print of state of cores.
         """
-        if fname:
-            for c in self.cores:
-                print("      core:", c.name, end=' ', file=fname)
-                if c.is_available:
-                    print(" - available", file=fname)
-                else:
-                    print(" - task_id:", c.task_id, end=' ', file=fname)
-                    print(" - owner:", c.owner, file=fname)
-        else:
-            for c in self.cores:
-                print("      core:", c.name, end=' ')
-                if c.is_available:
-                    print(" - available")
-                else:
-                    print(" - task_id:", c.task_id, end=' ')
-                    print(" - owner:", c.owner)
+        fname = fname or None
+        for i, c in enumerate(self.cores):
+            print("      core:", c, end=' ', file=fname)
+            if self.free >> i & 1:
+                print(" - available", file=fname)
+            else:
+                tid, o = next((tid, o) for tid, (o, mask, _) in self.tasks.items() if mask >> i & 1)
+                print(" - task_id:", tid, end=' ', file=fname)
+                print(" - owner:", o, file=fname)
 
     def allocate(self, whole, tid, o, num_procs):
         """
@@ -227,31 +283,32 @@ class Socket:
 
           <socket name>:<core name>
         """
-        self.task_ids.append(tid)
-        self.owners.append(o)
-        slots = []
-        k = 0
-
         if whole:
             # fill the whole socket!
-            for c1 in self.cores:
-                self.available.remove(c1.name)
-                slots.append(str(self.name) + ":" +
-                             str(c1.allocate(tid, o)))
-                self.allocated.append(c1.name)
-                k += 1
+            if self.free != (1 << len(self.cores)) - 1:
+                raise RuntimeError("trying to allocate core that is not available")
+            num_procs = len(self.cores)
+        if self.free == (1 << len(self.cores)) - 1 and num_procs >= len(self.cores):
+            slots = list(self.slots)
+            mask = self.free
+            free = 0
         else:
-            for c1 in self.cores:
-                if c1.is_available:
-                    self.available.remove(c1.name)
-                    slots.append(str(self.name) + ":" +
-                                 str(c1.allocate(tid, o)))
-                    self.allocated.append(c1.name)
-                    k += 1
-                if k == num_procs:
-                    break
+            slots = []
+            mask = 0
+            free = self.free
+            while free and len(slots) < num_procs:
+                core = free & -free  # lowest available core
+                free ^= core
+                mask |= core
+                slots.append(self.slots[core.bit_length() - 1])
+        k = len(slots)
+        self.free = free
         self.avail_cores -= k
-        self.my_tasks.update({tid: (o, k, num_procs)})
+        if tid in self.tasks:
+            _, old_mask, old_k = self.tasks[tid]
+            mask |= old_mask
+            k += old_k
+        self.tasks[tid] = (o, mask, k)
         return slots
 
     def release(self, tid):
@@ -259,60 +316,7 @@ class Socket:
         Mark cores that are allocated to task *tid* as available.  Return
         number of cores set to available.
         """
-        o, k, _ = self.my_tasks[tid]
-        self.task_ids.remove(tid)
-        self.owners.remove(o)  # make sure it just removes one instance
-        count = 0
-
-        # release cores
-        for c in self.cores:
-            if c.task_id == tid:
-                self.allocated.remove(c.name)
-                c.release()
-                self.available.append(c.name)
-                count += 1
-        if count != k:
-            print("<<<error>>>")
-        # set avail_cores
+        _, mask, k = self.tasks.pop(tid)
+        self.free |= mask
         self.avail_cores += k
-        return count
-
-
-class Core:
-    """
-    Models a core of a socket.
-
-      * *name*: name of core
-      * *is_available*: boolean value indicating the availability of the core.
-      * *task_id*, *owner*: identifiers of the task and component using the core.
-    """
-
-    def __init__(self, name):
-        self.name = name
-        self.is_available = True
-        self.task_id = -1
-        self.owner = ''
-
-    def allocate(self, tid, o):
-        """
-        Mark core as allocated.
-        """
-        if self.is_available:
-            self.is_available = False
-            self.task_id = tid
-            self.owner = o
-            return self.name
-        else:
-            print("trying to allocate core that is not available")
-            raise RuntimeError("trying to allocate core that is not available")
-
-    def release(self):
-        """
-        Mark core as available.
-        """
-        if self.is_available:
-            print("warning: trying to release core when not in use")
-        else:
-            self.is_available = True
-            self.task_id = -1
-            self.owner = ''
+        return k
@@ -308,6 +308,75 @@ def manual_detection(services):
     return num_nodes, ppn, False, listOfNodes
 
 
+def get_memory_per_node(services):
+    """
+    Return the memory per node in MB: ``MEMORY_PER_NODE`` of the platform
+    config file, else ``SLURM_MEM_PER_NODE`` set by Slurm, else the total
+    memory in ``/proc/meminfo`` of the node running the framework.  Return
+    0 if it is unknown.
+    """
+    mpn = int(services.get_platform_parameter('MEMORY_PER_NODE', silent=True) or 0)
+    if mpn > 0:
+        return mpn
+    try:
+        return int(os.environ['SLURM_MEM_PER_NODE'])
+    except (KeyError, ValueError):
+        pass
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemTotal:'):
+                    return int(line.split()[1]) // 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return 0
+
+
+def expand_nodelist(nodelist):
+    """
+    Return the node names of the Slurm style *nodelist*, e.g.
+    ``nid[0001-0003,0007],login1`` is ``nid0001``, ``nid0002``,
+    ``nid0003``, ``nid0007`` and ``login1``, without calling ``scontrol``.
+    """
+    names = []
+    depth = 0
+    start = 0
+    for i, c in enumerate(nodelist + ','):
+        if c == '[':
+            depth += 1
+        elif c == ']':
+            depth -= 1
+        elif c == ',' and depth == 0:
+            item = nodelist[start:i].strip()
+            start = i + 1
+            if not item:
+                continue
+            if '[' not in item:
+                names.append(item)
+                continue
+            prefix, _, rest = item.partition('[')
+            ranges, _, suffix = rest.partition(']')
+            suffixes = expand_nodelist(suffix) if suffix else ['']
+            for r in ranges.split(','):
+                low, _, high = r.partition('-')
+                for k in range(int(low), int(high or low) + 1):
+                    names.extend(prefix + str(k).zfill(len(low)) + end for end in suffixes)
+    return names
+
+
+def parse_node_list(nodes, ppn):
+    """
+    Return the list of (<node name>, <processes per node>) of *nodes*, in
+    the format of :py:func:`getResourceList`.  *nodes* is a Slurm style
+    node list (see :py:func:`expand_nodelist`), or a list of node names
+    or of (<node name>, <processes per node>) tuples.  The nodes without a
+    number of processes get *ppn*.
+    """
+    if isinstance(nodes, str):
+        nodes = expand_nodelist(nodes)
+    return [tuple(n) if isinstance(n, (list, tuple)) else (n, ppn) for n in nodes]
+
+
 def getResourceList(services, host, partial_nodes=False):
     """
     Using the host information, the resources are detected.  Return list of
@@ -2,21 +2,27 @@
 # Copyright 2006-2022 UT-Battelle, LLC. See LICENSE for more information.
 # -------------------------------------------------------------------------------
 # local version
+import heapq
 import os
 import time
-from collections import namedtuple
+from bisect import bisect_left, insort
+from collections import namedtuple, Counter
 from math import ceil
 from .ipsExceptions import (InsufficientResourcesException,
                             BadResourceRequestException,
                             ResourceRequestMismatchException,
                             GPUResourceRequestMismatchException,
+                            MemoryResourceRequestMismatchException,
                             ResourceRequestUnequalPartitioningException)
 from .ips_es_spec import eventManager
-from .resourceHelper import getResourceList
+from .resourceHelper import getResourceList, get_memory_per_node, parse_node_list
+from .resource_usage import ResourceUsageRecorder
 from .node_structure import Node
 
 Allocation = namedtuple("Allocation",
-                        ["partial_node", "nodelist", "corelist", "ppn", "max_ppn", "cpp", "accurateNodes", "cores_allocated"])
+                        ["partial_node", "nodelist", "corelist", "ppn", "max_ppn", "cpp", "accurateNodes", "cores_allocated", "gpulist"])
+
+PLACEMENT_POLICIES = ('FIRST_FIT', 'PACK', 'SOCKET_LOCAL', 'SPREAD', 'BEST_FIT')
 
 
 class ResourceManager:
@@ -41,21 +47,51 @@ class ResourceManager:
 
         self.accurateNodes = False
         self.node_alloc_mode = None
+        self.placement_policy = 'FIRST_FIT'
 
         self.host = None
 
-        self.reporting_file = None
+        self.usage = None  # resource_usage.ResourceUsageRecorder
 
         # bookkeeping for allocationa and accounting
         self.nodes = {}
         self.num_nodes = 0
-        self.avail_nodes = []
-        self.alloc_nodes = []
+        # ordered sets of node names, avail_nodes maps each node to its
+        # position in the order the nodes are considered for allocations
+        self.avail_nodes = {}
+        self.alloc_nodes = {}
+        self.avail_seq = 0
+        self.seq_nodes = {}  # position in avail_nodes -> node name
+        # capacity indexes, sorted positions in avail_nodes of the nodes
+        # with all their cores, a whole socket, or any core available
+        self.free_index = []
+        self.sock_index = []
+        self.core_index = []
+        self.node_sizes = Counter()  # total cores -> number of nodes
+        # available cores of the nodes and of the sockets with all their
+        # cores available, for the fragmentation of the free cores
+        self.node_free_cores = {}  # node name -> (whole node, whole sockets)
+        self.whole_node_cores = 0
+        self.whole_sock_cores = 0
         self.total_cores = 0
         self.alloc_cores = 0
         self.avail_cores = 0
+        self.total_gpus = 0
+        self.alloc_gpus = 0
+        self.total_mem = 0
+        self.alloc_mem = 0
         self.processes = 0
         self.active_tasks = {}  # tid:(owner, cores, procs)
+        self.task_nodes = {}  # tid: names of the nodes allocated to the task
+        # nodes reserved for a blocked request, left out of the capacity
+        # indexes so that only that request and backfilled tasks use them
+        self.reservation = None  # key of the request holding the reservation
+        self.reserved_nodes = {}  # ordered set of node names
+        self.reserved_count = 0  # number of nodes to reserve
+        # nodes taking no new tasks, left out of the capacity indexes and of
+        # the available cores, and the draining nodes to remove once idle
+        self.draining = set()
+        self.removing = set()
 
         # hardware node topology
         self.cores_per_node = 1
@@ -66,8 +102,10 @@ class ResourceManager:
         self.max_ppn = 1   # the ppn for the whole submission (max ppn allowed by *software*)
         self.ppn = 1  # platform config ppn for the whole IPS
         self.gpn = 0
+        self.mpn = 0  # memory per node in MB, 0 if not tracked
         self.myTopic = None
-        self.service_methods = ['get_allocation', 'release_allocation']
+        self.service_methods = ['get_allocation', 'release_allocation',
+                                'add_node_resources', 'drain_nodes', 'remove_nodes']
 
         self.fwk.register_service_handler(self.service_methods,
                                           getattr(self, 'process_service_request'))
@@ -93,12 +131,15 @@ class ResourceManager:
         self.TM = taskMngr
         self.CM = configMngr
         self.node_alloc_mode = self.CM.get_platform_parameter('NODE_ALLOCATION_MODE')
+        placement_policy = self.CM.get_platform_parameter('PLACEMENT_POLICY', silent=True)
+        if placement_policy in PLACEMENT_POLICIES:
+            self.placement_policy = placement_policy
 
-        rfile_name = os.path.join(self.CM.sim_map[self.CM.fwk_sim_name].sim_root, "resource_usage")
+        rfile_name = os.path.join(self.CM.sim_map[self.CM.fwk_sim_name].sim_root, "resource_usage.csv")
         # SIMYAN: try to safely make the directory...
         os.makedirs(self.CM.sim_map[self.CM.fwk_sim_name].sim_root, exist_ok=True)
 
-        self.reporting_file = open(rfile_name, "w")
+        self.usage = ResourceUsageRecorder(rfile_name)
 
         # -------------------------------
         # check cmd line resource spec
@@ -183,6 +224,11 @@ class ResourceManager:
             # -------------------------------
             self.gpn = int(self.CM.get_platform_parameter('GPUS_PER_NODE'))
 
+            # -------------------------------
+            # set memory per node
+            # -------------------------------
+            self.mpn = get_memory_per_node(self.CM)
+
         # -------------------------------
         # populate nodes
         # -------------------------------
@@ -192,42 +238,68 @@ class ResourceManager:
         self.begin_RM_report()
 
     def process_service_request(self, msg):
-        pass
+        """
+        Invoke the method of the service request *msg* with its arguments.
+        """
+        return getattr(self, msg.target_method)(*msg.args)
 
     def begin_RM_report(self):
         """
-        Print header information for resource usage reporting file.
+        Record the resources in the resource usage file.
         """
-        print("# host:", self.host, file=self.reporting_file)
-        print("# total nodes:", self.num_nodes, file=self.reporting_file)
-        print("# processors per node:", self.ppn, file=self.reporting_file)
-        print("using accurate nodes:", self.accurateNodes, file=self.reporting_file)
-        print("# time (in seconds since the | available | allocated | percent allocated | processes | percent used | notes ", file=self.reporting_file)
-        print("#   resource manager started |           |           |                   |           |              |", file=self.reporting_file)
-        print("#-----------------------------------------------------------------------------------------------------------", file=self.reporting_file)
-        self.report_RM_status('initial state of resources')
+        if self.usage is None:
+            return
+        self.usage.begin({'host': self.host,
+                          'total_nodes': self.num_nodes,
+                          'ppn': self.ppn,
+                          'accurate_nodes': self.accurateNodes,
+                          'placement_policy': self.placement_policy})
+        self.report_RM_status('initial state of resources', 'init')
 
-    def report_RM_status(self, notes=""):
+    def report_RM_status(self, notes="", event='note', task_id=-1):
         """
-        Print current RM status to the reporting_file ("resource_usage")
+        Record current RM status in the resource usage file
+        ("resource_usage.csv"), see :mod:`ipsframework.resource_usage`.
         Entries consist of:
 
          - time in seconds since beginning of time (__init__ of RM)
+         - # cores, GPUs and MB of memory of the nodes
          - # cores that are available
          - # cores that are allocated
-         - % allocated cores
          - # processes launched by task
-         - % cores used by processes
+         - % available cores on partially allocated nodes (see :py:meth:`fragmentation`)
+         - % available cores on partially allocated sockets
+         - # GPUs allocated
+         - MB of memory allocated
+         - *task_id* of the task allocated or released, -1 otherwise
+         - *event*, the kind of event, one of :data:`resource_usage.EVENTS`
          - notes (a description of the event that changed the resource usage)
         """
-        print(" %27.5f |" % (time.time() - self.rm_start_of_time), end=' ', file=self.reporting_file)
-        print(" %8d |" % self.avail_cores, end=' ', file=self.reporting_file)
-        print(" %8d |" % self.alloc_cores, end=' ', file=self.reporting_file)
-        print(" %16.2f |" % (100 * (float(self.alloc_cores) / self.total_cores)), end=' ', file=self.reporting_file)
-        print(" %8d |" % self.processes, end=' ', file=self.reporting_file)
-        print(" %10.2f  # " % (100 * (float(self.processes) / self.total_cores)), end=' ', file=self.reporting_file)
-        print(notes, file=self.reporting_file)
-        self.reporting_file.flush()
+        if self.usage is None:
+            return
+        node_frag, sock_frag = self.fragmentation()
+        self.usage.record(round(time.time() - self.rm_start_of_time, 5), self.total_cores, self.total_gpus,
+                          self.total_mem, self.avail_cores, self.alloc_cores,
+                          self.processes, round(node_frag, 4), round(sock_frag, 4), self.alloc_gpus,
+                          self.alloc_mem, task_id, event, notes)
+
+    def close_report(self):
+        """
+        Write the buffered records of the resource usage file.
+        """
+        if self.usage is not None:
+            self.usage.close()
+
+    def fragmentation(self):
+        """
+        Return the percentages of the available cores that are on partially
+        allocated nodes, and on partially allocated sockets.  These cores
+        cannot be used by whole node, or whole socket, requests.
+        """
+        if self.avail_cores <= 0:
+            return 0.0, 0.0
+        return (100 * (1 - self.whole_node_cores / self.avail_cores),
+                100 * (1 - self.whole_sock_cores / self.avail_cores))
 
     def printRMState(self):
         """
@@ -245,7 +317,9 @@ class ResourceManager:
         :py:meth:`.initialize` to initialize ``self.nodes``.
         May be used to add nodes to a dynamic allocation in the future.
 
-        *listOfNodes* is a list of tuples (*node name*, *cores*).
+        *listOfNodes* is a list of tuples (*node name*, *cores*).  Each node
+        has ``self.gpn`` GPUs and ``self.mpn`` MB of memory.  Nodes added
+        while the simulation runs go through :py:meth:`add_node_resources`.
         ``self.nodes`` is a dictionary where the keys are the *node names* and
         the values are :py:class:`node_structure.Node` structures.
 
@@ -255,19 +329,267 @@ class ResourceManager:
         for n, p in listOfNodes:
             if n not in self.nodes:
                 self.nodes.update({n: Node(n, self.sockets_per_node,
-                                           self.cores_per_node, p)})
+                                           self.cores_per_node, p, self.gpn, self.mpn)})
                 self.num_nodes += 1
-                self.avail_nodes.append(n)
+                self.total_gpus += self.gpn
+                self.total_mem += self.mpn
+                self._add_avail_node(n)
+                self._index_node(n)
+                self.node_sizes[self.nodes[n].total_cores] += 1
                 if isinstance(p, int):
                     tot_cores += p
                 else:  # p is a list of core names
                     tot_cores += len(p)
         return tot_cores
 
+    def _add_avail_node(self, n):
+        """
+        Append node *n* to ``self.avail_nodes``.
+        """
+        self.avail_seq += 1
+        self.avail_nodes[n] = self.avail_seq
+        self.seq_nodes[self.avail_seq] = n
+
+    def _remove_avail_node(self, n):
+        """
+        Remove node *n* from ``self.avail_nodes``.
+        """
+        del self.seq_nodes[self.avail_nodes.pop(n)]
+
+    def _index_node(self, n, old_seq=None):
+        """
+        Update the capacity indexes after the allocation or release of cores
+        of node *n*, which was at position *old_seq* in ``self.avail_nodes``
+        before.
+        """
+        node = self.nodes[n]
+        seq = self.avail_nodes.get(n)
+        node_cores = node.total_cores if node.avail_cores == node.total_cores else 0
+        sock_cores = sum(sock.total_cores for sock in node.sockets if sock.avail_cores == sock.total_cores)
+        if n in self.draining:
+            node_cores = sock_cores = 0
+            seq = None
+        old_node_cores, old_sock_cores = self.node_free_cores.get(n, (0, 0))
+        self.node_free_cores[n] = (node_cores, sock_cores)
+        self.whole_node_cores += node_cores - old_node_cores
+        self.whole_sock_cores += sock_cores - old_sock_cores
+        if n in self.reserved_nodes:
+            seq = None
+        for index, member in ((self.free_index, node_cores > 0),
+                              (self.sock_index, sock_cores > 0),
+                              (self.core_index, node.avail_cores > 0)):
+            if old_seq is not None:
+                i = bisect_left(index, old_seq)
+                if i < len(index) and index[i] == old_seq:
+                    del index[i]
+            if seq is not None and member:
+                insort(index, seq)
+
+    def add_node_resources(self, nodes, ppn=0):
+        """
+        Add *nodes* to the resources while the simulation runs, and retry
+        the blocked requests.  *nodes* is a node list parsed by
+        :py:func:`resourceHelper.parse_node_list`, with *ppn* processes per
+        node, by default ``self.ppn``.  Draining nodes of *nodes* take new
+        tasks again.  Task launch agents are started on the new nodes.
+
+        Return the number of cores added.
+        """
+        listOfNodes = parse_node_list(nodes, ppn or self.ppn)
+        cores = 0
+        for n, _ in listOfNodes:
+            if n in self.draining:
+                self.draining.discard(n)
+                self.removing.discard(n)
+                self.avail_cores += self.nodes[n].avail_cores
+                cores += self.nodes[n].avail_cores
+                self._index_node(n, self.avail_nodes.get(n))
+        new_nodes = [(n, p) for n, p in listOfNodes if n not in self.nodes]
+        added = self.add_nodes(new_nodes)
+        self.total_cores += added
+        self.avail_cores += added
+        cores += added
+        if new_nodes and self.TM is not None:
+            self.TM.start_agents([n for n, _ in new_nodes])
+        self.report_RM_status('added %d nodes' % len(listOfNodes), 'add')
+        self.fwk.notify_capacity_changed()
+        return cores
+
+    def drain_nodes(self, names):
+        """
+        Stop allocating the nodes of the node list *names*, see
+        :py:func:`resourceHelper.parse_node_list`.  The tasks running on
+        them continue, and their cores are not available once released.
+        The nodes are returned to use by :py:meth:`add_node_resources`.
+
+        Return the number of cores no longer available.
+        """
+        cores = 0
+        names = [n for n, _ in parse_node_list(names, 0)]
+        unknown = [n for n in names if n not in self.nodes]
+        if unknown:
+            raise ValueError('Unknown nodes: %s' % ', '.join(unknown))
+        for n in names:
+            if n not in self.draining:
+                self.draining.add(n)
+                self.reserved_nodes.pop(n, None)
+                self.avail_cores -= self.nodes[n].avail_cores
+                cores += self.nodes[n].avail_cores
+                self._index_node(n, self.avail_nodes.get(n))
+        self.report_RM_status('draining %d nodes' % len(names), 'drain')
+        if self.reservation is not None:
+            self._reserve(sorted(self.avail_nodes, key=lambda n: -self.nodes[n].avail_cores))
+        self.fwk.notify_capacity_changed()
+        return cores
+
+    def remove_nodes(self, names):
+        """
+        Drain the nodes of the node list *names*, and remove them from the
+        resources once the tasks running on them finish.  The blocked
+        requests that no longer fit on the remaining nodes fail.
+
+        Return the names of the nodes removed now.
+        """
+        self.drain_nodes(names)
+        removed = []
+        for n, _ in parse_node_list(names, 0):
+            if self.nodes[n].task_ids:
+                self.removing.add(n)
+            else:
+                self._remove_node(n)
+                removed.append(n)
+        self.report_RM_status('removed %d nodes' % len(removed), 'remove')
+        self.fwk.notify_capacity_changed()
+        return removed
+
+    def _remove_node(self, n):
+        """
+        Remove the drained idle node *n* from the resources.
+        """
+        node = self.nodes.pop(n)
+        if n in self.avail_nodes:
+            self._remove_avail_node(n)
+        self.alloc_nodes.pop(n, None)
+        del self.node_free_cores[n]
+        self.draining.discard(n)
+        self.removing.discard(n)
+        self.num_nodes -= 1
+        self.total_cores -= node.total_cores
+        self.total_gpus -= node.total_gpus
+        self.total_mem -= node.total_mem
+        self.node_sizes[node.total_cores] -= 1
+        if not self.node_sizes[node.total_cores]:
+            del self.node_sizes[node.total_cores]
+
+    def reserve_nodes(self, key, nproc, task_ppn=0):
+        """
+        Reserve nodes for the blocked request *key* of *nproc* processes
+        with *task_ppn* processes per node, enough to run it once the tasks
+        running on them finish.  The nodes with available cores are reserved
+        now, the others as their cores are released.  Reserved nodes are
+        only used by allocations with *use_reservation* set, until
+        :py:meth:`cancel_reservation` is called.
+        """
+        self.cancel_reservation()
+        ppn = min(task_ppn if task_ppn > 0 else self.ppn, self.max_ppn, nproc)
+        self.reservation = key
+        self.reserved_count = min(ceil(float(nproc) / ppn), self.num_nodes)
+        self._reserve(sorted(self.avail_nodes, key=lambda n: -self.nodes[n].avail_cores))
+        self.report_RM_status("reserved %d of %d nodes for a blocked request of %d processes" %
+                              (len(self.reserved_nodes), self.reserved_count, nproc), 'reserve')
+
+    def cancel_reservation(self):
+        """
+        Return the reserved nodes to the other requests.
+        """
+        reserved = self.reserved_nodes
+        self.reservation = None
+        self.reserved_nodes = {}
+        self.reserved_count = 0
+        for n in reserved:
+            self._index_node(n, self.avail_nodes.get(n))
+
+    def reserved_tasks(self):
+        """
+        Return the ids of the tasks running on the reserved nodes, which
+        must finish before the request holding the reservation starts.
+        """
+        return {task_id for n in self.reserved_nodes for task_id in self.nodes[n].task_ids}
+
+    def _reserve(self, names):
+        """
+        Add the nodes of *names* with available cores to the reservation,
+        up to ``self.reserved_count`` nodes.
+        """
+        for n in names:
+            if len(self.reserved_nodes) >= self.reserved_count:
+                break
+            if n in self.nodes and n not in self.reserved_nodes and n not in self.draining \
+                    and self.nodes[n].avail_cores > 0:
+                self.reserved_nodes[n] = None
+                self._index_node(n, self.avail_nodes.get(n))
+
+    def _indexed_nodes(self, index, usable=None):
+        """
+        Iterate over the nodes of capacity *index* in the order of the
+        placement policy.  *usable* returns the number of cores of a node
+        that the request can use, up to the processes per node.
+
+          * ``FIRST_FIT``: the order of ``self.avail_nodes``.
+          * ``PACK``: the nodes that can take the most processes first, so
+            the task uses the fewest nodes.
+          * ``BEST_FIT``: as ``PACK``, then the nodes with the fewest
+            available cores first, which keeps the empty nodes for whole
+            node requests.
+          * ``SOCKET_LOCAL``: the nodes with a socket that can take the most
+            processes first, then as ``BEST_FIT``.
+          * ``SPREAD``: the nodes with the most available cores first.
+
+        Ties are broken by the order of ``self.avail_nodes``.  Policies
+        other than ``FIRST_FIT`` visit all the nodes of *index*.
+        """
+        policy = self.placement_policy
+        if policy == 'FIRST_FIT' or usable is None:
+            for seq in index:
+                yield self.seq_nodes[seq]
+            return
+        keys = []
+        for seq in index:
+            node = self.nodes[self.seq_nodes[seq]]
+            if policy == 'SPREAD':
+                keys.append((-node.avail_cores, seq))
+                continue
+            cores = usable(node)
+            if policy == 'PACK':
+                keys.append((-cores, seq))
+            elif policy == 'BEST_FIT':
+                keys.append((-cores, node.avail_cores, seq))
+            else:
+                local_cores = min(cores, max(sock.avail_cores for sock in node.sockets))
+                keys.append((-local_cores, -cores, node.avail_cores, seq))
+        heapq.heapify(keys)
+        while keys:
+            yield self.seq_nodes[heapq.heappop(keys)[-1]]
+
+    def _impossible_request(self, nproc, ppn):
+        """
+        Return why a request of *nproc* processes with *ppn* processes per
+        node does not fit now: ``insufficient`` if it fits once resources
+        are released, ``bad`` or ``mismatch`` if it never fits.
+        """
+        # check to see if it is possible to satisfy the request
+        tot_cap = sum(count * min(ppn, total_cores) for total_cores, count in self.node_sizes.items())
+        if tot_cap >= nproc:
+            return "insufficient"
+        if self.total_cores < nproc:
+            return "bad"
+        return "mismatch"
+
     # RM getAllocation
     # pylint: disable=inconsistent-return-statements
     def get_allocation(self, comp_id, nproc, task_id,
-                       whole_nodes, whole_socks, task_ppn=0, task_cpp=0, task_gpp=0):
+                       whole_nodes, whole_socks, task_ppn=0, task_cpp=0, task_gpp=0, task_mem=0,
+                       use_reservation=False):
         """
         Traverse available nodes to return:
 
@@ -285,6 +607,8 @@ class ResourceManager:
           * *nodes*: list of node names
           * *node_file_entries*: list of (node, corelist) tuples, where *corelist* is a list of core names.
              Core names are integers from 0 to n-1 where n is the number of cores on a node.
+          * *gpulist*: list of (node, gpus) tuples, where *gpus* is the list of the ids of the GPUs of the
+             node allocated to the task, *task_gpp* for each process on the node, empty if no GPUs are requested.
           * *ppn*: processes per node for launching the task
           * *max_ppn*: processes that can be launched
           * *accurateNodes*: ``True`` if *nodes* uses the actual names of the nodes, ``False`` otherwise.
@@ -296,7 +620,26 @@ class ResourceManager:
           * *task_id*: task identifier from TM (int)
           * *method*: name of method (string)
           * *task_ppn*: ppn for this task (optional) (int)
+          * *task_gpp*: GPUs per process for this task (optional) (int)
+          * *task_mem*: memory in MB per process for this task (optional) (int), only checked
+            when the memory per node is known
+          * *use_reservation*: ``True`` if the task may use the reserved nodes, see
+            :py:meth:`reserve_nodes` (optional) (bool)
         """
+        if use_reservation and self.reserved_nodes:
+            # index the reserved nodes for this allocation only
+            reserved = self.reserved_nodes
+            self.reserved_nodes = {}
+            for n in reserved:
+                self._index_node(n, self.avail_nodes.get(n))
+            try:
+                return self.get_allocation(comp_id, nproc, task_id, whole_nodes, whole_socks,
+                                           task_ppn, task_cpp, task_gpp, task_mem)
+            finally:
+                self.reserved_nodes = reserved
+                for n in reserved:
+                    self._index_node(n, self.avail_nodes.get(n))
+
         # get the component requirements for all of the components
 
         # set ppn for this task
@@ -322,6 +665,15 @@ class ResourceManager:
             whole_nodes = True
             whole_socks = True
 
+        if not self.check_gpus(ppn, task_gpp):
+            raise GPUResourceRequestMismatchException(comp_id, task_id,
+                                                      ppn, task_gpp,
+                                                      self.gpn)
+        if not self.check_memory(ppn, task_mem):
+            raise MemoryResourceRequestMismatchException(comp_id, task_id,
+                                                         ppn, task_mem,
+                                                         self.mpn)
+
         # Are there enough cores to satisfy the request?
         # Returns the list of nodes that fit the bill
         allocation_possible = False
@@ -342,9 +694,9 @@ class ResourceManager:
                     cpp = max_cpp
 
         elif whole_socks:
-            allocation_possible, nodes = self.check_whole_sock_cap(nproc, ppn)
+            allocation_possible, nodes = self.check_whole_sock_cap(nproc, ppn, task_gpp, task_mem)
         else:
-            allocation_possible, nodes = self.check_core_cap(nproc, ppn)
+            allocation_possible, nodes = self.check_core_cap(nproc, ppn, task_gpp, task_mem)
 
         if not allocation_possible:
             if nodes == "bad":
@@ -365,16 +717,12 @@ class ResourceManager:
                                                                   self.total_cores,
                                                                   self.max_ppn)
         else:
-            if not self.check_gpus(ppn, task_gpp):
-                raise GPUResourceRequestMismatchException(comp_id, task_id,
-                                                          ppn, task_gpp,
-                                                          self.gpn)
-
             try:
                 self.processes += nproc
                 cores_allocated = 0
                 alloc_procs = 0
                 node_file_entries = []
+                gpu_entries = []
                 if whole_nodes:
                     # -------------------------------
                     # whole node allocation
@@ -384,13 +732,17 @@ class ResourceManager:
                                                               whole_socks,
                                                               task_id, comp_id,
                                                               ppn)
-                        self.avail_nodes.remove(n)
-                        self.alloc_nodes.append(n)
+                        self._allocate_node_resources(n, task_id, ppn, task_gpp, task_mem, gpu_entries)
+                        old_seq = self.avail_nodes[n]
+                        self._remove_avail_node(n)
+                        self.alloc_nodes[n] = None
+                        self._index_node(n, old_seq)
                         node_file_entries.append((n, cores))
                         cores_allocated += procs
                     self.alloc_cores += cores_allocated
                     self.avail_cores -= cores_allocated
                     self.active_tasks.update({task_id: (comp_id, nproc, cores_allocated)})
+                    self.task_nodes[task_id] = [n for n, _ in node_file_entries]
                 elif whole_socks:
                     # -------------------------------
                     # whole sock allocation
@@ -398,23 +750,27 @@ class ResourceManager:
                     for n in nodes:
                         node = self.nodes[n]
                         if node.avail_cores > 0:
-                            to_alloc = min([ppn, node.avail_cores,
+                            to_alloc = min([ppn, self._avail_procs(node, task_gpp, task_mem),
                                             nproc - alloc_procs])
                             procs, cores = node.allocate(whole_nodes,
                                                          whole_socks,
                                                          task_id, comp_id,
                                                          to_alloc)
+                            self._allocate_node_resources(n, task_id, min(to_alloc, len(cores)), task_gpp, task_mem, gpu_entries)
                             cores_allocated += len(cores)
                             alloc_procs = min([ppn, len(cores)])
                             node_file_entries.append((n, cores))
+                            old_seq = self.avail_nodes.get(n)
                             if n not in self.alloc_nodes:
-                                self.alloc_nodes.append(n)
+                                self.alloc_nodes[n] = None
                                 if node.avail_cores - node.total_cores == 0:
-                                    self.avail_nodes.remove(n)
+                                    self._remove_avail_node(n)
+                            self._index_node(n, old_seq)
 
                     self.alloc_cores += cores_allocated
                     self.avail_cores -= cores_allocated
                     self.active_tasks.update({task_id: (comp_id, nproc, cores_allocated)})
+                    self.task_nodes[task_id] = [n for n, _ in node_file_entries]
                 else:
                     # -------------------------------
                     # single core allocation
@@ -422,23 +778,28 @@ class ResourceManager:
                     for n in nodes:
                         node = self.nodes[n]
                         if node.avail_cores > 0:
-                            to_alloc = min([ppn, node.avail_cores,
+                            to_alloc = min([ppn, self._avail_procs(node, task_gpp, task_mem),
                                             nproc - cores_allocated])
                             self.fwk.debug("allocate task_id %d node %s %d cores" % (task_id, n, to_alloc))
                             procs, cores = node.allocate(whole_nodes,
                                                          whole_socks,
                                                          task_id, comp_id,
-                                                         to_alloc)
+                                                         to_alloc,
+                                                         self.placement_policy == 'SOCKET_LOCAL')
+                            self._allocate_node_resources(n, task_id, procs, task_gpp, task_mem, gpu_entries)
                             cores_allocated += procs
                             node_file_entries.append((n, cores))
+                            old_seq = self.avail_nodes.get(n)
                             if n not in self.alloc_nodes:
-                                self.alloc_nodes.append(n)
+                                self.alloc_nodes[n] = None
                                 if node.avail_cores - node.total_cores == 0:
-                                    self.avail_nodes.remove(n)
+                                    self._remove_avail_node(n)
+                            self._index_node(n, old_seq)
 
                     self.alloc_cores += cores_allocated
                     self.avail_cores -= cores_allocated
                     self.active_tasks.update({task_id: (comp_id, nproc, cores_allocated)})
+                    self.task_nodes[task_id] = [n for n, _ in node_file_entries]
             except Exception:
                 print("Available Nodes:")
                 for nm in self.avail_nodes:
@@ -458,7 +819,7 @@ class ResourceManager:
                 raise
 
             if whole_nodes:
-                self.report_RM_status("allocation for task %d using whole nodes" % task_id)
+                self.report_RM_status("allocation for task %d using whole nodes" % task_id, 'allocate', task_id)
                 return Allocation(partial_node=not whole_nodes,
                                   nodelist=nodes,
                                   corelist=None,
@@ -466,9 +827,10 @@ class ResourceManager:
                                   max_ppn=self.max_ppn,
                                   cpp=cpp,
                                   accurateNodes=self.accurateNodes,
-                                  cores_allocated=cores_allocated)
+                                  cores_allocated=cores_allocated,
+                                  gpulist=gpu_entries)
             else:
-                self.report_RM_status("allocation for task %d using partial nodes" % task_id)
+                self.report_RM_status("allocation for task %d using partial nodes" % task_id, 'allocate', task_id)
                 return Allocation(partial_node=not whole_nodes,
                                   nodelist=nodes,
                                   corelist=node_file_entries,
@@ -476,7 +838,8 @@ class ResourceManager:
                                   max_ppn=self.max_ppn,
                                   cpp=None,
                                   accurateNodes=self.accurateNodes,
-                                  cores_allocated=cores_allocated)
+                                  cores_allocated=cores_allocated,
+                                  gpulist=gpu_entries)
 
     def check_whole_node_cap(self, nproc, ppn):
         """
@@ -490,7 +853,7 @@ class ResourceManager:
         whole_cap = 0
         nodes = []
         try:
-            for n in self.avail_nodes:
+            for n in self._indexed_nodes(self.free_index):
                 node = self.nodes[n]
                 if node.avail_cores == node.total_cores and node.avail_cores >= ppn:
                     whole_cap += ppn
@@ -503,22 +866,13 @@ class ResourceManager:
         except Exception:
             self.fwk.exception("problem in RM.check_whole_node_cap")
             raise
-        # check to see if it is possible to satisfy the request
-        tot_cap = 0
-        for n in self.nodes.values():
-            tot_cap += min([ppn, n.total_cores])
-            if tot_cap >= nproc:
-                return False, "insufficient"
+        return False, self._impossible_request(nproc, ppn)
 
-        if self.total_cores < nproc:
-            return False, "bad"
-        else:
-            return False, "mismatch"
-
-    def check_whole_sock_cap(self, nproc, ppn):
+    def check_whole_sock_cap(self, nproc, ppn, gpp=0, mem=0):
         """
         Determine if it is currently possible to allocate *nproc* processes
-        with a ppn of *ppn* and whole sockets.  Return ``True`` and list of
+        with a ppn of *ppn*, *gpp* GPUs and *mem* MB of memory per process
+        and whole sockets.  Return ``True`` and list of
         nodes to use if successful.  Return ``False`` and empty list if there
         are not enough available resources at this time, but it is possible to
         eventually satisfy the request.  Exception raised if the request can
@@ -527,42 +881,38 @@ class ResourceManager:
         nodes = []
         k = 0
         try:
-            for n in self.avail_nodes:
+            def usable(node):
+                return min(ppn, self._avail_procs(node, gpp, mem),
+                           sum(sock.total_cores for sock in node.sockets if sock.avail_cores == sock.total_cores))
+
+            for n in self._indexed_nodes(self.sock_index, usable):
                 node = self.nodes[n]
                 sk = 0
                 for sock in node.sockets:
                     if sock.total_cores == sock.avail_cores:
                         # whole socket
-                        if n not in nodes:
-                            nodes.append(n)
                         if sock.avail_cores > ppn:
                             sk += ppn
                         else:
                             sk += sock.avail_cores
                         if sk >= ppn:
                             break
+                sk = min(sk, self._avail_procs(node, gpp, mem))
+                if sk > 0:
+                    nodes.append(n)
                 k += sk
                 if k >= nproc:
                     return True, nodes
         except Exception:
             self.fwk.exception("problem in RM.check_whole_sock_cap")
             raise
-        # check to see if it is possible to satisfy the request
-        tot_cap = 0
-        for n in self.nodes.values():
-            tot_cap += min([ppn, n.total_cores])
-            if tot_cap >= nproc:
-                return False, "insufficient"
+        return False, self._impossible_request(nproc, ppn)
 
-        if self.total_cores < nproc:
-            return False, "bad"
-        else:
-            return False, "mismatch"
-
-    def check_core_cap(self, nproc, ppn):
+    def check_core_cap(self, nproc, ppn, gpp=0, mem=0):
         """
         Determine if it is currently possible to allocate *nproc* processes
-        with a ppn of *ppn* without further restrictions..  Return ``True``
+        with a ppn of *ppn*, *gpp* GPUs and *mem* MB of memory per process
+        without further restrictions..  Return ``True``
         and list of nodes to use if successful.  Return ``False`` and empty
         list if there are not enough available resources at this time, but it
         is possible to eventually satisfy the request.  Exception raised if
@@ -571,44 +921,65 @@ class ResourceManager:
         nodes = []
         k = 0
         try:
-            for n in self.avail_nodes:
-                node = self.nodes[n]
+            for n in self._indexed_nodes(self.core_index, lambda node: min(ppn, nproc, self._avail_procs(node, gpp, mem))):
+                avail = self._avail_procs(self.nodes[n], gpp, mem)
                 if nproc - k < ppn:
-                    if node.avail_cores >= nproc - k:
+                    if avail >= nproc - k:
                         k = nproc
                         nodes.append(n)
                         self.fwk.debug("found nodes (%s) and returning" % nodes)
                         return True, nodes
-                    elif node.avail_cores > 0:
-                        k += node.avail_cores
+                    elif avail > 0:
+                        k += avail
                         nodes.append(n)
                 else:
-                    if node.avail_cores >= ppn:
+                    if avail >= ppn:
                         k += ppn
                         nodes.append(n)
-                    elif node.avail_cores > 0:
-                        k += node.avail_cores
+                    elif avail > 0:
+                        k += avail
                         nodes.append(n)
                 if k >= nproc:
                     return True, nodes
         except Exception:
             self.fwk.exception("problem in RM.check_core_cap")
             raise
-        # check to see if it is possible to satisfy the request
-        tot_cap = 0
-        for n in self.nodes.values():
-            tot_cap += min([ppn, n.total_cores])
-            if tot_cap >= nproc:
-                return False, "insufficient"
-
-        if self.total_cores < nproc:
-            return False, "bad"
-        else:
-            return False, "mismatch"
+        return False, self._impossible_request(nproc, ppn)
 
     def check_gpus(self, ppn, task_gpp):
         return ppn * task_gpp <= self.gpn
 
+    def check_memory(self, ppn, task_mem):
+        return not self.mpn or ppn * task_mem <= self.mpn
+
+    @staticmethod
+    def _avail_procs(node, gpp, mem=0):
+        """
+        Return the number of processes using *gpp* GPUs and *mem* MB of
+        memory each that fit in the available cores, GPUs and memory of
+        *node*.
+        """
+        procs = node.avail_cores
+        if gpp and node.total_gpus:
+            procs = min(procs, node.avail_gpus // gpp)
+        if mem and node.total_mem:
+            procs = min(procs, node.avail_mem // mem)
+        return procs
+
+    def _allocate_node_resources(self, n, task_id, procs, gpp, mem, gpu_entries):
+        """
+        Allocate the GPUs and memory of *procs* processes using *gpp* GPUs
+        and *mem* MB of memory each on node *n* to task *task_id*, and append
+        the GPUs to *gpu_entries*.
+        """
+        node = self.nodes[n]
+        if gpp and node.total_gpus:
+            gpu_entries.append((n, node.allocate_gpus(task_id, procs * gpp)))
+            self.alloc_gpus += procs * gpp
+        if mem and node.total_mem:
+            node.allocate_memory(task_id, procs * mem)
+            self.alloc_mem += procs * mem
+
     # RM releaseAllocation
     def release_allocation(self, task_id, status):
         """
@@ -617,22 +988,34 @@ class ResourceManager:
         failures and implement task relaunch strategies.
         """
 
-        o, nproc, num_cores = self.active_tasks[task_id]
-        tot_avc = 0
-        for n, node in self.nodes.items():
-            if task_id in node.task_ids:
-                node.release(task_id, o)
-                if node.avail_cores > 0 and n not in self.avail_nodes:
-                    self.avail_nodes.append(n)
-                if node.avail_cores == node.total_cores:
-                    self.alloc_nodes.remove(n)
-            tot_avc += node.avail_cores
+        o, nproc, num_cores = self.active_tasks.pop(task_id)
+        released = self.task_nodes.pop(task_id)
+        drained_cores = 0
+        for n in released:
+            node = self.nodes[n]
+            avail_gpus, avail_mem, avail_cores = node.avail_gpus, node.avail_mem, node.avail_cores
+            node.release(task_id, o)
+            if n in self.draining:
+                drained_cores += node.avail_cores - avail_cores
+            self.alloc_gpus -= node.avail_gpus - avail_gpus
+            self.alloc_mem -= node.avail_mem - avail_mem
+            old_seq = self.avail_nodes.get(n)
+            if node.avail_cores > 0 and n not in self.avail_nodes:
+                self._add_avail_node(n)
+            if node.avail_cores == node.total_cores:
+                del self.alloc_nodes[n]
+            self._index_node(n, old_seq)
+            if n in self.removing and not node.task_ids:
+                self._remove_node(n)
 
-        self.avail_cores += num_cores
+        self.avail_cores += num_cores - drained_cores
         self.alloc_cores -= num_cores
         self.processes -= nproc
+        if self.reservation is not None:
+            self._reserve(released)
 
-        self.report_RM_status('released nodes for task %d' % task_id)
+        self.report_RM_status('released nodes for task %d' % task_id, 'release', task_id)
+        self.fwk.notify_resources_released()
 
         return True
 
@@ -0,0 +1,156 @@
+# -------------------------------------------------------------------------------
+# Copyright 2006-2022 UT-Battelle, LLC. See LICENSE for more information.
+# -------------------------------------------------------------------------------
+"""
+Time series of the resource usage of the resource manager, recorded to the
+``resource_usage.csv`` file of the simulation.  The records are buffered
+and written in chunks, so that allocations and releases do not wait for
+the file.  The file starts with ``#`` lines of the *key: value* metadata of
+the resources, then a CSV header row of :data:`FIELDS` and one row per
+event.
+
+:func:`load` returns the columns as arrays for plotting, and the file is
+converted to the ``resource_usage`` text format of previous versions
+with::
+
+    python -m ipsframework.utils.resource_usage_text resource_usage.csv > resource_usage
+"""
+import atexit
+import csv
+import time
+from array import array
+
+#: Columns of the records: time in seconds since the resource manager
+#: started, total cores, GPUs and memory in MB of the nodes, available and
+#: allocated cores, processes, percentages of the available cores on
+#: partially allocated nodes and sockets, allocated GPUs and memory, task
+#: id (-1 if none), kind of event and notes
+FIELDS = ('time', 'total_cores', 'total_gpus', 'total_mem', 'avail_cores', 'alloc_cores', 'processes',
+          'node_frag', 'sock_frag', 'alloc_gpus', 'alloc_mem', 'task_id', 'event', 'notes')
+#: Kinds of events
+EVENTS = ('init', 'allocate', 'release', 'reserve', 'add', 'drain', 'remove', 'note')
+#: Metadata of the resources, before the records
+METADATA = ('host', 'total_nodes', 'ppn', 'accurate_nodes', 'placement_policy')
+
+_FLOAT_FIELDS = ('time', 'node_frag', 'sock_frag')
+_STR_FIELDS = ('event', 'notes')
+
+
+class ResourceUsageRecorder:
+    """
+    Buffered writer of the resource usage records to *file_name*.  The
+    buffer is written when it holds *buffer_size* records, when a record is
+    added *flush_interval* seconds after the last write, and on
+    :meth:`close`, which is also called at exit.
+    """
+
+    def __init__(self, file_name, buffer_size=1000, flush_interval=10.0):
+        self.file_name = file_name
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.buffer = []
+        self.last_flush = time.time()
+        self.file = open(file_name, 'w', newline='')
+        self.writer = csv.writer(self.file)
+        atexit.register(self.close)
+
+    def begin(self, metadata):
+        """
+        Write the *metadata* dictionary of the resources, and the header
+        row of the records.
+        """
+        for key in METADATA:
+            self.file.write(f'# {key}: {metadata.get(key, "")}\n')
+        self.writer.writerow(FIELDS)
+
+    def record(self, *values):
+        """
+        Add a record of the values of :data:`FIELDS`.
+        """
+        self.buffer.append(values)
+        if len(self.buffer) >= self.buffer_size or time.time() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """
+        Write the buffered records to the file.
+        """
+        if self.file.closed:
+            self.buffer = []
+            return
+        self.writer.writerows(self.buffer)
+        self.buffer = []
+        self.file.flush()
+        self.last_flush = time.time()
+
+    def close(self):
+        """
+        Write the buffered records and close the file.
+        """
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+        atexit.unregister(self.close)
+
+
+def load(file_name):
+    """
+    Return the metadata dictionary and the columns of the records of the
+    resource usage file *file_name*, a dictionary mapping each of
+    :data:`FIELDS` to an :class:`array.array` of its values, or a list for
+    the *event* and *notes* columns.
+    """
+    metadata = {}
+    columns = {field: [] if field in _STR_FIELDS else array('d' if field in _FLOAT_FIELDS else 'q')
+               for field in FIELDS}
+    lines = []
+    with open(file_name, newline='') as f:
+        for line in f:
+            if line.startswith('# '):
+                key, _, value = line[2:].rstrip('\n').partition(': ')
+                metadata[key] = value
+            else:
+                lines.append(line)
+    rows = csv.reader(lines)
+    next(rows, None)  # header row
+    for row in rows:
+        for field, value in zip(FIELDS, row):
+            if field in _FLOAT_FIELDS:
+                value = float(value)
+            elif field not in _STR_FIELDS:
+                value = int(value)
+            columns[field].append(value)
+    for key in ('total_nodes', 'ppn'):
+        if metadata.get(key):
+            metadata[key] = int(metadata[key])
+    return metadata, columns
+
+
+def _percent(value, total):
+    return 100 * float(value) / total if total else 0
+
+
+def write_text(file_name, out=None):
+    """
+    Write the resource usage file *file_name* to *out* in the
+    ``resource_usage`` text format of previous versions, by default to
+    ``stdout``.
+    """
+    metadata, columns = load(file_name)
+    print("# host:", metadata.get('host'), file=out)
+    print("# total nodes:", metadata.get('total_nodes'), file=out)
+    print("# processors per node:", metadata.get('ppn'), file=out)
+    print("using accurate nodes:", metadata.get('accurate_nodes'), file=out)
+    print("# placement policy:", metadata.get('placement_policy'), file=out)
+    print("# time (in seconds since the | available | allocated | percent allocated | processes | percent used "
+          "| percent node | percent socket | percent GPUs | percent memory | notes ", file=out)
+    print("#   resource manager started |           |           |                   |           |              "
+          "|  fragmented  |   fragmented   |   allocated  |    allocated   |", file=out)
+    print("#" + "-" * 171, file=out)
+    for i in range(len(columns['time'])):
+        print(" %27.5f |  %8d |  %8d |  %16.2f |  %8d |  %10.2f |  %10.2f |  %12.2f |  %10.2f |  %12.2f  #  %s" %
+              (columns['time'][i], columns['avail_cores'][i], columns['alloc_cores'][i],
+               _percent(columns['alloc_cores'][i], columns['total_cores'][i]), columns['processes'][i],
+               _percent(columns['processes'][i], columns['total_cores'][i]), columns['node_frag'][i], columns['sock_frag'][i],
+               _percent(columns['alloc_gpus'][i], columns['total_gpus'][i]),
+               _percent(columns['alloc_mem'][i], columns['total_mem'][i]), columns['notes'][i]), file=out)
@@ -3,7 +3,6 @@
 # -------------------------------------------------------------------------------
 """IPS Services"""
 import sys
-import queue
 import os
 import subprocess
 import threading
@@ -15,12 +14,17 @@ import logging.handlers
 import signal
 import glob
 import json
+import queue
+import selectors
 import weakref
 from collections import namedtuple
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, wait as wait_futures
+from contextlib import contextmanager
 from operator import itemgetter
 from configobj import ConfigObj
-from .taskManager import TaskInit
+from .taskManager import TaskInit, TASK_POOL_POLICIES
 from . import messages, ipsutil
+from .utils import task_pack
 from .cca_es_spec import initialize_event_service
 from .ips_es_spec import eventManager
 
@@ -40,19 +44,45 @@ def launch(binary, task_name, working_dir, *args, **keywords):
     if not hasattr(worker, 'lock'):
         worker.lock = threading.Lock()
 
-    worker_name = ''.join(c for c in get_worker().name if c.isalnum())
-
-    start_time = time.time()
     os.chdir(working_dir)
 
-    worker_event_log = sys.stdout
-    try:
-        event_logfile = keywords["worker_event_logfile"].format(worker_name)
-    except (KeyError, AttributeError):
-        pass
-    else:
-        worker_event_log = open(event_logfile, 'a')
+    event_topic = keywords.get("worker_event_topic")
+
+    def log_event(event):
+        if event_topic is None:
+            with worker.lock:
+                print(json.dumps(event))
+        else:
+            # streamed to the client subscribed by the task pool, the
+            # scheduler adds the worker address to the message
+            worker.log_event(event_topic, {'event': event})
+
+    return task_name, _run_task(binary, task_name, working_dir, args, keywords, log_event)
 
+
+def launch_local(change_dir, binary, task_name, working_dir, *args, **keywords):
+    """This is used by
+    :meth:`TaskPool.submit_executor_tasks` as the
+    input to :meth:`concurrent.futures.Executor.submit`.  The
+    current directory is changed to *working_dir* if *change_dir* is
+    ``True``, in the processes of a
+    :class:`~concurrent.futures.ProcessPoolExecutor`.
+
+    :return: task name, return value and events of the task
+    """
+    if change_dir:
+        os.chdir(working_dir)
+    events = []
+    return task_name, _run_task(binary, task_name, working_dir, args, keywords, events.append), events
+
+
+def _run_task(binary, task_name, working_dir, args, keywords, log_event):
+    """
+    Run the pool task *task_name*, a program or a callable, passing the
+    ``IPS_LAUNCH_DASK_TASK`` and ``IPS_TASK_END`` events to *log_event*,
+    and return its return value.
+    """
+    start_time = time.time()
     ret_val = None
     if isinstance(binary, str):
         task_stdout = sys.stdout
@@ -81,52 +111,148 @@ def launch(binary, task_name, working_dir, *args, **keywords):
         timeout = float(keywords.get("timeout", 1.e9))
 
         cmd = f"{binary} {' '.join(map(str, args))}"
-        with worker.lock:
-            print(json.dumps({"eventType": "IPS_LAUNCH_DASK_TASK", "event_time": time.time(),
-                              "comment": f"task_name = {task_name}, Target = {cmd}"}),
-                  file=worker_event_log)
+        log_event({"eventType": "IPS_LAUNCH_DASK_TASK", "event_time": time.time(),
+                   "comment": f"task_name = {task_name}, Target = {cmd}"})
 
         cmd_lst = cmd.split()
         process = subprocess.Popen(cmd_lst, stdout=task_stdout,
                                    stderr=task_stderr,
                                    cwd=working_dir,
-                                   preexec_fn=os.setsid,
+                                   start_new_session=True,
                                    env=new_env)
         try:
             ret_val = process.wait(timeout)
             finish_time = time.time()
-            with worker.lock:
-                print(json.dumps({"eventType": "IPS_TASK_END", "event_time": finish_time,
-                                  "comment": f"task_name = {task_name}, elapsed time = {finish_time - start_time:.2f}s",
-                                  "start_time": start_time,
-                                  "elapsed_time": finish_time - start_time,
-                                  "target": binary,
-                                  "operation": ' '.join(map(str, args))}),
-                      file=worker_event_log)
+            log_event({"eventType": "IPS_TASK_END", "event_time": finish_time,
+                       "comment": f"task_name = {task_name}, elapsed time = {finish_time - start_time:.2f}s",
+                       "start_time": start_time,
+                       "elapsed_time": finish_time - start_time,
+                       "target": binary,
+                       "operation": ' '.join(map(str, args))})
         except subprocess.TimeoutExpired:
-            with worker.lock:
-                print(json.dumps({"eventType": "IPS_TASK_END", "event_time": time.time(),
-                                  "comment": f"task_name = {task_name}, timed-out after {timeout}s"}),
-                      file=worker_event_log)
+            log_event({"eventType": "IPS_TASK_END", "event_time": time.time(),
+                       "comment": f"task_name = {task_name}, timed-out after {timeout}s"})
             os.killpg(process.pid, signal.SIGKILL)
             ret_val = -1
     else:
-        with worker.lock:
-            print(json.dumps({"eventType": "IPS_LAUNCH_DASK_TASK", "event_time": time.time(),
-                              "comment": f"task_name = {task_name}, Target = {binary.__name__}({','.join(map(str, args))})"}),
-                  file=worker_event_log)
+        log_event({"eventType": "IPS_LAUNCH_DASK_TASK", "event_time": time.time(),
+                   "comment": f"task_name = {task_name}, Target = {binary.__name__}({','.join(map(str, args))})"})
         ret_val = binary(*args)
         finish_time = time.time()
-        with worker.lock:
-            print(json.dumps({"eventType": "IPS_TASK_END", "event_time": finish_time,
-                              "comment": f"task_name = {task_name}, elapsed time = {finish_time - start_time:.2f}s",
-                              "start_time": start_time,
-                              "elapsed_time": finish_time - start_time,
-                              "target": binary.__name__,
-                              "operation": f"({','.join(map(str, args))})"}),
-                  file=worker_event_log)
+        log_event({"eventType": "IPS_TASK_END", "event_time": finish_time,
+                   "comment": f"task_name = {task_name}, elapsed time = {finish_time - start_time:.2f}s",
+                   "start_time": start_time,
+                   "elapsed_time": finish_time - start_time,
+                   "target": binary.__name__,
+                   "operation": f"({','.join(map(str, args))})"})
+
+    return ret_val
+
+
+class TaskCompletionNotifier:
+    """
+    Wake up a waiting component as soon as one of its task processes exits.
+    A pidfd of each process is watched with a selector where
+    :func:`os.pidfd_open` is available, otherwise a ``SIGCHLD`` handler
+    writes to a pipe watched by the selector.  The connections to the task
+    launch agents, see :mod:`ipsframework.agent`, are watched for the exit
+    status of the tasks they run.  If neither can be used, e.g.
+    the handler cannot be installed outside of the main thread, the
+    processes are polled every *poll_interval* seconds.
+    """
+    poll_interval = 0.05
+    max_timeout = 3600.0  # selectors reject timeouts that overflow the system call
+
+    def __init__(self):
+        self.selector = selectors.DefaultSelector()
+        self.pidfds = {}  # task_id -> pidfd, closed when the task is finalized
+        self.use_pidfd = hasattr(os, 'pidfd_open')
+        self.wakeup_fd = None
+        if not self.use_pidfd:
+            self._install_sigchld_handler()
+
+    def _install_sigchld_handler(self):
+        read_fd, write_fd = os.pipe()
+        os.set_blocking(read_fd, False)
+        os.set_blocking(write_fd, False)
+        previous = signal.getsignal(signal.SIGCHLD)
+
+        def handler(signum, frame):
+            try:
+                os.write(write_fd, b'\0')
+            except OSError:
+                pass  # the pipe is full, so a wake up is already pending
+            if callable(previous):
+                previous(signum, frame)
+
+        try:
+            signal.signal(signal.SIGCHLD, handler)
+        except ValueError:
+            # not in the main thread
+            os.close(read_fd)
+            os.close(write_fd)
+            return
+        self.wakeup_fd = read_fd
+        self.selector.register(read_fd, selectors.EVENT_READ)
+
+    def watch(self, task_id, process):
+        """
+        Wake up :meth:`wait` when *process* of task *task_id* exits.  Must
+        only be called while the process has not been reaped.
+        """
+        agent_client = getattr(process, 'agent_client', None)
+        if agent_client is not None:
+            # the exit status is received from the agent running the task
+            if agent_client.fileno() not in self.selector.get_map():
+                self.selector.register(agent_client.fileno(), selectors.EVENT_READ, agent_client)
+            return
+        if not self.use_pidfd or task_id in self.pidfds:
+            return
+        try:
+            pidfd = os.pidfd_open(process.pid)
+        except ProcessLookupError:
+            return
+        except OSError:
+            # not supported by the kernel
+            self.use_pidfd = False
+            self._install_sigchld_handler()
+            return
+        self.pidfds[task_id] = pidfd
+        self.selector.register(pidfd, selectors.EVENT_READ)
+
+    def forget(self, task_id):
+        """
+        Stop watching the process of task *task_id*.
+        """
+        pidfd = self.pidfds.pop(task_id, None)
+        if pidfd is not None:
+            try:
+                self.selector.unregister(pidfd)
+            except KeyError:
+                pass
+            os.close(pidfd)
 
-    return task_name, ret_val
+    def wait(self, timeout=None):
+        """
+        Return when a watched process has exited, or after *timeout* seconds.
+        """
+        if timeout is None or timeout > self.max_timeout:
+            timeout = self.max_timeout
+        if not self.selector.get_map():
+            time.sleep(min(max(timeout, 0), self.poll_interval))
+            return
+        for key, _ in self.selector.select(max(timeout, 0)):
+            if key.data is not None:
+                key.data.receive()
+            elif key.fd == self.wakeup_fd:
+                try:
+                    while os.read(self.wakeup_fd, 512):
+                        pass
+                except BlockingIOError:
+                    pass
+            else:
+                # the process exited, its pidfd stays readable until closed
+                self.selector.unregister(key.fd)
 
 
 class ServicesProxy:
@@ -144,11 +270,11 @@ class ServicesProxy:
 
     :param fwk_in_q: Framework input message queue - shared among all
                 service objects
-    :type fwk_in_q: :class:`multiprocessing.Queue`
+    :type fwk_in_q: :class:`multiprocessing.Queue` or :class:`ipsframework.transport.PipeQueue`
 
     :param svc_response_q: Service response message queue - one per
                       service object.
-    :type svc_response_q: :class:`multiprocessing.Queue`
+    :type svc_response_q: :class:`multiprocessing.Queue` or :class:`ipsframework.transport.PipeQueue`
 
     :param sim_conf: Simulation configuration dictionary, contains
                 data from the simulation configuration file merged
@@ -170,8 +296,12 @@ class ServicesProxy:
         self.log_pipe_name = log_pipe_name
         self.component_ref = None
         self.incomplete_calls = {}
-        self.finished_calls = {}
+        self.receiver_pid = None
         self.task_map = {}
+        self.task_notifier = None
+        self.task_notifier_pid = None
+        self.agent_clients = {}
+        self.agent_clients_pid = None
         self.workdir = ''
         self.full_comp_id = ''
         self.logger = None
@@ -182,6 +312,7 @@ class ServicesProxy:
         self.monitor_url = None
         self.call_targets = {}
         self.task_pools = {}
+        self.dask_cluster = None
         self.time_loop = None
         self.last_ckpt_walltime = self.start_time
         self.last_ckpt_phystime = None
@@ -196,6 +327,7 @@ class ServicesProxy:
         self.ppn = 0
         self.cpp = 0
         self.shared_nodes = False
+        self.service_batch_ref = None
 
     def __initialize__(self, component_ref):
         """
@@ -285,30 +417,73 @@ class ServicesProxy:
         delta_t = self.cur_time - self.start_time
         return delta_t
 
-    def _get_incoming_responses(self, block=False):
+    def _start_response_receiver(self):
         """
-        Get all pending responses on the service response queue.
+        Start the thread receiving the service responses of this process.
+        The proxy is created by the framework and copied into the process
+        of its component, so the thread is started by the first service
+        request made from a process.
+        """
+        if self.receiver_pid == os.getpid():
+            return
+        self.receiver_pid = os.getpid()
+        self.incomplete_calls = {}
+        receiver = threading.Thread(target=self._receive_responses,
+                                    name='ServicesProxy response receiver',
+                                    daemon=True)
+        receiver.start()
 
-        *block*: Boolean flag. If ``True``, block waiting for one or more
-        responses to arrive. When *block* is false, return immediately with
-        a (possibly empty) list of available responses.
+    def _get_task_notifier(self):
+        """
+        Return the :class:`TaskCompletionNotifier` of this process, creating
+        it on first use since the proxy is copied into the process of its
+        component.
+        """
+        if self.task_notifier_pid != os.getpid():
+            self.task_notifier_pid = os.getpid()
+            self.task_notifier = TaskCompletionNotifier()
+        return self.task_notifier
 
-        Return a (possibly empty) list of service response messages objects
-        (:py:meth:`messages.ServiceResponseMessage`)
+    def _get_agent_client(self, node):
         """
-        response_list = []
-        finish = False
-        timeout = 0.01
-        while not finish:
-            try:
-                response = self.svc_response_q.get(block, timeout)
-                response_list.append(response)
-            except queue.Empty:
-                if not block:
-                    finish = True
-                elif len(response_list) > 0:
-                    finish = True
-        return response_list
+        Return the :class:`ipsframework.agent.AgentClient` connected to the
+        task launch agent of *node* from this process.
+        """
+        if self.agent_clients_pid != os.getpid():
+            self.agent_clients_pid = os.getpid()
+            self.agent_clients = {}
+        try:
+            return self.agent_clients[node]
+        except KeyError:
+            pass
+        from .agent import AgentClient  # pylint: disable=import-outside-toplevel
+        msg_id = self._invoke_service(self.fwk.component_id, 'get_task_agents')
+        addresses, authkey = self._get_service_response(msg_id, block=True)
+        self.agent_clients[node] = AgentClient(addresses[node], authkey)
+        return self.agent_clients[node]
+
+    def _forget_task(self, task_id):
+        del self.task_map[task_id]
+        if self.task_notifier_pid == os.getpid():
+            self.task_notifier.forget(task_id)
+
+    def _receive_responses(self):
+        """
+        Resolve the future of the service request matching each response
+        arriving on the service response queue.
+        """
+        while True:
+            response = self.svc_response_q.get()
+            if not isinstance(response, messages.ServiceResponseMessage):
+                self.error('Unexpected service response of type %s',
+                           response.__class__.__name__)
+                continue
+            future = self.incomplete_calls.get(response.request_msg_id)
+            if future is None:
+                self.error('Mismatched service response msg_id %s',
+                           str(response.request_msg_id))
+                continue
+            future.set_result(response)
 
     def _wait_msg_response(self, msg_id, block=True):
         """
@@ -320,39 +495,16 @@ class ServicesProxy:
         ``None``.
         """
         try:
-            return self.finished_calls.pop(msg_id)
+            future = self.incomplete_calls[msg_id]
         except KeyError:
-            if msg_id not in self.incomplete_calls:
-                self.error('Invalid call ID : %s ', str(msg_id))
-                raise Exception('Invalid message request ID argument')
-
-        keep_going = True
-        while keep_going:
-            # get new messages, block until something interesting comes along
-            responses = self._get_incoming_responses(block)
-            for r in responses:
-                if isinstance(r, messages.ServiceResponseMessage):
-                    if r.request_msg_id not in self.incomplete_calls:
-                        self.error('Mismatched service response msg_id %s',
-                                   str(r.request_msg_id))
-                        raise Exception('Mismatched service response msg_id.')
-                    else:
-                        del self.incomplete_calls[msg_id]
-                        self.finished_calls[r.request_msg_id] = r
-                        if r.request_msg_id == msg_id:
-                            keep_going = False
-                # some weird message came through
-                else:
-                    self.error('Unexpected service response of type %s',
-                               r.__class__.__name__)
-                    #                    dumpAll()
-                    raise Exception('Unexpected service response of type ' +
-                                    r.__class__.__name__)
+            self.error('Invalid call ID : %s ', str(msg_id))
+            raise Exception('Invalid message request ID argument')
 
-            if not block:
-                keep_going = False
-        # if this message corresponds to a finish invocation, return the response message
-        return self.finished_calls.pop(msg_id, None)
+        if not block and not future.done():
+            return None
+        response = future.result()
+        del self.incomplete_calls[msg_id]
+        return response
 
     def _invoke_service(self, component_id, method_name, *args, **keywords):
         r"""
@@ -362,15 +514,165 @@ class ServicesProxy:
         *component_id*.  Return message id.
         """
         self.debug('_invoke_service(): %s  %s', method_name, str(args[0:]))
-        new_msg = messages.ServiceRequestMessage(self.component_ref.component_id,
-                                                 self.fwk.component_id,
-                                                 component_id,
-                                                 method_name, *args, **keywords)
-        msg_id = new_msg.get_message_id()
-        self.incomplete_calls[msg_id] = new_msg
-        self.fwk_in_q.put(new_msg)
+        new_msg = self._new_service_request(component_id, method_name, *args, **keywords)
+        return self._send_service_request(new_msg)
+
+    def _send_service_request(self, msg):
+        """
+        Place the request *msg* in the ``self.fwk_in_q``, after registering
+        the future its response will resolve.  Return message id.
+        """
+        self._start_response_receiver()
+        msg_id = msg.get_message_id()
+        self.incomplete_calls[msg_id] = Future()
+        self.fwk_in_q.put(msg)
         return msg_id
 
+    def _notify_service(self, component_id, method_name, *args, **keywords):
+        r"""
+        Place in the ``self.fwk_in_q`` a new
+        :py:meth:`messages.ServiceNotificationMessage` for service
+        *method_name* with *\*args* arguments on behalf of component
+        *component_id*.  No response is expected, so the call returns as
+        soon as the message is queued.
+        """
+        self.debug('_notify_service(): %s  %s', method_name, str(args[0:]))
+        new_msg = messages.ServiceNotificationMessage(self.component_ref.component_id,
+                                                      self.fwk.component_id,
+                                                      component_id,
+                                                      method_name, *args, **keywords)
+        self.fwk_in_q.put(new_msg)
+
+    def _new_service_request(self, component_id, method_name, *args, **keywords):
+        r"""
+        Return a new :py:meth:`messages.ServiceRequestMessage` for service
+        *method_name* with *\*args* arguments on behalf of component
+        *component_id*.
+        """
+        return messages.ServiceRequestMessage(self.component_ref.component_id,
+                                              self.fwk.component_id,
+                                              component_id,
+                                              method_name, *args, **keywords)
+
+    def _invoke_service_batch(self, requests):
+        """
+        Place in the ``self.fwk_in_q`` a single
+        :py:meth:`messages.ServiceRequestBatchMessage` holding the
+        :py:meth:`messages.ServiceRequestMessage` objects in *requests*.
+        Return message id.
+        """
+        self.debug('_invoke_service_batch(): %s', str([r.target_method for r in requests]))
+        new_msg = messages.ServiceRequestBatchMessage(self.component_ref.component_id,
+                                                      self.fwk.component_id,
+                                                      requests)
+        return self._send_service_request(new_msg)
+
+    @contextmanager
+    def service_batch(self, return_exceptions=False):
+        """Context manager collecting framework service requests, which are
+        sent to the framework in a single message, and answered in a single
+        response, when the context exits.  Task completions generated inside
+        the context are added to the batch.
+
+        .. code-block:: python
+
+            with self.services.service_batch() as batch:
+                batch.invoke(self.services.fwk.component_id, 'get_config_parameter', 'SIM_ROOT')
+                batch.invoke(self.services.fwk.component_id, 'get_config_parameter', 'SIM_NAME')
+            sim_root, sim_name = batch.results
+
+        :param return_exceptions: if ``True``, failed requests have their exception
+            stored in :attr:`ServiceBatch.results`, otherwise the first failure
+            is raised when the context exits.
+        :type return_exceptions: bool
+
+        :return: the batch to add requests to
+        :rtype: :class:`ServiceBatch`
+        """
+        batch = ServiceBatch(self)
+        outer_batch = self.service_batch_ref
+        self.service_batch_ref = batch
+        try:
+            yield batch
+        except Exception:
+            # the requests collected so far, such as the completion of tasks
+            # already removed from task_map, must still reach the framework
+            self.service_batch_ref = outer_batch
+            batch.results = self._get_service_batch_response(batch, return_exceptions=True)
+            raise
+        finally:
+            self.service_batch_ref = outer_batch
+        batch.results = self._get_service_batch_response(batch, return_exceptions)
+
+    def _get_service_batch_response(self, batch, return_exceptions=False):
+        """
+        Send the requests of *batch* and return the list of their results.
+        Failed requests are represented by their exception if
+        *return_exceptions* is ``True``, otherwise the first one is raised.
+        """
+        if not batch.requests:
+            return []
+        msg_id = self._invoke_service_batch(batch.requests)
+        return [self._get_response_result(response, return_exceptions)
+                for response in self._get_service_response(msg_id, block=True)]
+
+    def invoke_many(self, requests, return_exceptions=False):
+        r"""Invoke several framework services using a single round trip to
+        the framework.  The requests are handled in order.
+
+        .. code-block:: python
+
+            sim_root, sim_name = self.services.invoke_many([('get_config_parameter', 'SIM_ROOT'),
+                                                            ('get_config_parameter', 'SIM_NAME')])
+
+        :param requests: list of service requests, each one a tuple of the
+            service method name followed by its arguments
+        :type requests: list of tuple
+
+        :param return_exceptions: if ``True``, the exception of a failed request
+            is returned in place of its result, otherwise the first failure is raised
+        :type return_exceptions: bool
+
+        :return: result of each request
+        :rtype: list
+        """
+        with self.service_batch(return_exceptions) as batch:
+            for method_name, *args in requests:
+                batch.invoke(self.fwk.component_id, method_name, *args)
+        return batch.results
+
+    def invoke_service_async(self, method_name, *args, **keywords):
+        r"""Invoke the framework service *method_name* with arguments
+        *\*args* without waiting for its response.  Several requests can be
+        outstanding at the same time, their responses are received in the
+        background.
+
+        .. code-block:: python
+
+            sim_root = self.services.invoke_service_async('get_config_parameter', 'SIM_ROOT')
+            sim_name = self.services.invoke_service_async('get_config_parameter', 'SIM_NAME')
+            print(sim_root.result(), sim_name.result())
+
+        :param method_name: framework service method, e.g. ``get_config_parameter``
+        :type method_name: str
+
+        :return: future resolved with the result of the service, or with its
+            exception if it failed
+        :rtype: :class:`concurrent.futures.Future`
+        """
+        msg_id = self._invoke_service(self.fwk.component_id, method_name, *args, **keywords)
+        result = Future()
+
+        def set_result(response_future):
+            del self.incomplete_calls[msg_id]
+            try:
+                result.set_result(self._get_response_result(response_future.result()))
+            except Exception as e:
+                result.set_exception(e)
+
+        self.incomplete_calls[msg_id].add_done_callback(set_result)
+        return result
+
     def _get_service_response(self, msg_id, block=True):
         """
         Return response from message *msg_id*.  Calls
@@ -384,7 +686,17 @@ class ServicesProxy:
         self.debug('_get_service_response(%s), response = %s', str(msg_id), str(response))
         if response is None:
             return None
+        return self._get_response_result(response)
+
+    def _get_response_result(self, response, return_exceptions=False):
+        """
+        Return the result carried by the service *response*.  If the status
+        of the response is failure (``Message.FAILURE``), the exception body
+        is raised, or returned if *return_exceptions* is ``True``.
+        """
         if response.status == messages.Message.FAILURE:
+            if return_exceptions:
+                return response.args[0]
             self.debug('###### Raising %s', str(response.args[0]))
             raise response.args[0]
         if len(response.args) > 1:
@@ -470,11 +782,83 @@ class ServicesProxy:
         response = self._get_service_response(msg_id, True)
         return response
 
+    def get_framework_metrics(self):
+        """
+        Return a snapshot of the framework metrics: the number, latency and
+        failures of each framework service, the time spent allocating
+        resources and building launch commands, the depth of the framework
+        input queue and the number of blocked requests.  The metrics are also
+        written to ``framework_metrics.json`` in the *SIM_ROOT* of the
+        framework at the end of the run.
+
+        :return: framework metrics, durations are in seconds
+        :rtype: dict
+        """
+        msg_id = self._invoke_service(self.fwk.component_id,
+                                      'get_framework_metrics')
+        return self._get_service_response(msg_id, True)
+
+    def add_nodes(self, nodes, ppn=0):
+        """
+        Add *nodes* to the resources of the framework while the simulation
+        runs, e.g. the nodes of a second batch allocation, and retry the
+        blocked task requests.  Draining nodes of *nodes* take new tasks
+        again.
+
+        :param nodes: Slurm style node list, e.g. ``nid[0001-0004]``, or list
+                      of node names or of (node name, processes per node) tuples
+        :type nodes: str or list
+        :param ppn: processes per node of the nodes without one, by default
+                    the ``PROCS_PER_NODE`` of the framework
+        :type ppn: int
+        :return: number of cores added
+        :rtype: int
+        """
+        msg_id = self._invoke_service(self.fwk.component_id,
+                                      'add_node_resources', nodes, ppn)
+        return self._get_service_response(msg_id, True)
+
+    def drain_nodes(self, nodes):
+        """
+        Stop launching new tasks on *nodes*, e.g. nodes with hardware faults.
+        The tasks running on them continue.  The nodes are returned to use
+        by :meth:`add_nodes`.
+
+        :param nodes: node list, as for :meth:`add_nodes`
+        :type nodes: str or list
+        :return: number of cores no longer available
+        :rtype: int
+        """
+        msg_id = self._invoke_service(self.fwk.component_id,
+                                      'drain_nodes', nodes)
+        return self._get_service_response(msg_id, True)
+
+    def remove_nodes(self, nodes):
+        """
+        Drain *nodes*, and remove them from the resources of the framework
+        once the tasks running on them finish.  Blocked task requests that no
+        longer fit on the remaining nodes fail.
+
+        :param nodes: node list, as for :meth:`add_nodes`
+        :type nodes: str or list
+        :return: names of the nodes removed at once, the others are removed
+                 when their tasks finish
+        :rtype: list
+        """
+        msg_id = self._invoke_service(self.fwk.component_id,
+                                      'remove_nodes', nodes)
+        return self._get_service_response(msg_id, True)
+
     def cleanup(self):
         """Clean up any state from the services. Called by the terminate
         method in the base class for components.
 
         """
+        if self.dask_cluster is not None:
+            try:
+                self.stop_dask_cluster()
+            except Exception:
+                self.exception('Error shutting down the dask cluster')
         for task in self.task_map.values():
             try:
                 task.process.kill()
@@ -495,6 +879,19 @@ class ServicesProxy:
         :rtype: int
         """
         target = str(component_id)
+        self._send_call_begin_event(target, method_name, args, keywords)
+        msg_id = self._invoke_service(component_id,
+                                      'init_call',
+                                      method_name, *args, **keywords)
+        call_id = self._get_service_response(msg_id, True)
+        self.call_targets[call_id] = (target, method_name, args, time.time())
+        return call_id
+
+    def _send_call_begin_event(self, target, method_name, args, keywords):
+        """
+        Send the IPS_CALL_BEGIN monitor event for the invocation of
+        *method_name* on component *target*.
+        """
         formatted_args = ['%.3f' % (x) if isinstance(x, float)
                           else str(x) for x in args]
         if keywords:
@@ -502,12 +899,6 @@ class ServicesProxy:
         self._send_monitor_event('IPS_CALL_BEGIN', 'Target = ' +
                                  target + ':' + method_name + '(' +
                                  ' ,'.join(formatted_args) + ')')
-        msg_id = self._invoke_service(component_id,
-                                      'init_call',
-                                      method_name, *args, **keywords)
-        call_id = self._get_service_response(msg_id, True)
-        self.call_targets[call_id] = (target, method_name, args, time.time())
-        return call_id
 
     def call(self, component_id, method_name, *args, **keywords):
         r"""Invoke method *method_name* on component *component_id* with
@@ -614,6 +1005,8 @@ class ServicesProxy:
             * *task_ppn* : the processes per node value for this task
             * *task_cpp* : the cores per process, only used when ``MPIRUN=srun`` commands
             * *task_gpp* : the gpus per process, only used when ``MPIRUN=srun`` commands
+            * *task_mem* : the memory in MB per process, only used when the
+              memory per node is known, see ``MEMORY_PER_NODE``
             * *omp* : If ``True`` the task will be launch with the correct OpenMP environment
                variables set, only used when ``MPIRUN=srun``
             * *block* : specifies that this task will block (or raise an
@@ -622,6 +1015,10 @@ class ServicesProxy:
               runs.  If ``False``, an exception is raised indicating that
               there are not enough resources, but it is possible to eventually
               run.  (default = ``True``)
+            * *estimated_runtime* : the expected runtime of the task in
+              seconds.  A task known to finish before the nodes reserved
+              for a long blocked request are needed may use these nodes,
+              see ``RESERVATION_THRESHOLD``.
             * *tag* : identifier for the portal.  May be used to group related
               tasks.
             * *logfile* : file name for ``stdout`` (and ``stderr``) to be
@@ -682,8 +1079,10 @@ class ServicesProxy:
         task_ppn = keywords.get('task_ppn', self.ppn)
         task_cpp = keywords.get('task_cpp', self.cpp)
         task_gpp = keywords.get('task_gpp', 0)
+        task_mem = keywords.get('task_mem', 0)
         omp = keywords.get('omp', False)
         block = keywords.get('block', True)
+        runtime = keywords.get('estimated_runtime')
         tag = keywords.get('tag', 'None')
         launch_cmd_extra_args = keywords.get("launch_cmd_extra_args")
 
@@ -696,7 +1095,8 @@ class ServicesProxy:
                                           'init_task',
                                           TaskInit(int(nproc), binary_fullpath,
                                                    working_dir, int(task_ppn), task_cpp, task_gpp, block,
-                                                   omp, whole_nodes, whole_socks, args, launch_cmd_extra_args))
+                                                   omp, whole_nodes, whole_socks, args, launch_cmd_extra_args,
+                                                   int(task_mem), None if runtime is None else float(runtime)))
             (task_id, command, env_update, cores_allocated) = self._get_service_response(msg_id, block=True)
         except Exception:
             raise
@@ -716,6 +1116,19 @@ class ServicesProxy:
         log_filename = keywords.get('logfile')
         timeout = keywords.get("timeout", 1.e9)
 
+        if command.startswith('agent '):
+            # MPIRUN = agent: "agent <node> <command>" is run by the agent of the node
+            _, node, cmd_lst = command.split(' ', 2)
+            self.debug('Launching command : %s', command)
+            try:
+                process = self._get_agent_client(node).launch(task_id, cmd_lst.split(), working_dir, env_update,
+                                                              log_filename, keywords.get('errfile'))
+            except Exception:
+                self.exception('Error executing command : %s', command)
+                raise
+            self.task_map[task_id] = RunningTask(process, time.time(), timeout, nproc, cores_allocated, command, binary, args)
+            return task_id
+
         task_stdout = sys.stdout
         if log_filename:
             try:
@@ -779,6 +1192,7 @@ class ServicesProxy:
         task_pool = self.task_pools[task_pool_name]
         queued_tasks = task_pool.queued_tasks
         submit_dict = {}
+        runtime_hints = {}
         for task_name, task in queued_tasks.items():
             if not isinstance(task.binary, str):
                 self.error('Error initiating task pool %s: task %s binary of wrong type, expected str but found %s',
@@ -789,31 +1203,45 @@ class ServicesProxy:
             wsocks = task.keywords.get('whole_sockets', not self.shared_nodes)
             task_cpp = task.keywords.get('task_cpp', self.cpp)
             task_gpp = task.keywords.get('task_gpp', 0)
+            task_mem = task.keywords.get('task_mem', 0)
             omp = task.keywords.get('omp', False)
             launch_cmd_extra_args = task.keywords.get('launch_cmd_extra_args')
             submit_dict[task_name] = TaskInit(task.nproc, task.binary,
                                               task.working_dir, task_ppn, task_cpp, task_gpp,
-                                              False, omp, wnodes, wsocks, task.args, launch_cmd_extra_args)
+                                              False, omp, wnodes, wsocks, task.args, launch_cmd_extra_args,
+                                              int(task_mem))
+            if 'estimated_runtime' in task.keywords:
+                runtime_hints[task_name] = float(task.keywords['estimated_runtime'])
 
         try:
             msg_id = self._invoke_service(self.fwk.component_id,
-                                          'init_task_pool', submit_dict)
+                                          'init_task_pool', submit_dict,
+                                          task_pool.policy, runtime_hints, task_pool_name,
+                                          task_pool.pack_size)
             allocated_tasks = self._get_service_response(msg_id, block=True)
         except Exception:
             self.exception('Error initiating task pool %s ', task_pool_name)
             raise
 
+        packs = {}  # task_id -> names of the tasks launched together
+        for task_name, (task_id, _, _, _) in allocated_tasks.items():
+            packs.setdefault(task_id, []).append(task_name)
+
         active_tasks = {}
         for task_name in allocated_tasks:
-            if launch_interval > 0:
-                time.sleep(launch_interval)
             task = queued_tasks[task_name]
             (task_id, command, env_update, cores_allocated) = allocated_tasks[task_name]
             tag = task.keywords.get('tag', 'None')
-
-            active_tasks[task_name] = self._launch_task(task.nproc,
-                                                        task.working_dir, task_id, command, cores_allocated,
-                                                        env_update, tag, task.keywords, task.binary, task.args)
+            pack = packs[task_id]
+            if task_name == pack[0]:
+                if launch_interval > 0:
+                    time.sleep(launch_interval)
+                if len(pack) > 1:
+                    self._launch_task_pack(task_id, [queued_tasks[name] for name in pack], command, cores_allocated, env_update, tag)
+                else:
+                    self._launch_task(task.nproc, task.working_dir, task_id, command, cores_allocated,
+                                      env_update, tag, task.keywords, task.binary, task.args)
+            active_tasks[task_name] = task_id
 
             if env_update:
                 self._send_monitor_event('IPS_LAUNCH_TASK_POOL',
@@ -829,6 +1257,25 @@ class ServicesProxy:
 
         return active_tasks
 
+    def _launch_task_pack(self, task_id, tasks, command, cores_allocated, env_update, tag):
+        """
+        Launch *tasks* together as task *task_id*, running the shim
+        :mod:`ipsframework.utils.task_pack` with *command*.  The output of
+        each member goes to its own *logfile* and *errfile*, and the task
+        pack times out with the member with the longest *timeout*.
+        """
+        pack_file = task_pack.pack_file_name(tasks[0].working_dir, task_id)
+        task_pack.write_pack(pack_file, [{'name': task.name,
+                                          'args': [task.binary] + list(task.args),
+                                          'working_dir': task.working_dir,
+                                          'logfile': task.keywords.get('logfile'),
+                                          'errfile': task.keywords.get('errfile')} for task in tasks])
+        keywords = {}
+        if any('timeout' in task.keywords for task in tasks):
+            keywords['timeout'] = max(task.keywords.get('timeout', 1.e9) for task in tasks)
+        return self._launch_task(len(tasks), tasks[0].working_dir, task_id, command, cores_allocated,
+                                 env_update, tag, keywords, 'task_pack', [pack_file])
+
     def kill_task(self, task_id):
         """Kill launched task *task_id*.  Return if successful.  Raises
         exceptions if the task or process cannot be found or killed
@@ -855,7 +1302,7 @@ class ServicesProxy:
             self.exception('exception during process termination for task %d', task_id)
             raise
 
-        del self.task_map[task_id]
+        self._forget_task(task_id)
         try:
             msg_id = self._invoke_service(self.fwk.component_id,
                                           'finish_task', task_id, task_retval)
@@ -959,7 +1406,11 @@ class ServicesProxy:
                                  operation=" ".join(task.args),
                                  call_id=task_id)
 
-        del self.task_map[task_id]
+        self._forget_task(task_id)
+        if self.service_batch_ref is not None:
+            self.service_batch_ref.invoke(self.fwk.component_id,
+                                          'finish_task', task_id, task_retval)
+            return task_retval
         try:
             msg_id = self._invoke_service(self.fwk.component_id,
                                           'finish_task', task_id, task_retval)
@@ -969,6 +1420,69 @@ class ServicesProxy:
             raise
         return task_retval
 
+    def wait_any_task(self, task_id_list, timeout=None):
+        """Wait until at least one of the tasks in *task_id_list* has
+        finished, or *timeout* seconds have elapsed, and finalize the
+        finished tasks.  The component is woken up as soon as a task
+        process exits instead of polling the tasks.  Tasks that exceed the
+        *timeout* given to :meth:`launch_task` are killed and reported
+        with return value -1.  Raise :class:`KeyError` exception if a
+        ``task_id`` is not found.
+
+        :param task_id_list: list of task_id's (PID's) to wait for
+        :type task_id_list: list of int
+
+        :param timeout: maximum time to wait, default None (wait until a task finishes), 0 to only check the tasks
+        :type timeout: float
+
+        :return: dict of task_id and return value of the finished tasks, empty if *timeout* elapsed first
+        :rtype: dict
+        """
+        for task_id in task_id_list:
+            if task_id not in self.task_map:
+                self.exception('Error: unknown task id : %s', task_id)
+                raise KeyError(task_id)
+        notifier = self._get_task_notifier()
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            finished = []
+            timed_out = []
+            now = time.time()
+            for task_id in task_id_list:
+                task = self.task_map[task_id]
+                if task.process.poll() is not None:
+                    finished.append(task_id)
+                elif task.start_time + task.timeout < now:
+                    timed_out.append(task_id)
+            if finished or timed_out:
+                break
+            wakeup = min(self.task_map[task_id].start_time + self.task_map[task_id].timeout
+                         for task_id in task_id_list)
+            if deadline is not None:
+                if deadline <= now:
+                    return {}
+                wakeup = min(wakeup, deadline)
+            for task_id in task_id_list:
+                notifier.watch(task_id, self.task_map[task_id].process)
+            notifier.wait(wakeup - now)
+
+        ret_dict = {}
+        for task_id in timed_out:
+            task = self.task_map[task_id]
+            self.kill_task(task_id)
+            self._send_monitor_event('IPS_TASK_END', 'task_id = %s  TIMEOUT elapsed time = %.2f S' %
+                                     (str(task_id), time.time() - task.start_time))
+            ret_dict[task_id] = -1
+        # tasks found finished together are finalized in one batch
+        try:
+            with self.service_batch():
+                for task_id in finished:
+                    ret_dict[task_id] = self.wait_task(task_id)
+        except Exception:
+            self.exception('Error finalizing tasks')
+            raise
+        return ret_dict
+
     def wait_tasklist(self, task_id_list, block=True):
         """Check the status of a list of tasks.  If ``block`` is ``True``,
         return a dictionary of return values when *all* tasks have
@@ -988,25 +1502,11 @@ class ServicesProxy:
         """
         ret_dict = {}
         running_tasks = list(task_id_list)
-        for task_id in task_id_list:
-            try:
-                process = self.task_map[task_id].process
-            except KeyError:
-                self.exception('Error: unknown task id : %s', task_id)
-                raise
         while len(running_tasks) > 0:
-            for task_id in task_id_list:
-                if task_id not in running_tasks:
-                    continue
-                process = self.task_map[task_id].process
-                retval = process.poll()
-                if retval is not None:
-                    task_retval = self.wait_task(task_id)
-                    ret_dict[task_id] = task_retval
-                    running_tasks.remove(task_id)
+            ret_dict.update(self.wait_any_task(running_tasks, timeout=None if block else 0))
+            running_tasks = [task_id for task_id in running_tasks if task_id not in ret_dict]
             if not block:
                 break
-            time.sleep(0.05)
         return ret_dict
 
     def get_config_param(self, param, silent=False):
@@ -1241,10 +1741,16 @@ class ServicesProxy:
                    self.last_ckpt_walltime - self.start_time, self.last_ckpt_phystime)
         self._send_monitor_event('IPS_CHECKPOINT_START',
                                  'Components = ' + str(comp_id_list))
-        call_id_list = []
-        for comp_id in comp_id_list:
-            call_id = self.call_nonblocking(comp_id, 'checkpoint', time_stamp)
-            call_id_list.append(call_id)
+        # start all checkpoint calls with a single framework request
+        init_calls = []
+        with self.service_batch() as batch:
+            for comp_id in comp_id_list:
+                self._send_call_begin_event(str(comp_id), 'checkpoint', (time_stamp,), {})
+                init_calls.append(batch.invoke(comp_id, 'init_call', 'checkpoint', time_stamp))
+        start_time = time.time()
+        call_id_list = [batch.results[i] for i in init_calls]
+        for comp_id, call_id in zip(comp_id_list, call_id_list):
+            self.call_targets[call_id] = (str(comp_id), 'checkpoint', (time_stamp,), start_time)
         ret_dict = self.wait_call_list(call_id_list, block=True)
 
         self.chkpt_counter += 1
@@ -1784,6 +2290,7 @@ class ServicesProxy:
     def publish(self, topicName, eventName, eventBody):
         """
         Publish event consisting of *eventName* and *eventBody* to topic *topicName* to the IPS event service.
+        The event is sent without waiting for the framework to process it, errors are reported in the framework log.
         """
         if not topicName.startswith('_IPS'):
             topicName = self.sim_name + '_' + topicName
@@ -1866,19 +2373,43 @@ class ServicesProxy:
         """
         self.logger.critical(msg, *args)
 
-    def create_task_pool(self, task_pool_name):
+    def create_task_pool(self, task_pool_name, policy=None, pack_size=1):
         """
         Create an empty pool of tasks with the name *task_pool_name*.  Raise exception if duplicate name.
+
+        *policy* is the order in which the framework launches the queued
+        tasks, one of ``fifo``, ``largest_first``, ``shortest_first`` or
+        ``backfill``, see :meth:`ipsframework.taskManager.TaskManager.init_task_pool`.
+        The ``shortest_first`` and ``backfill`` policies use the
+        *estimated_runtime* keyword of :meth:`add_task`.  Defaults to the
+        ``TASK_POOL_POLICY`` configuration parameter, or ``fifo``.
+
+        Up to *pack_size* single process tasks of the pool with the same
+        launch options are launched together on one node, by a single
+        launcher invocation of :mod:`ipsframework.utils.task_pack`, with
+        their own exit status and timing.  Tasks using OpenMP, GPUs or
+        whole nodes are launched alone.
         """
         if task_pool_name in self.task_pools:
             raise Exception('Error: Duplicate task pool name %s' % (task_pool_name))
-        self.task_pools[task_pool_name] = TaskPool(task_pool_name, self)
+        if policy is None:
+            try:
+                policy = self.get_config_param('TASK_POOL_POLICY', silent=True)
+            except Exception:
+                policy = 'fifo'
+        policy = policy.lower()
+        if policy not in TASK_POOL_POLICIES:
+            self.error('Unknown task pool scheduling policy %s, expected one of %s', policy, TASK_POOL_POLICIES)
+            raise ValueError(f"Unknown task pool scheduling policy {policy}")
+        self.task_pools[task_pool_name] = TaskPool(task_pool_name, self, policy, pack_size)
 
     def add_task(self, task_pool_name, task_name, nproc, working_dir,
                  binary, *args, **keywords):
         """
         Add task *task_name* to task pool *task_pool_name*.  Remaining arguments are the same as
-        in :py:meth:`ServicesProxy.launch_task`.
+        in :py:meth:`ServicesProxy.launch_task`, with the additional keyword
+        *estimated_runtime*, the expected runtime of the task in seconds
+        used by the scheduling policy of the pool.
         """
         task_pool = self.task_pools[task_pool_name]
         return task_pool.add_task(task_name, nproc, working_dir, binary,
@@ -1886,27 +2417,64 @@ class ServicesProxy:
 
     def submit_tasks(self, task_pool_name, block=True, use_dask=False, dask_nodes=1,
                      dask_ppw=None, launch_interval=0.0, use_shifter=False, shifter_args=None,
-                     dask_worker_plugin=None, dask_worker_per_gpu=False):
+                     dask_worker_plugin=None, dask_worker_per_gpu=False, use_executor=None,
+                     executor_workers=None):
         """
         Launch all unfinished tasks in task pool *task_pool_name*.  If *block* is ``True``,
         return when all tasks have been launched.  If *block* is ``False``, return when all
         tasks that can be launched immediately have been launched.  Return number of tasks
         submitted.
 
-        Optionally, dask can be used to schedule and run the task pool.
+        Optionally, dask can be used to schedule and run the task pool, or
+        a local executor of the component process with *use_executor*
+        ``threads`` or ``processes``, see :meth:`TaskPool.submit_executor_tasks`.
         """
         start_time = time.time()
         self._send_monitor_event('IPS_TASK_POOL_BEGIN', 'task_pool = %s ' % task_pool_name)
         task_pool: TaskPool = self.task_pools[task_pool_name]
         retval = task_pool.submit_tasks(block, use_dask, dask_nodes, dask_ppw, launch_interval,
                                         use_shifter, shifter_args,
-                                        dask_worker_plugin, dask_worker_per_gpu)
+                                        dask_worker_plugin, dask_worker_per_gpu,
+                                        use_executor, executor_workers)
         elapsed_time = time.time() - start_time
         self._send_monitor_event('IPS_TASK_POOL_END', 'task_pool = %s  elapsed time = %.2f S' %
                                  (task_pool_name, elapsed_time),
                                  elapsed_time=elapsed_time)
         return retval
 
+    def start_dask_cluster(self, dask_nodes=1, dask_ppw=None, use_shifter=False, shifter_args=None,
+                           dask_worker_plugin=None, dask_worker_per_gpu=False):
+        """
+        Start a dask cluster used by all the task pools of the component
+        submitted with ``use_dask=True``, instead of starting a cluster for
+        each pool, until :meth:`stop_dask_cluster` or the termination of the
+        component.  The workers hold the cores of *dask_nodes* nodes for the
+        lifetime of the cluster, and the cluster is grown when a pool is
+        submitted with more *dask_nodes*.  If the cluster is already started,
+        it is resized to *dask_nodes* nodes.  The arguments are those of
+        :meth:`submit_tasks`.
+        """
+        if self.dask_cluster is not None:
+            self.dask_cluster.resize(dask_nodes)
+            return
+        if not TaskPool.dask or not TaskPool.distributed:
+            raise RuntimeError("Requested a dask cluster but cannot because import dask or distributed failed")
+        if use_shifter and not TaskPool.shifter:
+            self.error("Requested to run dask within shifter but shifter not available")
+            raise RuntimeError("shifter not found")
+        dask_cluster = DaskCluster(self, self.component_ref.__class__.__name__, dask_ppw, use_shifter, shifter_args, dask_worker_per_gpu)
+        dask_cluster.start(dask_nodes, dask_worker_plugin)
+        self.dask_cluster = dask_cluster
+
+    def stop_dask_cluster(self):
+        """
+        Shut down the dask cluster started by :meth:`start_dask_cluster`,
+        and release its cores.
+        """
+        dask_cluster, self.dask_cluster = self.dask_cluster, None
+        if dask_cluster is not None:
+            dask_cluster.shutdown()
+
     def get_finished_tasks(self, task_pool_name):
         """
         Return dictionary of finished tasks and return values in task pool *task_pool_name*.  Raise exception if no active or finished tasks.
@@ -1914,6 +2482,28 @@ class ServicesProxy:
         task_pool = self.task_pools[task_pool_name]
         return task_pool.get_finished_tasks_status()
 
+    def iter_finished(self, task_pool_name, launch_interval=0.0):
+        """
+        Launch the tasks of task pool *task_pool_name*, and yield
+        ``(task_name, exit_status, timing)`` for each task as soon as it
+        finishes, launching the remaining tasks as resources become free.
+        *timing* is a dictionary with the *start_time*, *end_time* and
+        *elapsed_time* of the task.
+
+        .. code-block:: python
+
+            for task_name, exit_status, timing in self.services.iter_finished('pool'):
+                self.process_output(task_name)
+        """
+        start_time = time.time()
+        self._send_monitor_event('IPS_TASK_POOL_BEGIN', 'task_pool = %s ' % task_pool_name)
+        task_pool = self.task_pools[task_pool_name]
+        yield from task_pool.iter_finished(launch_interval)
+        elapsed_time = time.time() - start_time
+        self._send_monitor_event('IPS_TASK_POOL_END', 'task_pool = %s  elapsed time = %.2f S' %
+                                 (task_pool_name, elapsed_time),
+                                 elapsed_time=elapsed_time)
+
     def remove_task_pool(self, task_pool_name):
         """
         Kill all running tasks, clean up all finished tasks, and delete task pool.
@@ -1999,6 +2589,32 @@ class ServicesProxy:
         return (sim_name, init_comp, driver_comp)
 
 
+class ServiceBatch:
+    """Framework service requests collected by
+    :meth:`ServicesProxy.service_batch`, to be sent to the framework in a
+    single message.
+
+    :param services: services proxy of the component sending the requests
+    :type services: :class:`ServicesProxy`
+    """
+
+    def __init__(self, services):
+        self.services = services
+        self.requests = []
+        #: list of the results of the requests, set once the batch has been sent
+        self.results = None
+
+    def invoke(self, component_id, method_name, *args, **keywords):
+        r"""Add a request for service *method_name* with *\*args* arguments
+        on behalf of component *component_id*.
+
+        :return: index of the request result in :attr:`results`
+        :rtype: int
+        """
+        self.requests.append(self.services._new_service_request(component_id, method_name, *args, **keywords))
+        return len(self.requests) - 1
+
+
 class TaskPool:
     """
     Class to contain and manage a pool of tasks.
@@ -2017,21 +2633,28 @@ class TaskPool:
             dask = None
             distributed = None
 
-    def __init__(self, name, services):
+    #: local executors of :meth:`submit_executor_tasks`
+    executors = {'threads': ThreadPoolExecutor, 'processes': ProcessPoolExecutor}
+
+    def __init__(self, name, services, policy='fifo', pack_size=1):
         self.dask_pool = False
         self.name = name
         self.services = services
+        self.policy = policy
+        self.pack_size = pack_size
         self.active_tasks = {}
         self.finished_tasks = {}
         self.queued_tasks = {}
         self.blocked_tasks = {}
         self.serial_pool = True
-        self.dask_sched_pid = None
-        self.dask_workers_tid = None
         self.futures = None
-        self.dask_file_name = None
+        self.dask_cluster = None
         self.dask_client = None
-        self.worker_event_logfile = None
+        self.worker_event_topic = None
+        self.worker_events = queue.Queue()
+        self.worker_event_count = 0
+        self.executor = None
+        self.executor_task_id = None
 
     def _wait_any_task(self, block=True):
         """
@@ -2039,26 +2662,27 @@ class TaskPool:
         needed, and returning when at least one of them has finished.  If
         *block* is ``False``, returns after one traversal of *active_tasks*
         even if none of the tasks have finished.  If *block* is ``True``
-        (default), returns only after at least one task has finished.  In this
-        case, *active_tasks* may be traversed multiple times, sleeping for
-        0.05 seconds between traversals.
+        (default), returns only after at least one task has finished, see
+        :meth:`ServicesProxy.wait_any_task`.
         """
         if len(self.active_tasks) == 0:
             return
-        done = False
-        while not done:
-            for task_id in list(self.active_tasks.keys()):
-                exit_status = self.services.wait_task_nonblocking(task_id)
-                if exit_status is not None:
-                    task = self.active_tasks.pop(task_id)
-                    task.exit_status = exit_status
-                    self.finished_tasks[task.name] = task
-                    done = True
-            if not done:
-                if block:
-                    time.sleep(0.05)
-                else:
-                    break
+        finished = self.services.wait_any_task(list(self.active_tasks), timeout=None if block else 0)
+        end_time = time.time()
+        for task_id, exit_status in finished.items():
+            tasks = self.active_tasks.pop(task_id)
+            results = {}
+            if isinstance(tasks, list):
+                # members of a task pack, the pack only fails as a whole if the shim did not report them
+                results = task_pack.read_results(task_pack.pack_file_name(tasks[0].working_dir, task_id))
+            else:
+                tasks = [tasks]
+            for task in tasks:
+                result = results.get(task.name, {})
+                task.exit_status = result.get('exit_status', exit_status)
+                task.start_time = result.get('start_time', task.start_time)
+                task.end_time = result.get('end_time', end_time)
+                self.finished_tasks[task.name] = task
 
     def _wait_active_tasks(self):
         """
@@ -2115,6 +2739,12 @@ class TaskPool:
         started for every GPU. So dask_node times GPUS_PER_NODE
         workers will be started.
 
+        If the component started a dask cluster with
+        :meth:`ServicesProxy.start_dask_cluster`, the tasks run in this
+        cluster, grown to *dask_nodes* if needed, and the other arguments
+        are ignored.  Otherwise a dask cluster is started for the pool, and
+        shut down by :meth:`get_dask_finished_tasks_status`.
+
         :param block: Unused, this will always return after tasks are submitted
         :type block: bool
         :param dask_nodes: Number of task nodes, default 1
@@ -2130,86 +2760,28 @@ class TaskPool:
 
         """
         services: ServicesProxy = self.services
-        self.dask_file_name = os.path.join(os.getcwd(),
-                                           f".{self.name}_dask_shed_{time.time()}.json")
-
-        if use_shifter:
-            if shifter_args:
-                self.dask_sched_pid = subprocess.Popen([self.shifter, shifter_args, "dask-scheduler", "--no-dashboard",
-                                                        "--scheduler-file", self.dask_file_name, "--port", "0"]).pid
-            else:
-                self.dask_sched_pid = subprocess.Popen([self.shifter, "dask-scheduler", "--no-dashboard",
-                                                        "--scheduler-file", self.dask_file_name, "--port", "0"]).pid
-
-        else:
-            self.dask_sched_pid = subprocess.Popen([self.dask_scheduler, "--no-dashboard",
-                                                    "--scheduler-file", self.dask_file_name, "--port", "0"]).pid
-
-        dask_nodes = 1 if dask_nodes is None else dask_nodes
-        if services.get_config_param("MPIRUN") == "eval":
-            dask_nodes = 1
-
-        if dask_worker_per_gpu:
-            gpn = services.get_config_param("GPUS_PER_NODE")
-            dask_nodes *= gpn
-            nthreads = dask_ppw if dask_ppw else services.get_config_param("PROCS_PER_NODE") // gpn
-            task_ppn = gpn
-            task_gpp = 1
-        else:
-            nthreads = dask_ppw if dask_ppw else services.get_config_param("PROCS_PER_NODE")
-            task_ppn = 1
-            task_gpp = 0
-
-        # --nprocs was removed in version 2022.10.0 and replaced with --nworkers
-        nworkers = "--nworkers" if tuple(map(int, self.distributed.__version__.split('.'))) >= (2022, 10, 0) else "--nprocs"
-
-        if use_shifter:
-            if shifter_args:
-                self.dask_workers_tid = services.launch_task(dask_nodes, os.getcwd(),
-                                                             self.shifter,
-                                                             shifter_args,
-                                                             "dask-worker",
-                                                             "--scheduler-file",
-                                                             self.dask_file_name,
-                                                             nworkers, 1,
-                                                             "--nthreads", nthreads,
-                                                             "--no-dashboard",
-                                                             task_ppn=task_ppn,
-                                                             task_gpp=task_gpp)
-            else:
-                self.dask_workers_tid = services.launch_task(dask_nodes, os.getcwd(),
-                                                             self.shifter,
-                                                             "dask-worker",
-                                                             "--scheduler-file",
-                                                             self.dask_file_name,
-                                                             nworkers, 1,
-                                                             "--nthreads", nthreads,
-                                                             "--no-dashboard",
-                                                             task_ppn=task_ppn,
-                                                             task_gpp=task_gpp)
+        if services.dask_cluster is not None:
+            self.dask_cluster = services.dask_cluster
+            self.dask_cluster.resize(dask_nodes)
+            if dask_worker_plugin is not None:
+                self.dask_cluster.client.register_worker_plugin(dask_worker_plugin)
         else:
-            self.dask_workers_tid = services.launch_task(dask_nodes, os.getcwd(),
-                                                         self.dask_worker,
-                                                         "--scheduler-file",
-                                                         self.dask_file_name,
-                                                         nworkers, 1,
-                                                         "--nthreads", nthreads,
-                                                         "--no-dashboard",
-                                                         task_ppn=task_ppn,
-                                                         task_gpp=task_gpp)
-
-        self.dask_client = self.dask.distributed.Client(scheduler_file=self.dask_file_name)
-
-        if dask_worker_plugin is not None:
-            self.dask_client.register_worker_plugin(dask_worker_plugin)
+            self.dask_cluster = DaskCluster(services, self.name, dask_ppw, use_shifter, shifter_args, dask_worker_per_gpu)
+            self.dask_cluster.start(dask_nodes, dask_worker_plugin)
+        self.dask_client = self.dask_cluster.client
 
         try:
-            self.worker_event_logfile = services.sim_name + '_' + services.get_config_param("PORTAL_RUNID") + '_' + self.name + '_{}.json'
+            self.worker_event_topic = services.sim_name + '_' + services.get_config_param("PORTAL_RUNID") + '_' + self.name
         except KeyError:
             # USE_PORTAL == False
-            self.worker_event_logfile = None
+            self.worker_event_topic = None
+        else:
+            self.worker_event_count = 0
+            self.dask_client.subscribe_topic(self.worker_event_topic, lambda event: self.worker_events.put(event[1]['event']))
 
+        # pickled by value, the workers may not import ipsframework
         launch.__module__ = "__main__"
+        _run_task.__module__ = "__main__"
         self.futures = []
         for task_name, task in self.queued_tasks.items():
             self.futures.append(self.dask_client.submit(launch,
@@ -2218,13 +2790,63 @@ class TaskPool:
                                                         task.working_dir,
                                                         *task.args,
                                                         **task.keywords,
-                                                        worker_event_logfile=self.worker_event_logfile))
+                                                        worker_event_topic=self.worker_event_topic,
+                                                        pure=False))
+        self.active_tasks = self.queued_tasks
+        self.queued_tasks = {}
+        return len(self.futures)
+
+    def submit_executor_tasks(self, use_executor='threads', executor_workers=None):
+        """Launch tasks in *queued_tasks* in a local executor of the
+        component process, a :class:`~concurrent.futures.ThreadPoolExecutor`
+        if *use_executor* is ``threads``, or a
+        :class:`~concurrent.futures.ProcessPoolExecutor` if it is
+        ``processes``, without starting the dask scheduler and workers.
+        The executor has one worker per core allocated to it on a node,
+        *executor_workers* or ``PROCS_PER_NODE`` cores, released after the
+        tasks have finished.  The callables run with ``processes`` must be
+        picklable, and those run with ``threads`` in the working directory
+        of the component.  Like with dask, the results are collected by
+        :meth:`get_finished_tasks_status`.
+
+        :param use_executor: ``threads`` or ``processes``, default ``threads``
+        :type use_executor: str
+        :param executor_workers: Number of workers, default is PROCS_PER_NODE
+        :type executor_workers: int
+        """
+        services: ServicesProxy = self.services
+        if use_executor not in self.executors:
+            services.error('Unknown task pool executor %s, expected one of %s', use_executor, tuple(self.executors))
+            raise ValueError(f"Unknown task pool executor {use_executor}")
+
+        nproc = executor_workers if executor_workers else services.get_config_param("PROCS_PER_NODE")
+        nproc = max(1, min(int(nproc), len(self.queued_tasks)))
+        try:
+            msg_id = services._invoke_service(services.fwk.component_id, 'init_task',
+                                              TaskInit(nproc, f'{use_executor}_executor', os.getcwd(), nproc, services.cpp, 0,
+                                                       True, False, False, False, [], None))
+            self.executor_task_id, _, _, _ = services._get_service_response(msg_id, block=True)
+        except Exception:
+            services.exception('Error allocating the %s executor of task pool %s', use_executor, self.name)
+            raise
+
+        self.executor = self.executors[use_executor](nproc)
+        self.futures = []
+        for task_name, task in self.queued_tasks.items():
+            self.futures.append(self.executor.submit(launch_local,
+                                                     use_executor == 'processes',
+                                                     task.binary,
+                                                     task_name,
+                                                     task.working_dir,
+                                                     *task.args,
+                                                     **task.keywords))
         self.active_tasks = self.queued_tasks
         self.queued_tasks = {}
         return len(self.futures)
 
     def submit_tasks(self, block=True, use_dask=False, dask_nodes=1, dask_ppw=None, launch_interval=0.0,
-                     use_shifter=False, shifter_args=None, dask_worker_plugin=None, dask_worker_per_gpu=False):
+                     use_shifter=False, shifter_args=None, dask_worker_plugin=None, dask_worker_per_gpu=False,
+                     use_executor=None, executor_workers=None):
         """Launch tasks in *queued_tasks*.  Finished tasks are handled before
         launching new ones.  If *block* is ``True``, the number of
         tasks submitted is returned after all tasks have been launched
@@ -2255,9 +2877,18 @@ class TaskPool:
         :type dask_worker_plugin: distributed.diagnostics.plugin.WorkerPlugin
         :param dask_worker_per_gpu: If true then a separate worker will be started for each GPU and binded to that GPU
         :type dask_worker_per_gpu: bool
+        :param use_executor: If ``threads`` or ``processes`` then use a local executor to launch tasks, see :meth:`submit_executor_tasks`
+        :type use_executor: str
+        :param executor_workers: Number of executor workers, default is PROCS_PER_NODE, only used if *use_executor* is set
+        :type executor_workers: int
 
         """
 
+        if use_executor:
+            if self.serial_pool:
+                return self.submit_executor_tasks(use_executor, executor_workers)
+            self.services.warning("Requested use_executor but cannot because multiple processors requested")
+
         if use_dask:
             if TaskPool.dask and TaskPool.distributed and self.serial_pool:
                 self.dask_pool = True
@@ -2278,10 +2909,7 @@ class TaskPool:
         while True:
             if len(self.queued_tasks) == 0:
                 break
-            active_tasks = self.services.launch_task_pool(self.name, launch_interval)
-            for task_name, task_id in active_tasks.items():
-                self.active_tasks[task_id] = self.queued_tasks.pop(task_name)
-                submit_count += 1
+            submit_count += self._launch_queued_tasks(launch_interval)
             if block:
                 self._wait_any_task()
                 continue
@@ -2291,6 +2919,71 @@ class TaskPool:
             self._wait_active_tasks()
         return submit_count
 
+    def _launch_queued_tasks(self, launch_interval=0.0):
+        """
+        Launch the tasks in *queued_tasks* that fit in the free resources,
+        and return how many were launched.
+        """
+        active_tasks = self.services.launch_task_pool(self.name, launch_interval)
+        launched = {}  # task_id -> tasks, more than one for a task pack
+        for task_name, task_id in active_tasks.items():
+            task = self.queued_tasks.pop(task_name)
+            task.start_time = self.services.task_map[task_id].start_time
+            launched.setdefault(task_id, []).append(task)
+        for task_id, tasks in launched.items():
+            self.active_tasks[task_id] = tasks if len(tasks) > 1 else tasks[0]
+        return len(active_tasks)
+
+    def iter_finished(self, launch_interval=0.0):
+        """Launch the tasks in *queued_tasks*, and yield ``(task_name,
+        exit_status, timing)`` for each task as soon as it finishes, so that
+        the results of a task can be processed while the others are
+        running.  Queued tasks are launched as resources become free.
+        *timing* is a dictionary with the *start_time*, *end_time* and
+        *elapsed_time* of the task.  Return when no task is queued or
+        active.
+
+        :param launch_internal: time to wait between launching tasks, default 0.0
+        :type launch_internal: float
+        """
+        while True:
+            if len(self.queued_tasks) > 0:
+                self._launch_queued_tasks(launch_interval)
+            if len(self.finished_tasks) > 0:
+                for task_name in list(self.finished_tasks.keys()):
+                    task = self.finished_tasks.pop(task_name)
+                    yield task_name, task.exit_status, {'start_time': task.start_time,
+                                                        'end_time': task.end_time,
+                                                        'elapsed_time': task.end_time - task.start_time}
+            elif len(self.active_tasks) > 0:
+                self._wait_any_task()
+            elif len(self.queued_tasks) > 0:
+                # the resources are used by other components
+                time.sleep(TaskCompletionNotifier.poll_interval)
+            else:
+                return
+
+    def _forward_worker_events(self, timeout):
+        """
+        Send the events received from the dask workers to the portal,
+        waiting up to *timeout* seconds for the first one.
+        """
+        events = []
+        try:
+            events.append(self.worker_events.get(timeout=timeout))
+            while True:
+                events.append(self.worker_events.get_nowait())
+        except queue.Empty:
+            pass
+        self.worker_event_count += len(events)
+        events.sort(key=itemgetter('event_time'))
+        for event in events:
+            try:
+                self.services._send_monitor_event(**event)
+            except Exception as e:
+                # If it fails for any other reason, make sure we can continue
+                self.services.exception('Error while sending dask worker event %s: %s', event, str(e))
+
     def get_dask_finished_tasks_status(self):
         """Return a dictionary of exit status values for all dask tasks that
         have finished since the last time finished tasks were polled.
@@ -2298,49 +2991,67 @@ class TaskPool:
         :return: dict mapping task name to exit status
         :rtype: dict
         """
+        if self.worker_event_topic is not None:
+            while not all(future.done() for future in self.futures):
+                self._forward_worker_events(TaskCompletionNotifier.poll_interval)
         result = self.dask_client.gather(self.futures)
-        worker_names = [''.join(c for c in worker['name'] if c.isalnum()) for worker in self.dask_client.scheduler_info()['workers'].values()]
-        self.dask_client.shutdown()
-        self.dask_client.close()
-        time.sleep(1)
-        if self.worker_event_logfile is not None:
-            try:
-                events = []
-                for worker in worker_names:
-                    filename = self.worker_event_logfile.format(worker)
-                    try:
-                        lines = open(filename).readlines()
-                    except IOError:
-                        self.services.exception('Error opening dask worker log file: %s', filename)
-                    else:
-                        # convert to dict and sort by event_time
-                        for line in lines:
-                            try:
-                                events.append(json.loads(line.strip()))
-                            except json.decoder.JSONDecodeError:
-                                self.services.exception('Error reading line %s from dask worker log file: %s', line.strip(), filename)
-
-                events.sort(key=itemgetter('event_time'))
-                for event in events:
-                    self.services._send_monitor_event(**event)
-            except Exception as e:
-                # If it fails for any other reason, make sure we can continue
-                self.services.exception('Error while reading dask worker log files: %s', str(e))
-            else:
-                for worker in worker_names:
-                    if os.path.isfile(self.worker_event_logfile.format(worker)):
-                        os.remove(self.worker_event_logfile.format(worker))
+        if self.worker_event_topic is not None:
+            # the events of the last tasks may arrive after their results
+            deadline = time.time() + 5
+            while self.worker_event_count < 2 * len(self.futures) and time.time() < deadline:
+                self._forward_worker_events(deadline - time.time())
+            self.dask_client.unsubscribe_topic(self.worker_event_topic)
+            self.worker_event_topic = None
+        if self.dask_cluster is not self.services.dask_cluster:
+            self.dask_cluster.shutdown()
 
         self.finished_tasks = {}
         self.active_tasks = {}
-        self.services.wait_task(self.dask_workers_tid)
-        self.dask_file_name = None
-        self.dask_workers_tid = None
-        self.dask_sched_pid = None
+        self.dask_cluster = None
+        self.dask_client = None
         self.dask_pool = False
         self.serial_pool = True
         return dict(result)
 
+    def get_executor_finished_tasks_status(self):
+        """Return a dictionary of exit status values for all the tasks
+        launched in the local executor, once they have all finished, and
+        release the cores of the executor.
+
+        :return: dict mapping task name to exit status
+        :rtype: dict
+        """
+        wait_futures(self.futures)
+        result = {}
+        events = []
+        try:
+            for future in self.futures:
+                task_name, ret_val, task_events = future.result()
+                result[task_name] = ret_val
+                events += task_events
+        finally:
+            self._shutdown_executor()
+        events.sort(key=itemgetter('event_time'))
+        for event in events:
+            self.services._send_monitor_event(**event)
+        return result
+
+    def _shutdown_executor(self, cancel=False):
+        """
+        Shut down the local executor and release its cores.
+        """
+        if cancel:
+            for future in self.futures:
+                future.cancel()
+        self.executor.shutdown(wait=not cancel)
+        self.executor = None
+        self.futures = None
+        self.finished_tasks = {}
+        self.active_tasks = {}
+        msg_id = self.services._invoke_service(self.services.fwk.component_id, 'finish_task', self.executor_task_id, 0)
+        self.executor_task_id = None
+        self.services._get_service_response(msg_id, block=True)
+
     def get_finished_tasks_status(self):
         """
         Return a dictionary of exit status values for all tasks that have
@@ -2351,6 +3062,8 @@ class TaskPool:
         """
         if self.dask_pool:
             return self.get_dask_finished_tasks_status()
+        if self.executor is not None:
+            return self.get_executor_finished_tasks_status()
         if len(self.active_tasks) + len(self.finished_tasks) == 0:
             raise Exception('No more active tasks in task pool %s' % self.name)
 
@@ -2365,7 +3078,9 @@ class TaskPool:
         """
         Kill all active tasks, clear all queued, blocked and finished tasks.
         """
-        if len(self.active_tasks) > 0:
+        if self.executor is not None:
+            self._shutdown_executor(cancel=True)
+        elif len(self.active_tasks) > 0:
             if self.dask_pool:
                 _ = [f.cancel() for f in self.futures]
                 self.futures = []
@@ -2378,6 +3093,114 @@ class TaskPool:
         self.finished_tasks = {}
 
 
+class DaskCluster:
+    """
+    Dask scheduler, and workers launched as tasks of the component
+    *services*, holding their cores until the cluster is shut down.  One
+    dask worker is started for each node unless *dask_worker_per_gpu* is
+    ``True``, where one dask worker is started for every GPU, with
+    *dask_ppw* threads, by default ``PROCS_PER_NODE`` divided among the
+    workers of a node.  *name* is used in the name of the scheduler file.
+    """
+
+    def __init__(self, services, name, dask_ppw=None, use_shifter=False, shifter_args=None, dask_worker_per_gpu=False):
+        self.services = services
+        self.file_name = os.path.join(os.getcwd(), f".{name}_dask_shed_{time.time()}.json")
+        self.use_shifter = use_shifter
+        self.shifter_args = shifter_args
+        if dask_worker_per_gpu:
+            self.gpn = services.get_config_param("GPUS_PER_NODE")
+            self.nthreads = dask_ppw if dask_ppw else services.get_config_param("PROCS_PER_NODE") // self.gpn
+        else:
+            self.gpn = 0
+            self.nthreads = dask_ppw if dask_ppw else services.get_config_param("PROCS_PER_NODE")
+        self.sched_pid = None
+        self.workers_tids = []  # task_id and number of nodes of each launch of workers
+        self.client = None
+
+    def _shifter_cmd(self):
+        if not self.use_shifter:
+            return []
+        if self.shifter_args:
+            return [TaskPool.shifter, self.shifter_args]
+        return [TaskPool.shifter]
+
+    def start(self, dask_nodes=1, dask_worker_plugin=None):
+        """
+        Start the scheduler and the workers of *dask_nodes* nodes, and
+        connect the client.
+        """
+        if self.use_shifter:
+            scheduler = self._shifter_cmd() + ["dask-scheduler"]
+        else:
+            scheduler = [TaskPool.dask_scheduler]
+        self.sched_pid = subprocess.Popen(scheduler + ["--no-dashboard", "--scheduler-file", self.file_name, "--port", "0"]).pid
+
+        self.resize(dask_nodes)
+
+        self.client = TaskPool.dask.distributed.Client(scheduler_file=self.file_name)
+
+        if dask_worker_plugin is not None:
+            self.client.register_worker_plugin(dask_worker_plugin)
+
+    @property
+    def nodes(self):
+        """
+        Number of nodes of the workers.
+        """
+        return sum(nodes for _, nodes in self.workers_tids)
+
+    def resize(self, dask_nodes):
+        """
+        Launch workers on more nodes if the cluster has less than
+        *dask_nodes* nodes, or stop the workers of the last launches as long
+        as at least *dask_nodes* nodes are left.
+        """
+        services = self.services
+        dask_nodes = 1 if dask_nodes is None else dask_nodes
+        if services.get_config_param("MPIRUN") == "eval":
+            dask_nodes = 1
+
+        while self.workers_tids and self.nodes - self.workers_tids[-1][1] >= dask_nodes:
+            task_id, _ = self.workers_tids.pop()
+            services.kill_task(task_id)
+        if self.nodes >= dask_nodes:
+            return
+
+        new_nodes = dask_nodes - self.nodes
+        if self.gpn:
+            nworkers, task_ppn, task_gpp = new_nodes * self.gpn, self.gpn, 1
+        else:
+            nworkers, task_ppn, task_gpp = new_nodes, 1, 0
+
+        # --nprocs was removed in version 2022.10.0 and replaced with --nworkers
+        nworkers_flag = "--nworkers" if tuple(map(int, TaskPool.distributed.__version__.split('.'))) >= (2022, 10, 0) else "--nprocs"
+
+        worker = self._shifter_cmd() + ["dask-worker"] if self.use_shifter else [TaskPool.dask_worker]
+        task_id = services.launch_task(nworkers, os.getcwd(),
+                                       *worker,
+                                       "--scheduler-file",
+                                       self.file_name,
+                                       nworkers_flag, 1,
+                                       "--nthreads", self.nthreads,
+                                       "--no-dashboard",
+                                       task_ppn=task_ppn,
+                                       task_gpp=task_gpp)
+        self.workers_tids.append((task_id, new_nodes))
+
+    def shutdown(self):
+        """
+        Shut down the scheduler and the workers, and release their cores.
+        """
+        self.client.shutdown()
+        self.client.close()
+        time.sleep(1)
+        for task_id, _ in self.workers_tids:
+            self.services.wait_task(task_id)
+        self.workers_tids = []
+        self.sched_pid = None
+
+
 class Task:
     r"""
     Container for task information:
@@ -2402,3 +3225,5 @@ class Task:
         self.args = [str(a) for a in args] if args else args
         self.keywords = keywords
         self.exit_status = None
+        self.start_time = None
+        self.end_time = None
@@ -2,6 +2,8 @@
 # Copyright 2006-2022 UT-Battelle, LLC. See LICENSE for more information.
 # -------------------------------------------------------------------------------
 import os
+import sys
+import time
 from math import ceil
 from collections import namedtuple
 from . import messages, configurationManager
@@ -10,11 +12,19 @@ from .ipsExceptions import BlockedMessageException, \
     InsufficientResourcesException, \
     BadResourceRequestException, \
     ResourceRequestMismatchException, \
-    GPUResourceRequestMismatchException
+    GPUResourceRequestMismatchException, \
+    MemoryResourceRequestMismatchException
 from .ipsutil import which
+from .utils import task_pack
 
 TaskInit = namedtuple("TaskInit",
-                      ["nproc", "binary", "working_dir", "tppn", "tcpp", "tgpp", "block", "omp", "wnodes", "wsocks", "cmd_args", "launch_cmd_extra_args"])
+                      ["nproc", "binary", "working_dir", "tppn", "tcpp", "tgpp", "block", "omp", "wnodes", "wsocks", "cmd_args", "launch_cmd_extra_args",
+                       "tmem", "runtime"])
+# memory in MB per process, 0 when not tracked, and estimated runtime in seconds
+TaskInit.__new__.__defaults__ = (0, None)
+
+#: Scheduling policies of :meth:`TaskManager.init_task_pool`
+TASK_POOL_POLICIES = ('fifo', 'largest_first', 'shortest_first', 'backfill')
 
 
 class TaskManager:
@@ -39,7 +49,8 @@ class TaskManager:
                                 'wait_call',
                                 'init_task',
                                 'init_task_pool',
-                                'finish_task']
+                                'finish_task',
+                                'get_task_agents']
         # **** this si where service methods are registered
         self.fwk.register_service_handler(self.service_methods,
                                           getattr(self, 'process_service_request'))
@@ -48,12 +59,26 @@ class TaskManager:
 
         # table of currently running tasks
         self.curr_task_table = {}
+        # task_id -> (estimated end time, cores) of task pool tasks with a runtime hint
+        self.task_estimates = {}
+        # task_id -> (pool key, start time, cores) and pool key -> usage of running task pools
+        self.pool_tasks = {}
+        self.pool_usage = {}
+        # message id -> (time first blocked, nproc, tppn) of the blocked init_task requests
+        self.blocked_tasks = {}
+        # message id of the blocked request holding the reserved nodes
+        self.reservation = None
+        self.reservation_threshold = 300.0  # see RESERVATION_THRESHOLD
         # nextCall
         self.next_call_id = 1
         self.next_task_id = 1
         self.outstanding_calls = {}
         self.finished_calls = {}
         self.mpicmd = None  # USed only for CCM on edison
+        # task launch agents of MPIRUN = agent
+        self.agent_processes = []
+        self.agent_addresses = {}
+        self.agent_authkey = None
 
     # this is where messages are received and then something smart happens
     def process_service_request(self, msg):
@@ -61,7 +86,7 @@ class TaskManager:
         Invokes the appropriate public data manager method for the component
         specified in *msg*.  Return method's return value.
         """
-        self.fwk.debug('Task Manager received message: %s', str(msg.__dict__))
+        self.fwk.debug('Task Manager received message: %s', msg)
         method = getattr(self, msg.target_method)
         retval = method(msg)
         return retval
@@ -82,10 +107,50 @@ class TaskManager:
         except Exception:
             print('Error accessing platform parameter MPIRUN')
             raise
+        reservation_threshold = self.config_mgr.get_platform_parameter('RESERVATION_THRESHOLD', silent=True)
+        if isinstance(reservation_threshold, (int, float)):
+            self.reservation_threshold = reservation_threshold
 
         # do later - subscribe to events, set up event publishing structure
         # publish "TM initialized" event
 
+    def start_agents(self, nodes=None):
+        """
+        Start a task launch agent on each node, or on the *nodes* added to
+        the resources, when ``MPIRUN = agent``.  The agents are started
+        with the ``AGENT_LAUNCHER`` platform parameter, formatted with the
+        node name, e.g. ``srun -N 1 -n 1 -w {node}``, or on the local host
+        if it is not set.
+        """
+        if self.task_launch_cmd != 'agent':
+            return
+        from .agent import start_agents  # pylint: disable=import-outside-toplevel
+        launcher = self.config_mgr.get_platform_parameter('AGENT_LAUNCHER', silent=True) or ''
+        if nodes is None:
+            nodes = list(self.resource_mgr.nodes)
+        processes, addresses, self.agent_authkey = start_agents(nodes, launcher, self.agent_authkey)
+        self.agent_processes.extend(processes)
+        self.agent_addresses.update(addresses)
+        self.fwk.debug('TM: task launch agents %s', addresses)
+
+    def stop_agents(self):
+        """
+        Terminate the task launch agents.
+        """
+        for process in self.agent_processes:
+            process.terminate()
+            process.wait()
+        self.agent_processes = []
+
+    def get_task_agents(self, msg):
+        """
+        Return the addresses of the task launch agents of each node, and
+        the key authenticating the connections to them.
+
+        *msg* is expected to be of type :py:obj:`messages.ServiceRequestMessage`
+        """
+        return self.agent_addresses, self.agent_authkey
+
     def get_call_id(self):
         """
         Return a new call id
@@ -159,6 +224,7 @@ class TaskManager:
         self.fwk.debug('TM:call_return() call_id = %s caller_id = %s', call_id, caller_id)
         self.finished_calls[call_id] = (caller_id, response_msg)
         del self.outstanding_calls[call_id]
+        self.fwk.notify_call_finished(call_id)
 
     def wait_call(self, wait_msg):
         """
@@ -187,7 +253,8 @@ class TaskManager:
         if not blocking:
             raise IncompleteCallException(call_id)
         else:
-            raise BlockedMessageException(wait_msg, '***call %s not finished' % call_id)
+            raise BlockedMessageException(wait_msg, '***call %s not finished' % call_id,
+                                          call_id=call_id)
 
     def init_task(self, init_task_msg):
         r"""
@@ -217,67 +284,125 @@ class TaskManager:
         6. *wsocks*: ``True`` for whole socket allocation, ``False`` otherwise.
 
         7. \+ *cmd_args*: any arguments for the executable
+
+        8. *tmem*: memory in MB per process for this task.  (0 indicates that memory is not accounted for.)
+
+        9. *runtime*: estimated runtime in seconds of the task, or ``None``.
+
+        A blocking request waiting for longer than ``RESERVATION_THRESHOLD``
+        seconds reserves nodes as they are released, see
+        :py:meth:`resourceManager.ResourceManager.reserve_nodes`, so that it
+        is not starved by smaller requests.  While the reservation holds,
+        other tasks only use the reserved nodes if they are estimated to
+        finish before the tasks running on these nodes.
         """
         caller_id = init_task_msg.sender_id
         taskInit = init_task_msg.args[0]
+        key = init_task_msg.message_id
 
         try:
-            return self._init_task(caller_id, int(taskInit.nproc), taskInit.binary, taskInit.working_dir,
+            task = self._init_task(caller_id, int(taskInit.nproc), taskInit.binary, taskInit.working_dir,
                                    int(taskInit.tppn), taskInit.tcpp, taskInit.omp, taskInit.tgpp, taskInit.wnodes, taskInit.wsocks,
-                                   taskInit.cmd_args, taskInit.launch_cmd_extra_args)
+                                   taskInit.cmd_args, taskInit.launch_cmd_extra_args, tmem=taskInit.tmem,
+                                   use_reservation=key == self.reservation or self._backfills(taskInit.runtime))
         except InsufficientResourcesException:
             if taskInit.block:
+                self.blocked_tasks.setdefault(key, (time.time(), int(taskInit.nproc), int(taskInit.tppn)))
+                self._check_reservation()
                 raise BlockedMessageException(init_task_msg, '***%s waiting for %d resources' %
-                                              (caller_id, taskInit.nproc))
+                                              (caller_id, taskInit.nproc),
+                                              nproc=int(taskInit.nproc))
             else:
                 raise
         except BadResourceRequestException as e:
             self.fwk.error("There has been a fatal error, %s requested %d too many processors in task %d",
                            caller_id, e.deficit, e.task_id)
+            self._forget_request(key)
             raise
         except ResourceRequestMismatchException as e:
             self.fwk.error("There has been a fatal error, %s requested too few processors per node to launch task %d (requested: procs = %d, ppn = %d)",
                            caller_id, e.task_id, e.nproc, e.ppn)
+            self._forget_request(key)
             raise
         except GPUResourceRequestMismatchException as e:
             self.fwk.error("There has been a fatal error, %s requested too many GPUs per node to launch task %d (requested: ppn = %d, gpp = %d)",
                            caller_id, e.task_id, e.ppn, e.gpp)
+            self._forget_request(key)
+            raise
+        except MemoryResourceRequestMismatchException as e:
+            self.fwk.error("There has been a fatal error, %s requested too much memory per node to launch task %d (requested: ppn = %d, mem = %d MB)",
+                           caller_id, e.task_id, e.ppn, e.mem)
+            self._forget_request(key)
             raise
         except Exception:
+            self._forget_request(key)
             raise
 
-    def _init_task(self, caller_id, nproc, binary, working_dir, tppn, tcpp, omp, tgpp, wnodes, wsocks, cmd_args, launch_cmd_extra_args):
+        self._forget_request(key)
+        if taskInit.runtime is not None:
+            task_id, _, _, cores_allocated = task
+            self.task_estimates[task_id] = (time.time() + taskInit.runtime, cores_allocated)
+        return task
+
+    def _forget_request(self, key):
+        """
+        Stop tracking the request *key*, which started or failed, as blocked,
+        and cancel its reservation.
+        """
+        self.blocked_tasks.pop(key, None)
+        if key == self.reservation:
+            self.reservation = None
+            self.resource_mgr.cancel_reservation()
+
+    def _init_task(self, caller_id, nproc, binary, working_dir, tppn, tcpp, omp, tgpp, wnodes, wsocks, cmd_args, launch_cmd_extra_args,
+                   task_id=None, launch_nproc=None, tmem=0, use_reservation=False):
         # handle for task related things
-        task_id = self.get_task_id()
+        if task_id is None:
+            task_id = self.get_task_id()
 
-        allocation = self.resource_mgr.get_allocation(caller_id,
-                                                      nproc,
-                                                      task_id,
-                                                      wnodes,
-                                                      wsocks,
-                                                      task_ppn=tppn,
-                                                      task_cpp=tcpp,
-                                                      task_gpp=tgpp)
+        start_time = time.perf_counter()
+        try:
+            allocation = self.resource_mgr.get_allocation(caller_id,
+                                                          nproc,
+                                                          task_id,
+                                                          wnodes,
+                                                          wsocks,
+                                                          task_ppn=tppn,
+                                                          task_cpp=tcpp,
+                                                          task_gpp=tgpp,
+                                                          task_mem=tmem,
+                                                          use_reservation=use_reservation)
+        finally:
+            self.fwk.metrics.record_operation('ResourceManager.get_allocation', time.perf_counter() - start_time)
         self.fwk.debug('RM: get_allocation() returned %s', str(allocation))
 
-        if allocation.partial_node or allocation.accurateNodes:
+        if allocation.partial_node or allocation.accurateNodes or self.task_launch_cmd == 'agent':
             nodes = ','.join(allocation.nodelist)
         else:
             nodes = ''
 
-        (cmd, env_update) = self.build_launch_cmd(nproc, binary, cmd_args,
+        if launch_nproc is None:
+            launch_nproc, ppn, cpp = nproc, allocation.ppn, allocation.cpp
+        else:
+            # fewer processes using all the allocated cores
+            ppn, cpp = launch_nproc, allocation.cpp and allocation.cpp * nproc // launch_nproc
+
+        start_time = time.perf_counter()
+        (cmd, env_update) = self.build_launch_cmd(launch_nproc, binary, cmd_args,
                                                   working_dir,
-                                                  allocation.ppn,
+                                                  ppn,
                                                   allocation.max_ppn,
                                                   nodes,
                                                   allocation.accurateNodes,
                                                   allocation.partial_node,
                                                   task_id,
-                                                  allocation.cpp,
+                                                  cpp,
                                                   omp,
                                                   tgpp,
                                                   allocation.corelist,
-                                                  launch_cmd_extra_args)
+                                                  launch_cmd_extra_args,
+                                                  allocation.gpulist)
+        self.fwk.metrics.record_operation('TaskManager.build_launch_cmd', time.perf_counter() - start_time)
 
         self.curr_task_table[task_id] = {'component': caller_id,
                                          'status': 'init_task',
@@ -289,10 +414,51 @@ class TaskManager:
 
         return (task_id, cmd, env_update, allocation.cores_allocated)
 
+    def _check_reservation(self):
+        """
+        Reserve nodes for the oldest blocked request once it has waited for
+        longer than ``self.reservation_threshold`` seconds, unless a
+        reservation already holds.
+        """
+        if self.reservation is not None or not self.blocked_tasks or self.reservation_threshold <= 0:
+            return
+        key, (blocked_time, nproc, tppn) = min(self.blocked_tasks.items(), key=lambda item: item[1][0])
+        if time.time() - blocked_time >= self.reservation_threshold:
+            self.fwk.debug('TM: reserving nodes for request %s of %d processes blocked since %s',
+                           key, nproc, time.ctime(blocked_time))
+            self.reservation = key
+            self.resource_mgr.reserve_nodes(key, nproc, tppn)
+
+    def _backfills(self, runtime):
+        """
+        Return ``True`` if a task estimated to run for *runtime* seconds
+        finishes before the tasks running on the reserved nodes, so it may
+        use these nodes.
+        """
+        if self.reservation is None or runtime is None:
+            return False
+        end_times = [self.task_estimates.get(task_id, (float('inf'),))[0] for task_id in self.resource_mgr.reserved_tasks()]
+        start_time = max(end_times) if end_times else time.time()
+        return time.time() + runtime <= start_time < float('inf')
+
+    def _init_task_pack(self, caller_id, members, use_reservation=False):
+        """
+        Allocate the cores of the single process tasks *members* on one
+        node, and build the command launching them together as one process,
+        :mod:`ipsframework.utils.task_pack`, which runs the members
+        described in its pack file.
+        """
+        first = members[0]
+        task_id = self.get_task_id()
+        cmd_args = [os.path.abspath(task_pack.__file__), task_pack.pack_file_name(first.working_dir, task_id)]
+        return self._init_task(caller_id, len(members), sys.executable, first.working_dir, len(members), first.tcpp,
+                               first.omp, first.tgpp, first.wnodes, first.wsocks, cmd_args, first.launch_cmd_extra_args,
+                               task_id=task_id, launch_nproc=1, tmem=first.tmem, use_reservation=use_reservation)
+
     def build_launch_cmd(self, nproc, binary, cmd_args, working_dir, ppn,
                          max_ppn, nodes, accurateNodes, partial_nodes,
                          task_id, cpp=0, omp=False, gpp=0, core_list='',
-                         launch_cmd_extra_args=None):
+                         launch_cmd_extra_args=None, gpu_list=None):
         """
         Construct task launch command to be executed by the component.
 
@@ -307,19 +473,43 @@ class TaskManager:
          * partial_nodes - if ``True`` and *accurateNodes* and *task_launch_cmd* == 'mpirun',
                a host file is created specifying the exact placement of processes on cores.
          * core_list - used for creating host file with process to core mappings
+         * gpu_list - list of (node, gpus) tuples of the ids of the GPUs allocated to the task, exported as
+               ``CUDA_VISIBLE_DEVICES`` and ``ROCR_VISIBLE_DEVICES`` when they are the same on all the nodes
+        """
+        cmd, env_update = self._launcher_cmd(nproc, binary, cmd_args, working_dir, ppn,
+                                             max_ppn, nodes, accurateNodes, partial_nodes,
+                                             task_id, cpp, omp, gpp, core_list,
+                                             launch_cmd_extra_args)
+        if gpu_list:
+            devices = {','.join(str(gpu) for gpu in gpus) for _, gpus in gpu_list}
+            if len(devices) == 1:
+                env_update = dict(env_update or {})
+                env_update['CUDA_VISIBLE_DEVICES'] = env_update['ROCR_VISIBLE_DEVICES'] = devices.pop()
+            else:
+                self.fwk.debug('TM: task %d uses different GPUs on each node, not binding them', task_id)
+        return cmd, env_update
+
+    def _launcher_cmd(self, nproc, binary, cmd_args, working_dir, ppn,
+                      max_ppn, nodes, accurateNodes, partial_nodes,
+                      task_id, cpp, omp, gpp, core_list,
+                      launch_cmd_extra_args):
+        """
+        Construct the command and environment of :py:meth:`build_launch_cmd`
+        for the parallel launcher of the platform.
         """
         # set up launch command
         env_update = None
         nproc_flag = ''
         smp_node = len(self.resource_mgr.nodes) == 1
 
-        if self.task_launch_cmd == 'eval':
-            # cmd = binary
+        if self.task_launch_cmd in ('eval', 'agent'):
+            # cmd = binary, run by the agent of the first node with MPIRUN = agent
+            launcher = ['agent', nodes.split(',')[0]] if self.task_launch_cmd == 'agent' else []
             if len(cmd_args) > 0:
                 cmd_args = ' '.join(cmd_args)
-                cmd = ' '.join([binary, cmd_args])
+                cmd = ' '.join(launcher + [binary, cmd_args])
             else:
-                cmd = binary
+                cmd = ' '.join(launcher + [binary])
             return cmd, env_update
 
         # -------------------------------------
@@ -542,54 +732,191 @@ class TaskManager:
         """
         Allocate resources needed for a new task and build the task
         launch command using the binary and arguments provided by
-        the requesting component.
+        the requesting component.  The tasks are considered in the order
+        given by the scheduling *policy*, and the tasks that do not fit in
+        the free resources are left for a later request:
+
+        * ``fifo``: in the order of *task_dict*, launching every task that fits
+        * ``largest_first``: by decreasing number of processes (first-fit decreasing)
+        * ``shortest_first``: by increasing *runtime_hints*, tasks without hint last
+        * ``backfill``: in the order of *task_dict*, the first task that does
+          not fit reserves the cores it needs at the time the running tasks
+          are estimated to free them, and the following tasks are only
+          launched if they finish before this time or fit in the cores left
+          over by the reservation (EASY backfill).  Running tasks without
+          runtime hint are assumed to never finish.
 
         *init_task_msg* is expected to be of type :py:obj:`messages.ServiceRequestMessage`
 
         Message args:
 
         0. *task_dict*: dictionary of task names and objects
+
+        1. *policy*: scheduling policy, one of :data:`TASK_POOL_POLICIES` (optional, default ``fifo``)
+
+        2. *runtime_hints*: dictionary of task names and estimated runtimes in seconds (optional)
+
+        3. *task_pool_name*: name of the task pool, used to report its core utilization (optional)
+
+        4. *pack_size*: maximum number of single process tasks, with the
+           same launch options, launched together by one launcher
+           invocation, see :mod:`ipsframework.utils.task_pack` (optional,
+           default 1, no packing).  The members of a pack share the
+           same task id and launch command.
         """
         caller_id = init_task_msg.sender_id
         task_dict = init_task_msg.args[0]
+        policy = init_task_msg.args[1] if len(init_task_msg.args) > 1 else 'fifo'
+        runtime_hints = init_task_msg.args[2] if len(init_task_msg.args) > 2 else {}
+        pool_key = (str(caller_id), init_task_msg.args[3] if len(init_task_msg.args) > 3 else None)
+        pack_size = min(init_task_msg.args[4] if len(init_task_msg.args) > 4 else 1, int(self.resource_mgr.max_ppn))
+        if policy not in TASK_POOL_POLICIES:
+            self.fwk.error("Unknown task pool scheduling policy %s, expected one of %s", policy, TASK_POOL_POLICIES)
+            raise ValueError(f"Unknown task pool scheduling policy {policy}")
+        reservation = None  # [start time, extra cores] of the first task that did not fit when backfilling
         ret_dict = {}
-        for task_name in task_dict:
+        for task_names in self._pack_tasks(self._task_pool_order(task_dict, policy, runtime_hints), task_dict, pack_size):
             # handle for task related things
-            taskInit = task_dict[task_name]
+            taskInit = task_dict[task_names[0]]
+            nproc = taskInit.nproc * len(task_names)
+            runtimes = [runtime_hints.get(task_name) for task_name in task_names]
+            runtime = None if None in runtimes else max(runtimes)
+            ends_before_reservation = reservation is not None and runtime is not None and time.time() + runtime <= reservation[0]
+            if reservation is not None and not ends_before_reservation and nproc > reservation[1]:
+                continue
 
             try:
-                ret_dict[task_name] = self._init_task(caller_id, taskInit.nproc, taskInit.binary, taskInit.working_dir,
-                                                      taskInit.tppn, taskInit.tcpp, taskInit.omp, taskInit.tgpp, taskInit.wnodes,
-                                                      taskInit.wsocks, taskInit.cmd_args, taskInit.launch_cmd_extra_args)
+                use_reservation = self._backfills(runtime)
+                if len(task_names) > 1:
+                    task = self._init_task_pack(caller_id, [task_dict[task_name] for task_name in task_names], use_reservation)
+                else:
+                    task = self._init_task(caller_id, taskInit.nproc, taskInit.binary, taskInit.working_dir,
+                                           taskInit.tppn, taskInit.tcpp, taskInit.omp, taskInit.tgpp, taskInit.wnodes,
+                                           taskInit.wsocks, taskInit.cmd_args, taskInit.launch_cmd_extra_args,
+                                           tmem=taskInit.tmem, use_reservation=use_reservation)
             except InsufficientResourcesException:
+                if policy == 'backfill' and reservation is None:
+                    reservation = self._reserve_cores(nproc)
                 continue
             except BadResourceRequestException as e:
                 self.fwk.error("There has been a fatal error, %s requested %d too many processors in task %d",
                                caller_id, e.deficit, e.task_id)
-                for task_id, _, _, _ in ret_dict.values():
-                    self.resource_mgr.release_allocation(task_id, -1)
-                    del self.curr_task_table[task_id]
+                self._release_task_pool(ret_dict)
                 raise
             except ResourceRequestMismatchException as e:
                 self.fwk.error("There has been a fatal error, %s requested too few processors per node to launch task %d (request: procs = %d, ppn = %d)",
                                caller_id, e.task_id, e.nproc, e.ppn)
-                for task_id, _, _, _ in ret_dict.values():
-                    self.resource_mgr.release_allocation(task_id, -1)
-                    del self.curr_task_table[task_id]
+                self._release_task_pool(ret_dict)
                 raise
             except GPUResourceRequestMismatchException as e:
                 self.fwk.error("There has been a fatal error, %s requested too many GPUs per node to launch task %d (requested: ppn = %d, gpp = %d)",
                                caller_id, e.task_id, e.ppn, e.gpp)
-                for task_id, _, _, _ in ret_dict.values():
-                    self.resource_mgr.release_allocation(task_id, -1)
-                    del self.curr_task_table[task_id]
+                self._release_task_pool(ret_dict)
+                raise
+            except MemoryResourceRequestMismatchException as e:
+                self.fwk.error("There has been a fatal error, %s requested too much memory per node to launch task %d (requested: ppn = %d, mem = %d MB)",
+                               caller_id, e.task_id, e.ppn, e.mem)
+                self._release_task_pool(ret_dict)
                 raise
             except Exception:
                 self.fwk.exception('TM:init_task_pool(): Allocation exception')
                 raise
 
+            for task_name in task_names:
+                ret_dict[task_name] = task
+            task_id, _, _, cores_allocated = task
+            if reservation is not None and not ends_before_reservation:
+                reservation[1] -= cores_allocated
+            start_time = time.time()
+            if runtime is not None:
+                self.task_estimates[task_id] = (start_time + runtime, cores_allocated)
+            self.pool_tasks[task_id] = (pool_key, start_time, cores_allocated)
+            usage = self.pool_usage.setdefault(pool_key, {'start_time': start_time, 'core_seconds': 0.0, 'running': 0})
+            usage['running'] += 1
+
         return ret_dict
 
+    @staticmethod
+    def _task_pool_order(task_dict, policy, runtime_hints):
+        """
+        Return the names of the tasks in *task_dict* in the order they are
+        considered by the scheduling *policy*.
+        """
+        if policy == 'largest_first':
+            return sorted(task_dict, key=lambda task_name: -task_dict[task_name].nproc)
+        if policy == 'shortest_first':
+            return sorted(task_dict, key=lambda task_name: runtime_hints.get(task_name, float('inf')))
+        return list(task_dict)
+
+    @staticmethod
+    def _pack_tasks(task_names, task_dict, pack_size):
+        """
+        Return the list of the groups of *task_names* launched together:
+        packs of up to *pack_size* single process tasks with the same launch
+        options, ordered by their first task, and the other tasks alone.
+        Tasks using OpenMP, GPUs or whole nodes are not packed.
+        """
+        groups = []
+        packs = {}  # launch options -> pack being filled
+        for task_name in task_names:
+            task = task_dict[task_name]
+            if pack_size <= 1 or task.nproc != 1 or task.omp or task.tgpp or task.wnodes:
+                groups.append([task_name])
+                continue
+            options = (task.tppn, task.tcpp, task.wnodes, task.wsocks, str(task.launch_cmd_extra_args), task.tmem)
+            pack = packs.get(options)
+            if pack is None or len(pack) == pack_size:
+                pack = packs[options] = []
+                groups.append(pack)
+            pack.append(task_name)
+        return groups
+
+    def _reserve_cores(self, nproc):
+        """
+        Return the estimated time at which *nproc* cores are free, from the
+        estimated end time of the running tasks, and the number of cores
+        also free at that time.
+        """
+        free_cores = self.resource_mgr.avail_cores
+        for end_time, cores in sorted(self.task_estimates.values()):
+            free_cores += cores
+            if free_cores >= nproc:
+                return [end_time, free_cores - nproc]
+        return [float('inf'), 0]
+
+    def _release_task_pool(self, ret_dict):
+        """
+        Release the allocations of the tasks of *ret_dict*, which will not
+        be launched.
+        """
+        for task_id in {task[0] for task in ret_dict.values()}:
+            self.resource_mgr.release_allocation(task_id, -1)
+            del self.curr_task_table[task_id]
+            self._finish_pool_task(task_id, report=False)
+
+    def _finish_pool_task(self, task_id, report=True):
+        """
+        Account for the end of task *task_id* if it belongs to a task pool,
+        reporting the core utilization of the pool in the resource usage
+        file when its last running task finishes.
+        """
+        self.task_estimates.pop(task_id, None)
+        try:
+            pool_key, start_time, cores = self.pool_tasks.pop(task_id)
+        except KeyError:
+            return
+        usage = self.pool_usage[pool_key]
+        end_time = time.time()
+        usage['core_seconds'] += cores * (end_time - start_time)
+        usage['running'] -= 1
+        if usage['running'] == 0:
+            del self.pool_usage[pool_key]
+            elapsed_time = end_time - usage['start_time']
+            if report and elapsed_time > 0:
+                utilization = usage['core_seconds'] / (self.resource_mgr.total_cores * elapsed_time)
+                self.resource_mgr.report_RM_status("task pool %s of %s core utilization %.2f %%" %
+                                                   (pool_key[1], pool_key[0], 100 * utilization))
+
     def finish_task(self, finish_task_msg):
         """
         Cleanup after a task launched by a component terminates
@@ -607,6 +934,8 @@ class TaskManager:
         try:
             self.resource_mgr.release_allocation(task_id, task_data)
             del self.curr_task_table[task_id]
+            self._finish_pool_task(task_id)
+            self._check_reservation()
         except Exception:
             print('Error finishing task ', task_id)
             raise
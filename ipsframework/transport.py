@@ -0,0 +1,76 @@
+# -------------------------------------------------------------------------------
+# Copyright 2006-2022 UT-Battelle, LLC. See LICENSE for more information.
+# -------------------------------------------------------------------------------
+"""
+Transports for the messages exchanged by the framework and the components,
+selected with the ``MESSAGE_TRANSPORT`` platform configuration value:
+
+  * ``queue``: :class:`multiprocessing.Queue` (default)
+  * ``pipe``: :class:`PipeQueue`
+
+:mod:`ipsframework.utils.transport_benchmark` compares them.
+"""
+import pickle
+import queue
+from multiprocessing import Lock, Pipe, Queue
+
+TRANSPORTS = ('queue', 'pipe')
+
+
+class PipeQueue:
+    """
+    Message queue built on a pipe, with the part of the
+    :class:`multiprocessing.Queue` interface used by the framework.
+
+    Messages are pickled and written by the process putting them, instead
+    of by a feeder thread, and read by a single consumer.  Unlike
+    :class:`multiprocessing.Queue`, :meth:`put` blocks while the pipe is
+    full, so the consumer of the queue must keep reading it.
+    """
+
+    def __init__(self):
+        self._reader, self._writer = Pipe(duplex=False)
+        self._write_lock = Lock()
+
+    def put(self, obj):
+        """
+        Put *obj* in the queue.
+        """
+        data = pickle.dumps(obj, pickle.HIGHEST_PROTOCOL)
+        with self._write_lock:
+            self._writer.send_bytes(data)
+
+    def get(self, block=True, timeout=None):
+        """
+        Remove and return an object from the queue, waiting at most
+        *timeout* seconds if *block* is ``True``.  Raise
+        :exc:`queue.Empty` if no object is available.
+        """
+        if not block:
+            timeout = 0
+        if timeout is not None and not self._reader.poll(timeout):
+            raise queue.Empty
+        return pickle.loads(self._reader.recv_bytes())
+
+    def get_nowait(self):
+        """
+        Equivalent to ``get(False)``.
+        """
+        return self.get(False)
+
+    def empty(self):
+        """
+        Return ``True`` if the queue is empty.
+        """
+        return not self._reader.poll()
+
+
+def new_queue(transport='queue'):
+    """
+    Return a new message queue using *transport*, one of :data:`TRANSPORTS`.
+    """
+    if transport == 'queue':
+        return Queue(0)
+    if transport == 'pipe':
+        return PipeQueue()
+    raise ValueError(f"bad value for MESSAGE_TRANSPORT {transport}. expected one of {', '.join(TRANSPORTS)}.")
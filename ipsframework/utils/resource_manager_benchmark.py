@@ -0,0 +1,245 @@
+# -------------------------------------------------------------------------------
+# Copyright 2006-2022 UT-Battelle, LLC. See LICENSE for more information.
+# -------------------------------------------------------------------------------
+"""
+Measure the throughput of the resource manager and task manager replaying a
+trace of task requests on machines of 100, 1000 and 10000 nodes of 64
+cores::
+
+    python -m ipsframework.utils.resource_manager_benchmark
+
+The requests that do not fit are retried after each release, like the
+blocked requests of the task manager.  The allocations go through
+:meth:`~ipsframework.taskManager.TaskManager._init_task`, which also builds
+the launch command of ``--launcher``, or straight to the resource manager
+with ``--launcher none``.  For each machine, the allocation attempts and
+releases per second, the 99th percentile of the allocation latency, the
+mean core utilization and fragmentation and the time to run the trace are
+reported.  ``--policy`` selects the placement policies to compare.
+
+The trace is generated, or read from the ``resource_usage.csv`` file of
+a simulation with ``--trace``, see :func:`load_trace`.
+"""
+import argparse
+import heapq
+import os
+import random
+import time
+from ipsframework.ipsExceptions import InsufficientResourcesException
+from ipsframework.messages import ServiceRequestMessage
+from ipsframework.metrics import FrameworkMetrics
+from ipsframework.resourceManager import PLACEMENT_POLICIES, ResourceManager
+from ipsframework.resource_usage import ResourceUsageRecorder, load
+from ipsframework.taskManager import TaskManager
+
+#: Launch commands built by the task manager during the replay
+LAUNCHERS = ('srun', 'eval')
+
+
+class _Framework:
+    """
+    The framework services used by the resource and task managers.
+    """
+
+    def __init__(self):
+        self.metrics = FrameworkMetrics()
+
+    def register_service_handler(self, service_list, handler):
+        pass
+
+    def notify_resources_released(self):
+        pass
+
+    def notify_capacity_changed(self):
+        pass
+
+    def debug(self, *args):
+        pass
+
+    warning = error = debug
+
+
+def make_trace(count=100000, nodes=10000, cores=64, seed=0):
+    """
+    Return a trace of *count* task requests ``(nproc, whole_nodes,
+    whole_socks, duration)`` for a machine of *nodes* nodes of *cores*
+    cores: mostly small shared node tasks, some whole socket tasks and a
+    few whole node tasks of up to 1 % of the nodes.  *duration* is the
+    number of following requests during which the task runs, enough to
+    fill the machine.
+    """
+    rng = random.Random(seed)
+    trace = []
+    for _ in range(count):
+        kind = rng.random()
+        if kind < 0.8:
+            request = (rng.choice((1, 2, 4, 8)), False, False)
+        elif kind < 0.95:
+            request = (cores // 2 * rng.randint(1, 4), False, True)
+        else:
+            request = (cores * rng.randint(1, max(1, nodes // 100)), True, True)
+        trace.append(request + (rng.randint(1, 2 * nodes),))
+    return trace
+
+
+def load_trace(file_name):
+    """
+    Return the trace of the allocations recorded in the resource usage file
+    *file_name* of a simulation, in the format of :func:`make_trace`.  The
+    number of processes of a task is the change of the processes column at
+    its allocation, and its duration the number of allocations before its
+    release.  The file does not record whole socket requests, they are
+    replayed as shared node requests.
+    """
+    _, usage = load(file_name)
+    trace = []
+    started = {}  # task id -> position in the trace
+    processes = 0
+    for event, task_id, procs, notes in zip(usage['event'], usage['task_id'], usage['processes'], usage['notes']):
+        if event == 'allocate':
+            started[task_id] = len(trace)
+            whole_nodes = 'whole nodes' in notes
+            trace.append([procs - processes, whole_nodes, whole_nodes, None])
+        elif event == 'release' and task_id in started:
+            start = started.pop(task_id)
+            trace[start][3] = max(1, len(trace) - start)
+        processes = procs
+    for start in started.values():
+        trace[start][3] = len(trace) - start + 1
+    return [tuple(request) for request in trace]
+
+
+def make_managers(nodes, cores, sockets, policy='FIRST_FIT', launcher='srun'):
+    """
+    Return a resource manager of *nodes* nodes of *cores* cores and
+    *sockets* sockets, like the ``cmd_nodes`` and ``cmd_ppn`` override of
+    :meth:`~ipsframework.resourceManager.ResourceManager.initialize`, placing
+    the tasks with *policy*, and a task manager building *launcher*
+    commands.
+    """
+    fwk = _Framework()
+    rm = ResourceManager(fwk)
+    rm.usage = ResourceUsageRecorder(os.devnull)
+    rm.host = 'benchmark'
+    rm.node_alloc_mode = 'SHARED'
+    rm.placement_policy = policy
+    rm.cores_per_node = rm.ppn = rm.max_ppn = cores
+    rm.sockets_per_node = sockets
+    rm.cores_per_socket = cores // sockets
+    rm.total_cores = rm.avail_cores = rm.add_nodes([(f'node{i}', cores) for i in range(nodes)])
+    rm.begin_RM_report()
+
+    tm = TaskManager(fwk)
+    tm.resource_mgr = rm
+    tm.task_launch_cmd = launcher
+    return rm, tm
+
+
+def replay(trace, nodes=10000, cores=64, sockets=2, policy='FIRST_FIT', launcher=None):
+    """
+    Replay *trace* on a machine of *nodes* nodes of *cores* cores and
+    *sockets* sockets, placing the tasks with *policy*.  The allocations go
+    through the task manager building *launcher* commands, or straight to
+    the resource manager if *launcher* is ``None``.  When requests are
+    blocked, the running task that ends first is released and all the
+    blocked requests are retried.  Return a dictionary of:
+
+      * *allocations*: allocation attempts per second
+      * *releases*: releases per second
+      * *p99_latency*: 99th percentile of the allocation attempt times, in seconds
+      * *utilization*: mean percentage of the allocated cores
+      * *node_fragmentation*, *socket_fragmentation*: mean percentages of
+        the available cores on partially allocated nodes and sockets, see
+        :py:meth:`~ipsframework.resourceManager.ResourceManager.fragmentation`
+      * *makespan*: time when the last task ends, in requests
+    """
+    rm, tm = make_managers(nodes, cores, sockets, policy, launcher)
+    if launcher is None:
+        def allocate(task_id, nproc, whole_nodes, whole_socks):
+            rm.get_allocation('benchmark', nproc, task_id, whole_nodes, whole_socks)
+
+        def release(task_id):
+            rm.release_allocation(task_id, 0)
+    else:
+        def allocate(task_id, nproc, whole_nodes, whole_socks):
+            tm._init_task('benchmark', nproc, 'benchmark', '/tmp', 0, 0, False, 0, whole_nodes, whole_socks,
+                          ['input'], None, task_id=task_id)
+
+        def release(task_id):
+            tm.finish_task(ServiceRequestMessage('benchmark', 'benchmark', 'benchmark', 'finish_task', task_id, 0))
+
+    running = []  # heap of (end, task_id)
+    blocked = []
+    latencies = []
+    releases = 0
+    release_time = 0.0
+    node_frag = sock_frag = utilization = 0.0
+    makespan = 0
+    try:
+        for task_id, (nproc, whole_nodes, whole_socks, duration) in enumerate(trace):
+            now = task_id
+            blocked.append((task_id, nproc, whole_nodes, whole_socks, duration))
+            while blocked:
+                start = time.perf_counter()
+                while running and running[0][0] <= now:
+                    release(heapq.heappop(running)[1])
+                    releases += 1
+                release_time += time.perf_counter() - start
+                still_blocked = []
+                for request in blocked:
+                    start = time.perf_counter()
+                    try:
+                        allocate(*request[:4])
+                    except InsufficientResourcesException:
+                        still_blocked.append(request)
+                    else:
+                        heapq.heappush(running, (now + request[4], request[0]))
+                        makespan = max(makespan, now + request[4])
+                    latencies.append(time.perf_counter() - start)
+                blocked = still_blocked
+                if blocked:
+                    now = running[0][0]
+            fragmentation = rm.fragmentation()
+            node_frag += fragmentation[0]
+            sock_frag += fragmentation[1]
+            utilization += rm.alloc_cores / rm.total_cores
+    finally:
+        rm.close_report()
+    latencies.sort()
+    return {'allocations': len(latencies) / sum(latencies),
+            'releases': releases / release_time,
+            'p99_latency': latencies[int(0.99 * (len(latencies) - 1))],
+            'utilization': 100 * utilization / len(trace),
+            'node_fragmentation': node_frag / len(trace),
+            'socket_fragmentation': sock_frag / len(trace),
+            'makespan': makespan}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the IPS resource manager')
+    parser.add_argument('-n', '--nodes', type=int, action='append',
+                        help='number of nodes, may be repeated (default: 100, 1000 and 10000)')
+    parser.add_argument('-c', '--cores', type=int, default=64, help='number of cores per node')
+    parser.add_argument('-s', '--sockets', type=int, default=2, help='number of sockets per node')
+    parser.add_argument('-t', '--tasks', type=int, default=100000, help='number of generated task requests')
+    parser.add_argument('--trace', help='resource_usage.csv file of the task requests to replay')
+    parser.add_argument('-l', '--launcher', choices=LAUNCHERS + ('none',), default='srun',
+                        help='launch command built by the task manager, none to only use the resource manager')
+    parser.add_argument('-p', '--policy', action='append', choices=PLACEMENT_POLICIES,
+                        help='placement policy, may be repeated (default: FIRST_FIT)')
+    args = parser.parse_args()
+
+    launcher = None if args.launcher == 'none' else args.launcher
+    print(f"{'nodes':>6} {'policy':12} {'allocations/s':>13} {'p99 latency (us)':>16} {'releases/s':>10} "
+          f"{'utilization %':>13} {'node frag %':>11} {'socket frag %':>13} {'makespan':>8}")
+    for nodes in args.nodes or [100, 1000, 10000]:
+        trace = load_trace(args.trace) if args.trace else make_trace(args.tasks, nodes, args.cores)
+        for policy in args.policy or ['FIRST_FIT']:
+            results = replay(trace, nodes, args.cores, args.sockets, policy, launcher)
+            print(f"{nodes:6d} {policy:12} {results['allocations']:13.0f} {1e6 * results['p99_latency']:16.1f} "
+                  f"{results['releases']:10.0f} {results['utilization']:13.2f} {results['node_fragmentation']:11.2f} "
+                  f"{results['socket_fragmentation']:13.2f} {results['makespan']:8d}")
+
+
+if __name__ == '__main__':
+    main()
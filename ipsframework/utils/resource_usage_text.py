@@ -0,0 +1,22 @@
+# -------------------------------------------------------------------------------
+# Copyright 2006-2022 UT-Battelle, LLC. See LICENSE for more information.
+# -------------------------------------------------------------------------------
+"""
+Convert the ``resource_usage.csv`` file of a simulation to the
+``resource_usage`` text format of previous versions::
+
+    python -m ipsframework.utils.resource_usage_text resource_usage.csv > resource_usage
+"""
+import argparse
+from ipsframework.resource_usage import write_text
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert an IPS resource_usage.csv file to the resource_usage text format')
+    parser.add_argument('file_name', help='resource usage file')
+    args = parser.parse_args()
+    write_text(args.file_name)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+# -------------------------------------------------------------------------------
+# Copyright 2006-2022 UT-Battelle, LLC. See LICENSE for more information.
+# -------------------------------------------------------------------------------
+"""
+Measure the number of short tasks per second started and finished with
+each task launch method, ``eval``, ``agent`` with agents on the local host,
+and ``srun`` when available::
+
+    python -m ipsframework.utils.task_launch_benchmark
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import time
+from collections import deque
+from ipsframework.agent import AgentClient, start_agents
+
+LAUNCHERS = ('eval', 'agent', 'srun')
+
+
+def _run_tasks(launch, count, width):
+    running = deque()
+    start = time.perf_counter()
+    for i in range(count):
+        if len(running) == width:
+            running.popleft().wait()
+        running.append(launch(i))
+    while running:
+        running.popleft().wait()
+    return count / (time.perf_counter() - start)
+
+
+def benchmark(launcher, count=1000, width=8, agents=4, command=('true',)):
+    """
+    Return the number of tasks per second running *command* *count* times,
+    with at most *width* tasks running at once, using *launcher*.  The
+    ``agent`` launcher distributes the tasks over *agents* agents.
+    """
+    command = list(command)
+    working_dir = os.getcwd()
+    if launcher == 'eval':
+        return _run_tasks(lambda i: subprocess.Popen(command, cwd=working_dir), count, width)
+    if launcher == 'srun':
+        return _run_tasks(lambda i: subprocess.Popen(['srun', '-N', '1', '-n', '1'] + command, cwd=working_dir),
+                          count, width)
+    if launcher == 'agent':
+        processes, addresses, authkey = start_agents([f'node{i}' for i in range(agents)])
+        try:
+            clients = [AgentClient(address, authkey) for address in addresses.values()]
+            return _run_tasks(lambda i: clients[i % len(clients)].launch(i, command, working_dir), count, width)
+        finally:
+            for process in processes:
+                process.terminate()
+                process.wait()
+    raise ValueError(f"Unknown launcher {launcher}, expected one of {LAUNCHERS}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the IPS task launch methods')
+    parser.add_argument('-n', '--count', type=int, default=1000, help='number of tasks')
+    parser.add_argument('-w', '--width', type=int, default=8, help='number of tasks running at once')
+    parser.add_argument('-a', '--agents', type=int, default=4, help='number of agents')
+    args = parser.parse_args()
+
+    print(f"{'launcher':10} {'tasks/s':>10}")
+    for launcher in LAUNCHERS:
+        if launcher == 'srun' and not shutil.which('srun'):
+            continue
+        rate = benchmark(launcher, args.count, args.width, args.agents)
+        print(f"{launcher:10} {rate:10.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+# -------------------------------------------------------------------------------
+# Copyright 2006-2022 UT-Battelle, LLC. See LICENSE for more information.
+# -------------------------------------------------------------------------------
+"""
+Shim running a pack of single process tasks launched together, as one
+task, by a task pool created with a *pack_size*.  The task manager
+launches::
+
+    python /path/to/task_pack.py <pack file>
+
+with the parallel launcher on the cores of all the members, and the shim
+starts the members, waits for all of them and writes their exit status
+and timing to the results file.  It only uses the standard library, so it
+is run by path without installing ipsframework on the compute nodes.
+"""
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+
+
+def pack_file_name(working_dir, task_id):
+    """
+    Return the name of the file describing the members of the pack launched
+    as task *task_id* from *working_dir*.
+    """
+    return os.path.join(working_dir, f'ips_task_pack_{task_id}.json')
+
+
+def results_file_name(pack_file):
+    """
+    Return the name of the file of the results of the members of *pack_file*.
+    """
+    return pack_file + '.results'
+
+
+def write_pack(pack_file, members):
+    """
+    Write the *members* of a pack to *pack_file*, a list of dictionaries
+    with the *name*, *args*, *working_dir*, *logfile* and *errfile* of
+    each task.
+    """
+    with open(pack_file, 'w') as f:
+        json.dump(members, f)
+
+
+def read_results(pack_file):
+    """
+    Return the results of the members of *pack_file*, mapping the name of
+    each member to a dictionary with its *exit_status*, *start_time* and
+    *end_time*, and remove the files of the pack.  Members without results
+    are missing.
+    """
+    try:
+        with open(results_file_name(pack_file)) as f:
+            results = json.load(f)
+    except (OSError, ValueError):
+        results = {}
+    for file_name in (pack_file, results_file_name(pack_file)):
+        try:
+            os.remove(file_name)
+        except OSError:
+            pass
+    return results
+
+
+def run_pack(pack_file):
+    """
+    Run the members of *pack_file* concurrently, and write their results.
+
+    :return: 0 if all the members succeeded, otherwise 1
+    """
+    with open(pack_file) as f:
+        members = json.load(f)
+
+    running = {}  # pid -> (name, process, start time)
+    results = {}
+
+    def terminate(signum, frame):
+        for _, process, _ in running.values():
+            process.send_signal(signum)
+
+    signal.signal(signal.SIGTERM, terminate)
+    for member in members:
+        task_stdout = open(member['logfile'], 'w') if member.get('logfile') else None
+        task_stderr = open(member['errfile'], 'w') if member.get('errfile') else subprocess.STDOUT
+        start_time = time.time()
+        try:
+            process = subprocess.Popen(member['args'], stdout=task_stdout, stderr=task_stderr,
+                                       cwd=member['working_dir'])
+        except OSError as e:
+            print(f"Error executing command {' '.join(member['args'])} : {e}", file=sys.stderr)
+            results[member['name']] = {'exit_status': 127, 'start_time': start_time, 'end_time': start_time}
+        else:
+            running[process.pid] = (member['name'], process, start_time)
+        finally:
+            for f in (task_stdout, task_stderr):
+                if hasattr(f, 'close'):
+                    f.close()
+
+    while running:
+        pid, status = os.waitpid(-1, 0)
+        if pid not in running:
+            continue
+        name, process, start_time = running.pop(pid)
+        process.returncode = -os.WTERMSIG(status) if os.WIFSIGNALED(status) else os.WEXITSTATUS(status)
+        results[name] = {'exit_status': process.returncode, 'start_time': start_time, 'end_time': time.time()}
+
+    with open(results_file_name(pack_file), 'w') as f:
+        json.dump(results, f)
+    return 0 if all(result['exit_status'] == 0 for result in results.values()) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(run_pack(sys.argv[1]))
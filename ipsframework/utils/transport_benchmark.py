@@ -0,0 +1,76 @@
+# -------------------------------------------------------------------------------
+# Copyright 2006-2022 UT-Battelle, LLC. See LICENSE for more information.
+# -------------------------------------------------------------------------------
+"""
+Measure the round trip latency and message rate of each message transport::
+
+    python -m ipsframework.utils.transport_benchmark
+"""
+import argparse
+import time
+from multiprocessing import Process
+from ipsframework.componentRegistry import ComponentID
+from ipsframework.messages import ServiceRequestMessage
+from ipsframework.transport import TRANSPORTS, new_queue
+
+
+def _echo(requests, responses):
+    while True:
+        msg = requests.get()
+        if msg is None:
+            return
+        responses.put(msg)
+
+
+def _produce(messages, msg, count):
+    for _ in range(count):
+        messages.put(msg)
+
+
+def benchmark(transport, count=10000):
+    """
+    Return the mean round trip time in seconds, and the number of messages
+    per second sent from one process to another, of *count* service
+    requests using *transport*.
+    """
+    msg = ServiceRequestMessage(ComponentID('benchmark', 'BENCHMARK'),
+                                ComponentID('Framework', 'FRAMEWORK'),
+                                ComponentID('Framework', 'FRAMEWORK'),
+                                'get_config_parameter', 'SIM_ROOT')
+
+    requests, responses = new_queue(transport), new_queue(transport)
+    echo = Process(target=_echo, args=(requests, responses))
+    echo.start()
+    start = time.perf_counter()
+    for _ in range(count):
+        requests.put(msg)
+        responses.get()
+    latency = (time.perf_counter() - start) / count
+    requests.put(None)
+    echo.join()
+
+    messages = new_queue(transport)
+    producer = Process(target=_produce, args=(messages, msg, count))
+    start = time.perf_counter()
+    producer.start()
+    for _ in range(count):
+        messages.get()
+    rate = count / (time.perf_counter() - start)
+    producer.join()
+
+    return latency, rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the IPS message transports')
+    parser.add_argument('-n', '--count', type=int, default=10000, help='number of messages')
+    args = parser.parse_args()
+
+    print(f"{'transport':10} {'round trip (us)':>16} {'messages/s':>12}")
+    for transport in TRANSPORTS:
+        latency, rate = benchmark(transport, args.count)
+        print(f"{transport:10} {latency * 1e6:16.1f} {rate:12.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -10,6 +10,18 @@ class dask_worker(Component):
         self.services.info("cmd = %s", cmd)
         cwd = self.services.get_working_dir()
 
+        nodes = self.services.get_config_param('NODES')
+        persistent = self.PERSISTENT == 'True'
+        if persistent:
+            self.services.start_dask_cluster(dask_nodes=nodes)
+
+        for _ in range(2 if persistent else 1):
+            self.run_pool(cmd, cwd, nodes)
+            if persistent:
+                self.services.info('dask scheduler %d', self.services.dask_cluster.sched_pid)
+                self.services.remove_task_pool('pool')
+
+    def run_pool(self, cmd, cwd, nodes):
         total_tasks = 4
         self.services.create_task_pool('pool')
         for i in range(total_tasks):
@@ -27,7 +39,6 @@ class dask_worker(Component):
                                    cmd,
                                    self.VALUE if self.VALUE else f'{i}',
                                    **kwargs)
-        nodes = self.services.get_config_param('NODES')
         ret_val = self.services.submit_tasks('pool',
                                              use_dask=True,
                                              use_shifter=self.SHIFTER == 'True',
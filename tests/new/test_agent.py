@@ -0,0 +1,71 @@
+import signal
+import subprocess
+import pytest
+from ipsframework.agent import AgentClient, start_agents
+from ipsframework.services import TaskCompletionNotifier
+from ipsframework.utils.task_launch_benchmark import benchmark
+
+
+@pytest.fixture
+def agents():
+    processes, addresses, authkey = start_agents(['node0', 'node1'])
+    yield addresses, authkey
+    for process in processes:
+        process.terminate()
+        process.wait()
+
+
+def test_agent_tasks(agents, tmpdir):
+    addresses, authkey = agents
+    assert sorted(addresses) == ['node0', 'node1']
+    client = AgentClient(addresses['node1'], authkey)
+
+    echo = client.launch(1, ['echo', 'hello'], str(tmpdir), {'IPS_TEST': '1'}, str(tmpdir.join('echo.log')))
+    env = client.launch(2, ['sh', '-c', 'exit $IPS_TEST'], str(tmpdir), {'IPS_TEST': '3'})
+    missing = client.launch(3, ['not_a_command'], str(tmpdir))
+    sleep = client.launch(4, ['sleep', '60'], str(tmpdir))
+
+    assert echo.wait(5) == 0
+    assert env.wait(5) == 3
+    assert missing.wait(5) == 127
+    with open(tmpdir.join('echo.log')) as f:
+        assert f.read() == 'hello\n'
+
+    assert sleep.poll() is None
+    with pytest.raises(subprocess.TimeoutExpired):
+        sleep.wait(0.1)
+    sleep.terminate()
+    assert sleep.wait(5) == -signal.SIGTERM
+
+
+def test_agent_added_node(agents, tmpdir):
+    addresses, authkey = agents
+    # agents of nodes added later share the key of the others
+    processes, added, key = start_agents(['node2'], authkey=authkey)
+    try:
+        assert key == authkey
+        client = AgentClient(added['node2'], authkey)
+        assert client.launch(1, ['true'], str(tmpdir)).wait(5) == 0
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+
+
+def test_agent_notifier(agents, tmpdir):
+    addresses, authkey = agents
+    client = AgentClient(addresses['node0'], authkey)
+    notifier = TaskCompletionNotifier()
+
+    process = client.launch(1, ['sleep', '0.2'], str(tmpdir))
+    notifier.watch(1, process)
+    notifier.wait(10)
+    # the exit status was received when the notifier woke up
+    assert process.returncode == 0
+
+
+def test_benchmark():
+    assert benchmark('eval', 10) > 0
+    assert benchmark('agent', 10, agents=2) > 0
+    with pytest.raises(ValueError):
+        benchmark('not_a_launcher', 10)
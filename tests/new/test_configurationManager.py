@@ -0,0 +1,53 @@
+import signal
+import time
+from multiprocessing import Event, Lock, Process
+from unittest import mock
+from ipsframework import ConfigurationManager
+
+
+def hold_lock(lock, held):
+    # like a component whose queue feeder thread is still writing to the
+    # framework queue when the simulation is terminated
+    with lock:
+        held.set()
+        time.sleep(0.5)
+
+
+def add_sim(cm, tmpdir, process_list):
+    sim_data = ConfigurationManager.SimulationData('test')
+    sim_data.log_pipe_name = str(tmpdir.join('test.logpipe'))
+    sim_data.process_list = process_list
+    cm.sim_map['test'] = sim_data
+
+
+def test_terminate_sim_waits_for_components(tmpdir):
+    cm = ConfigurationManager(mock.Mock(), [], str(tmpdir.join('platform.conf')))
+
+    lock = Lock()
+    held = Event()
+    p = Process(target=hold_lock, args=(lock, held))
+    p.start()
+    held.wait()
+
+    add_sim(cm, tmpdir, [p])
+    cm.terminate_sim('test')
+
+    # the component was allowed to finish, so the lock was released
+    assert p.exitcode == 0
+    assert lock.acquire(timeout=1)
+    assert 'test' in cm.finished_sim_map
+
+
+def test_terminate_sim_timeout(tmpdir):
+    cm = ConfigurationManager(mock.Mock(), [], str(tmpdir.join('platform.conf')))
+    cm.terminate_timeout = 0.1
+
+    p = Process(target=time.sleep, args=(60,))
+    p.start()
+
+    add_sim(cm, tmpdir, [p])
+    start = time.time()
+    cm.terminate_sim('test')
+
+    assert p.exitcode == -signal.SIGTERM
+    assert time.time() - start < 10
@@ -8,7 +8,8 @@ import ipsframework
 from ipsframework import Framework
 
 
-def write_basic_config_and_platform_files(tmpdir, timeout='', logfile='', errfile='', nproc=1, exe='/bin/sleep', value='', shifter=False, gpus=0):
+def write_basic_config_and_platform_files(tmpdir, timeout='', logfile='', errfile='', nproc=1, exe='/bin/sleep', value='', shifter=False, gpus=0,
+                                          persistent=False):
     platform_file = tmpdir.join('platform.conf')
 
     platform = f"""MPIRUN = eval
@@ -66,6 +67,7 @@ SIMULATION_MODE = NORMAL
     LOGFILE = {logfile}
     ERRFILE = {errfile}
     SHIFTER = {shifter}
+    PERSISTENT = {persistent}
 """
 
     with open(config_file, 'w') as f:
@@ -534,3 +536,44 @@ def test_dask_with_2_gpus(tmpdir):
     assert comments[10][1].startswith("Target = ")
     assert "dask-worker --scheduler-file" in comments[10][1]
     assert comments[10][1].endswith("s 1 --nthreads 1 --no-dashboard")
+
+
+def test_dask_persistent_cluster(tmpdir):
+    platform_file, config_file = write_basic_config_and_platform_files(tmpdir, value=0.1, persistent=True)
+
+    framework = Framework(config_file_list=[str(config_file)],
+                          log_file_name=str(tmpdir.join('ips.log')),
+                          platform_file_name=str(platform_file),
+                          debug=None,
+                          verbose_debug=None,
+                          cmd_nodes=0,
+                          cmd_ppn=0)
+
+    framework.run()
+
+    # check output log file
+    with open(str(tmpdir.join('sim.log')), 'r') as f:
+        lines = f.readlines()
+
+    # remove timestamp
+    lines = [line[24:] for line in lines]
+
+    log = "DASK__dask_worker_2 INFO     {}\n"
+    assert lines.count(log.format("ret_val = 4")) == 2
+    for i in range(4):
+        assert lines.count(log.format(f"task_{i} 0")) == 2
+
+    # both pools ran in the same cluster
+    schedulers = [line for line in lines if line.startswith(log.format("dask scheduler")[:-1])]
+    assert len(schedulers) == 2
+    assert schedulers[0] == schedulers[1]
+
+    # check simulation_log, the workers are launched once
+    json_files = glob.glob(str(tmpdir.join("simulation_log").join("*.json")))
+    assert len(json_files) == 1
+    with open(json_files[0], 'r') as json_file:
+        events = [json.loads(line) for line in json_file.readlines()]
+
+    eventtypes = [e.get('eventtype') for e in events]
+    assert eventtypes.count('IPS_LAUNCH_DASK_TASK') == 8
+    assert len([e for e in events if e.get('eventtype') == 'IPS_LAUNCH_TASK' and 'dask-worker' in e.get('comment')]) == 1
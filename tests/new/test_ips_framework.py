@@ -1,7 +1,12 @@
 import glob
 import json
+import time
 import pytest
 from ipsframework import Framework
+from ipsframework.messages import Message, ServiceRequestMessage, ServiceNotificationMessage, \
+    ServiceRequestBatchMessage, MethodResultMessage
+from ipsframework.ipsExceptions import BlockedMessageException
+from ipsframework.taskManager import TaskInit
 
 
 def write_basic_config_and_platform_files(tmpdir):
@@ -89,15 +94,19 @@ def test_framework_simple(tmpdir, capfd):
 
     # check all registered service handlers
     service_handlers = sorted(framework.service_handler.keys())
-    assert service_handlers == ['createListener',
+    assert service_handlers == ['add_node_resources',
+                                'createListener',
                                 'create_simulation',
+                                'drain_nodes',
                                 'existsTopic',
                                 'finish_task',
                                 'getSubscription',
                                 'getTopic',
                                 'get_allocation',
                                 'get_config_parameter',
+                                'get_framework_metrics',
                                 'get_port',
+                                'get_task_agents',
                                 'get_time_loop',
                                 'init_call',
                                 'init_task',
@@ -109,7 +118,9 @@ def test_framework_simple(tmpdir, capfd):
                                 'registerSubscriber',
                                 'release_allocation',
                                 'removeSubscription',
+                                'remove_nodes',
                                 'sendEvent',
+                                'sendEvents',
                                 'set_config_parameter',
                                 'stage_state',
                                 'unregisterEventListener',
@@ -273,3 +284,238 @@ def test_framework_missing_platform(capfd):
     captured = capfd.readouterr()
     assert captured.out.endswith('Need to specify a platform file\n')
     assert captured.err == ''
+
+
+def test_framework_blocked_message_wait_lists(tmpdir):
+    platform_file, config_file = write_basic_config_and_platform_files(tmpdir)
+
+    framework = Framework(config_file_list=[str(config_file)],
+                          log_file_name=str(tmpdir.join('test.log')),
+                          platform_file_name=str(platform_file),
+                          debug=None,
+                          verbose_debug=None,
+                          cmd_nodes=0,
+                          cmd_ppn=0)
+
+    comp_id = framework.component_id
+    wait_msg = ServiceRequestMessage(comp_id, comp_id, comp_id, 'wait_call', 'call1', True)
+    big_msg = ServiceRequestMessage(comp_id, comp_id, comp_id, 'init_task')
+    small_msg = ServiceRequestMessage(comp_id, comp_id, comp_id, 'init_task')
+    other_msg = ServiceRequestMessage(comp_id, comp_id, comp_id, 'stage_state')
+
+    framework._block_message(wait_msg, BlockedMessageException(wait_msg, 'wait', call_id='call1'))
+    framework._block_message(big_msg, BlockedMessageException(big_msg, 'cores', nproc=1000))
+    framework._block_message(small_msg, BlockedMessageException(small_msg, 'cores', nproc=1))
+    framework._block_message(other_msg, BlockedMessageException(other_msg, 'unknown'))
+
+    new_msg = ServiceRequestMessage(comp_id, comp_id, comp_id, 'get_port')
+
+    # only the message without a wait condition is retried
+    assert list(framework._pending_messages([new_msg])) == [new_msg, other_msg]
+
+    # finishing an unrelated call wakes nothing
+    framework.notify_call_finished('call2')
+    assert list(framework._pending_messages([new_msg])) == [new_msg]
+
+    framework.notify_call_finished('call1')
+    assert list(framework._pending_messages([new_msg])) == [new_msg, wait_msg]
+
+    # only the request that fits in the available cores is woken
+    framework.notify_resources_released()
+    assert list(framework._pending_messages([new_msg])) == [new_msg, small_msg]
+    assert list(framework.blocked_allocations) == [1000]
+
+    # a change of the nodes wakes all the requests
+    framework.notify_capacity_changed()
+    assert list(framework._pending_messages([new_msg])) == [new_msg, big_msg]
+    assert framework.blocked_allocations == {}
+
+    framework.run()
+
+
+def test_framework_wakes_only_satisfiable_waiters(tmpdir):
+    platform_file, config_file = write_basic_config_and_platform_files(tmpdir)
+
+    framework = Framework(config_file_list=[str(config_file)],
+                          log_file_name=str(tmpdir.join('test.log')),
+                          platform_file_name=str(platform_file),
+                          debug=None,
+                          verbose_debug=None,
+                          cmd_nodes=0,
+                          cmd_ppn=0)
+
+    # a single core is available
+    assert framework.resource_manager.avail_cores == 1
+
+    comp_id = framework.component_id
+    waiters = [ServiceRequestMessage(comp_id, comp_id, comp_id, 'init_task') for _ in range(5)]
+    for msg in waiters:
+        framework._block_message(msg, BlockedMessageException(msg, 'cores', nproc=1))
+
+    new_msg = ServiceRequestMessage(comp_id, comp_id, comp_id, 'get_port')
+
+    # one core only wakes the oldest of the waiters it can satisfy
+    for i in range(5):
+        framework.notify_resources_released()
+        assert list(framework._pending_messages([new_msg])) == [new_msg, waiters[i]]
+    assert framework.blocked_allocations == {}
+
+    # a waiter retried and blocked again keeps its place in the order
+    big_msg = ServiceRequestMessage(comp_id, comp_id, comp_id, 'init_task')
+    framework._block_message(big_msg, BlockedMessageException(big_msg, 'cores', nproc=2))
+    for msg in waiters[1::-1]:
+        framework._block_message(msg, BlockedMessageException(msg, 'cores', nproc=1))
+    framework.notify_resources_released()
+    assert list(framework._pending_messages([new_msg])) == [new_msg, waiters[0]]
+
+    framework.run()
+
+
+def test_framework_blocked_batch_resumes(tmpdir):
+    platform_file, config_file = write_basic_config_and_platform_files(tmpdir)
+
+    framework = Framework(config_file_list=[str(config_file)],
+                          log_file_name=str(tmpdir.join('test.log')),
+                          platform_file_name=str(platform_file),
+                          debug=None,
+                          verbose_debug=None,
+                          cmd_nodes=0,
+                          cmd_ppn=0)
+
+    calls = []
+
+    def count(msg):
+        calls.append(msg.message_id)
+        return len(calls)
+
+    framework.register_service_handler(['count'], count)
+
+    fwk_id = framework.component_id
+    driver_id = framework.config_manager.get_simulation_components('test')[0]
+    response_q = framework.comp_registry.getComponentArtifact(driver_id, 'svc_response_q')
+
+    def request(method_name, *args):
+        return ServiceRequestMessage(driver_id, fwk_id, fwk_id, method_name, *args)
+
+    def task_init():
+        return TaskInit(1, 'exe', str(tmpdir), 0, 0, 0, True, True, False, False, [], None)
+
+    # take the only core
+    framework._dispatch_service_request(request('init_task', task_init()))
+    task_id = response_q.get(timeout=5).args[0][0]
+
+    batch = ServiceRequestBatchMessage(driver_id, fwk_id, [request('count'),
+                                                           request('init_task', task_init()),
+                                                           request('count')])
+    framework._dispatch_service_request(batch)
+
+    # the batch is blocked on its init_task, after running the first request
+    assert len(calls) == 1
+    assert list(framework.blocked_allocations) == [1]
+    assert response_q.empty()
+
+    # releasing the core wakes the batch, which resumes at the init_task
+    for msg in framework._pending_messages([request('finish_task', task_id, 0)]):
+        framework._dispatch_service_request(msg)
+
+    assert response_q.get(timeout=5).args[0] == 0  # finish_task
+    responses = response_q.get(timeout=5).args[0]
+    assert len(calls) == 2
+    assert [r.status for r in responses] == [Message.SUCCESS] * 3
+    assert [r.request_msg_id for r in responses] == [r.message_id for r in batch.requests]
+    assert responses[0].args[0] == 1
+    assert responses[2].args[0] == 2
+    assert framework.batch_responses == {}
+
+    framework._dispatch_service_request(request('finish_task', responses[1].args[0][0], 0))
+    response_q.get(timeout=5)
+
+    framework.run()
+
+
+def test_framework_receive_messages(tmpdir):
+    platform_file, config_file = write_basic_config_and_platform_files(tmpdir)
+
+    framework = Framework(config_file_list=[str(config_file)],
+                          log_file_name=str(tmpdir.join('test.log')),
+                          platform_file_name=str(platform_file),
+                          debug=None,
+                          verbose_debug=None,
+                          cmd_nodes=0,
+                          cmd_ppn=0)
+
+    comp_id = framework.component_id
+    msgs = [ServiceRequestMessage(comp_id, comp_id, comp_id, 'get_port', 'DRIVER') for _ in range(3)]
+    for msg in msgs:
+        framework.in_queue.put(msg)
+    # let the queue feeder thread write them all
+    time.sleep(0.5)
+
+    # the messages queued behind the first one are received with it
+    assert [msg.message_id for msg in framework._receive_messages()] == [msg.message_id for msg in msgs]
+    framework.in_queue.put(msgs[0])
+    assert len(framework._receive_messages()) == 1
+    assert framework.messages_per_wakeup == {3: 1, 1: 1}
+
+    framework.run()
+
+
+def test_framework_call_events_published_together(tmpdir):
+    platform_file, config_file = write_basic_config_and_platform_files(tmpdir)
+
+    framework = Framework(config_file_list=[str(config_file)],
+                          log_file_name=str(tmpdir.join('test.log')),
+                          platform_file_name=str(platform_file),
+                          debug=None,
+                          verbose_debug=None,
+                          cmd_nodes=0,
+                          cmd_ppn=0)
+
+    published = []
+
+    def publish_many(topic_name, event_name, event_bodies):
+        published.append((topic_name, [body['portal_data']['eventtype'] for body in event_bodies]))
+
+    framework.event_manager.publish_many = publish_many
+
+    fwk_id = framework.component_id
+    driver_id = framework.config_manager.get_simulation_components('test')[0]
+    driver = str(driver_id)
+    step_msg = ServiceRequestMessage(fwk_id, fwk_id, driver_id, 'init_call', 'step', 0)
+    start_time = time.time()
+    framework.outstanding_calls_list = {'call1': ('test', driver, 'init', 0, start_time),
+                                        'call2': ('test', driver, 'finalize', 0, start_time)}
+    framework.call_queue_map = {'call1': [(step_msg, 'test', driver, 'step', 0)],
+                                'call2': []}
+
+    # the results of two calls arrive together, one of them ends the simulation
+    framework._handle_call_results([MethodResultMessage(driver_id, fwk_id, call_id, Message.SUCCESS, None)
+                                    for call_id in ['call1', 'call2']])
+
+    assert published == [('_IPS_MONITOR', ['IPS_CALL_END', 'IPS_CALL_BEGIN', 'IPS_CALL_END', 'IPS_END'])]
+    assert [call[2] for call in framework.outstanding_calls_list.values()] == ['step']
+
+    framework.terminate_all_sims()
+
+
+def test_framework_notification_failure_logged(tmpdir):
+    platform_file, config_file = write_basic_config_and_platform_files(tmpdir)
+
+    framework = Framework(config_file_list=[str(config_file)],
+                          log_file_name=str(tmpdir.join('test.log')),
+                          platform_file_name=str(platform_file),
+                          debug=None,
+                          verbose_debug=None,
+                          cmd_nodes=0,
+                          cmd_ppn=0)
+
+    comp_id = framework.component_id
+    # the framework is not a registered component, so sending it a response would fail
+    framework._dispatch_service_request(ServiceNotificationMessage(comp_id, comp_id, comp_id, 'not_a_service'))
+
+    framework.run()
+
+    with open(str(tmpdir.join('test.log'))) as f:
+        log = f.read()
+
+    assert 'Error handling not_a_service notification from FRAMEWORK@Framework@0 : Unsupported method : not_a_service' in log
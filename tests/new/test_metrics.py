@@ -0,0 +1,43 @@
+import json
+from ipsframework.metrics import LatencyHistogram, FrameworkMetrics
+
+
+def test_latency_histogram():
+    histogram = LatencyHistogram()
+    assert histogram.to_dict()['mean'] == 0.0
+
+    for elapsed in [1e-6, 5e-4, 5e-4, 2.0, 20.0]:
+        histogram.add(elapsed)
+
+    stats = histogram.to_dict()
+    assert stats['count'] == 5
+    assert stats['max'] == 20.0
+    assert abs(stats['mean'] - 22.001001 / 5) < 1e-9
+    assert stats['histogram'] == {'<=1e-05': 1, '<=0.0001': 0, '<=0.001': 2, '<=0.01': 0,
+                                  '<=0.1': 0, '<=1': 0, '<=10': 1, '>10': 1}
+
+
+def test_framework_metrics(tmpdir):
+    metrics = FrameworkMetrics()
+    metrics.record_service('init_task', 0.01)
+    metrics.record_service('init_task', 0.02, blocked=True)
+    metrics.record_service('get_port', 0.001, failed=True)
+    metrics.record_operation('ResourceManager.get_allocation', 0.005)
+    metrics.sample_queue(1, 0)
+    metrics.sample_queue(5, 2)
+    metrics.sample_queue(3, 1)
+
+    snapshot = metrics.snapshot()
+    assert list(snapshot['services']) == ['get_port', 'init_task']
+    assert snapshot['services']['init_task']['count'] == 2
+    assert snapshot['services']['init_task']['blocked'] == 1
+    assert snapshot['services']['init_task']['failed'] == 0
+    assert snapshot['services']['get_port']['failed'] == 1
+    assert snapshot['operations']['ResourceManager.get_allocation']['count'] == 1
+    assert snapshot['in_queue'] == {'wakeups': 3, 'messages': 9, 'mean_depth': 3.0, 'max_depth': 5,
+                                    'messages_per_wakeup': {1: 1, 3: 1, 5: 1}}
+    assert snapshot['blocked_messages'] == {'current': 1, 'max': 2}
+
+    metrics.dump(str(tmpdir.join('metrics.json')))
+    with open(tmpdir.join('metrics.json')) as f:
+        assert json.load(f)['services']['init_task']['count'] == 2
@@ -1,6 +1,6 @@
 from unittest import mock
 import pytest
-from ipsframework.resourceHelper import getResourceList
+from ipsframework.resourceHelper import getResourceList, get_memory_per_node, expand_nodelist, parse_node_list
 from ipsframework.ipsExceptions import InvalidResourceSettingsException
 
 
@@ -348,3 +348,27 @@ def test_resourceHelper_no_detection(monkeypatch):
     assert spn == 1
     assert ppn == 8
     assert not accurateNodes
+
+
+def test_resourceHelper_memory_per_node(monkeypatch):
+    services = mock.Mock()
+    services.get_platform_parameter.return_value = 2048
+    monkeypatch.setenv('SLURM_MEM_PER_NODE', '1024')
+    assert get_memory_per_node(services) == 2048
+
+    services.get_platform_parameter.return_value = 0
+    assert get_memory_per_node(services) == 1024
+
+    monkeypatch.delenv('SLURM_MEM_PER_NODE')
+    with open('/proc/meminfo') as f:
+        mem_total = int(f.readline().split()[1]) // 1024
+    assert get_memory_per_node(services) == mem_total
+
+
+def test_resourceHelper_node_list():
+    assert expand_nodelist('nid[0008-0010,0012],login1') == ['nid0008', 'nid0009', 'nid0010', 'nid0012', 'login1']
+    assert expand_nodelist('rack[1-2]-node[1,3]') == ['rack1-node1', 'rack1-node3', 'rack2-node1', 'rack2-node3']
+    assert expand_nodelist('') == []
+
+    assert parse_node_list('node[1-2]', 4) == [('node1', 4), ('node2', 4)]
+    assert parse_node_list(['node1', ('node2', 2)], 4) == [('node1', 4), ('node2', 2)]
@@ -1,11 +1,16 @@
 from unittest import mock
 import io
+from array import array
 import pytest
-from ipsframework.resourceManager import ResourceManager
+from ipsframework.resourceManager import PLACEMENT_POLICIES, ResourceManager
+from ipsframework.node_structure import Node
+from ipsframework.resource_usage import ResourceUsageRecorder, load, write_text
+from ipsframework.utils.resource_manager_benchmark import load_trace, make_managers, make_trace, replay
 from ipsframework.ipsExceptions import (InsufficientResourcesException,
                                         BadResourceRequestException,
                                         ResourceRequestMismatchException,
                                         GPUResourceRequestMismatchException,
+                                        MemoryResourceRequestMismatchException,
                                         ResourceRequestUnequalPartitioningException)
 
 
@@ -205,9 +210,17 @@ def test_allocations(tmpdir):
 
     assert str(excinfo.value) == "component comp0 requested 1 nodes, which is more than available by 0 nodes, for task 3."
 
+    assert rm.task_nodes == {0: ['dummy_node0'], 1: ['dummy_node1'], 2: ['dummy_node0']}
+    assert rm.avail_cores == 0
+
     rm.release_allocation(task_id=1,
                           status=None)
 
+    assert 1 not in rm.task_nodes
+    assert 1 not in rm.active_tasks
+    assert rm.avail_cores == 4
+    assert rm.alloc_cores == 4
+
     with io.StringIO() as output:
         rm.nodes['dummy_node0'].print_sockets(output)
         lines = [s.strip() for s in output.getvalue().split('\n')]
@@ -395,3 +408,264 @@ def test_allocations(tmpdir):
         assert lines[6] == "core: 1  - task_id: 0  - owner: comp0"
         assert lines[7] == "core: 2  - task_id: 0  - owner: comp0"
         assert lines[8] == "core: 3  - task_id: 0  - owner: comp0"
+
+
+def test_gpu_allocations(tmpdir):
+    rm = ResourceManager(mock.Mock())
+    rm.usage = ResourceUsageRecorder(str(tmpdir.join('resource_usage.csv')))
+    rm.node_alloc_mode = 'SHARED'
+    rm.cores_per_node = rm.ppn = rm.max_ppn = 8
+    rm.sockets_per_node = 2
+    rm.cores_per_socket = 4
+    rm.gpn = 4
+    rm.total_cores = rm.avail_cores = rm.add_nodes([('node0', 8), ('node1', 8)])
+    assert rm.total_gpus == 8
+
+    assert rm.get_allocation('comp0', 2, 0, False, False, task_gpp=1).gpulist == [('node0', [0, 1])]
+    # node0 only has GPUs left for one process
+    assert rm.get_allocation('comp0', 2, 1, False, False, task_gpp=2).gpulist == [('node0', [2, 3]), ('node1', [0, 1])]
+    assert rm.get_allocation('comp0', 1, 2, False, False, task_gpp=1).gpulist == [('node1', [2])]
+    assert rm.get_allocation('comp0', 1, 3, False, True, task_gpp=1).gpulist == [('node1', [3])]
+    assert rm.get_allocation('comp0', 1, 4, False, False).gpulist == []
+    assert rm.alloc_gpus == 8
+
+    # cores are available, GPUs are not
+    with pytest.raises(InsufficientResourcesException):
+        rm.get_allocation('comp0', 1, 5, False, False, task_gpp=1)
+    with pytest.raises(GPUResourceRequestMismatchException):
+        rm.get_allocation('comp0', 1, 5, False, False, task_gpp=5)
+
+    rm.release_allocation(0, 0)
+    assert rm.alloc_gpus == 6
+    assert rm.nodes['node0'].avail_gpus == 2
+    assert rm.get_allocation('comp0', 1, 5, False, False, task_gpp=1).gpulist == [('node0', [0])]
+
+    for task_id in (1, 2, 3, 4, 5):
+        rm.release_allocation(task_id, 0)
+    assert rm.alloc_gpus == 0
+    assert rm.get_allocation('comp0', 2, 6, True, True, task_gpp=2).gpulist == [('node0', [0, 1, 2, 3])]
+    rm.close_report()
+
+    _, usage = load(str(tmpdir.join('resource_usage.csv')))
+    assert usage['alloc_gpus'][-1] == 4
+
+
+def test_memory_allocations(tmpdir):
+    rm = ResourceManager(mock.Mock())
+    rm.usage = ResourceUsageRecorder(str(tmpdir.join('resource_usage.csv')))
+    rm.node_alloc_mode = 'SHARED'
+    rm.cores_per_node = rm.ppn = rm.max_ppn = 8
+    rm.sockets_per_node = 2
+    rm.cores_per_socket = 4
+    rm.mpn = 1000
+    rm.total_cores = rm.avail_cores = rm.add_nodes([('node0', 8), ('node1', 8)])
+    assert rm.total_mem == 2000
+
+    assert rm.get_allocation('comp0', 2, 0, False, False, task_mem=400).nodelist == ['node0']
+    # node0 only has memory left for one process
+    assert rm.get_allocation('comp0', 2, 1, False, False, task_mem=200).nodelist == ['node0', 'node1']
+    assert rm.get_allocation('comp0', 1, 2, False, False).nodelist == ['node0']
+    assert rm.alloc_mem == 1200
+    assert rm.nodes['node0'].avail_mem == 0
+
+    # cores are available, memory is not
+    with pytest.raises(InsufficientResourcesException):
+        rm.get_allocation('comp0', 1, 3, False, False, task_mem=900)
+    with pytest.raises(MemoryResourceRequestMismatchException):
+        rm.get_allocation('comp0', 2, 3, False, False, task_ppn=2, task_mem=600)
+
+    rm.release_allocation(0, 0)
+    assert rm.alloc_mem == 400
+    assert rm.nodes['node0'].avail_mem == 800
+    assert rm.get_allocation('comp0', 1, 3, False, False, task_mem=800).nodelist == ['node0']
+    rm.close_report()
+
+    _, usage = load(str(tmpdir.join('resource_usage.csv')))
+    assert usage['alloc_mem'][-1] == 1200
+
+
+def test_elastic_nodes(tmpdir):
+    fwk = mock.Mock()
+    rm = ResourceManager(fwk)
+    rm.usage = ResourceUsageRecorder(str(tmpdir.join('resource_usage.csv')))
+    rm.node_alloc_mode = 'SHARED'
+    rm.cores_per_node = rm.ppn = rm.max_ppn = 4
+    rm.sockets_per_node = 2
+    rm.cores_per_socket = 2
+    rm.total_cores = rm.avail_cores = rm.add_nodes([('node0', 4)])
+    rm.begin_RM_report()
+
+    assert rm.add_node_resources('node[1-2]') == 8
+    assert rm.total_cores == rm.avail_cores == 12
+    assert rm.num_nodes == 3
+    fwk.notify_capacity_changed.assert_called_once_with()
+
+    assert rm.get_allocation('comp0', 6, 0, False, False).nodelist == ['node0', 'node1']
+
+    # draining nodes take no new tasks, their running tasks continue
+    assert rm.drain_nodes(['node1', 'node2']) == 6
+    assert rm.avail_cores == 0
+    assert rm.fragmentation() == (0.0, 0.0)
+    with pytest.raises(InsufficientResourcesException):
+        rm.get_allocation('comp0', 3, 1, False, False)
+    with pytest.raises(ValueError):
+        rm.drain_nodes(['node3'])
+
+    rm.release_allocation(0, 0)
+    assert rm.avail_cores == 4
+    assert rm.get_allocation('comp0', 4, 1, False, False).nodelist == ['node0']
+
+    # node2 is idle and removed now, node0 once its task finishes
+    assert rm.remove_nodes('node[0,2]') == ['node2']
+    assert sorted(rm.nodes) == ['node0', 'node1']
+    assert rm.total_cores == 8
+    assert rm.avail_cores == 0
+    rm.release_allocation(1, 0)
+    assert list(rm.nodes) == ['node1']
+    assert rm.total_cores == rm.num_nodes * 4 == 4
+    assert rm.avail_cores == 0
+    with pytest.raises(BadResourceRequestException):
+        rm.get_allocation('comp0', 6, 2, False, False)
+
+    # adding a draining node back returns it to use
+    assert rm.add_node_resources(['node1']) == 4
+    assert rm.avail_cores == 4
+    assert rm.get_allocation('comp0', 4, 2, True, True).nodelist == ['node1']
+    rm.close_report()
+
+    _, usage = load(str(tmpdir.join('resource_usage.csv')))
+    assert list(usage['total_cores']) == [4, 12, 12, 12, 12, 12, 12, 8, 4, 4, 4]
+    assert usage['event'][-3:] == ['release', 'add', 'allocate']
+
+
+def test_benchmark():
+    for policy in PLACEMENT_POLICIES:
+        results = replay(make_trace(200, 20, 4), 20, 4, 2, policy)
+        assert results['allocations'] > 0
+        assert results['releases'] > 0
+        assert 0 <= results['node_fragmentation'] <= 100
+        assert results['makespan'] >= 200
+
+
+def test_benchmark_trace(tmpdir):
+    results = replay(make_trace(200, 20, 4), 20, 4, 2, launcher='srun')
+    assert results['allocations'] > 0
+    assert results['p99_latency'] > 0
+    assert 0 < results['utilization'] <= 100
+
+    # replay the allocations recorded by a resource manager
+    rm, _ = make_managers(2, 4, 2)
+    rm.usage = ResourceUsageRecorder(str(tmpdir.join('resource_usage.csv')))
+    rm.begin_RM_report()
+    rm.get_allocation('comp0', 2, 1, False, False)
+    rm.get_allocation('comp0', 4, 2, True, True)
+    rm.release_allocation(1, 0)
+    rm.get_allocation('comp0', 1, 3, False, False)
+    rm.close_report()
+    trace = load_trace(str(tmpdir.join('resource_usage.csv')))
+    assert trace == [(2, False, False, 2), (4, True, True, 3), (1, False, False, 2)]
+    assert replay(trace, 2, 4, 2)['makespan'] == 4
+
+
+def test_placement_policies(tmpdir):
+    cm = mock.Mock()
+    cm.fwk_sim_name = 'sim_name'
+    cm.sim_map = {'sim_name': mock.Mock(sim_root=str(tmpdir))}
+    cm.get_platform_parameter.side_effect = lambda param, silent=False: 'BEST_FIT' if param == 'PLACEMENT_POLICY' else 'HOST'
+
+    rm = ResourceManager(mock.Mock())
+    rm.initialize(mock.Mock(), mock.Mock(), cm,
+                  cmd_nodes=3,
+                  cmd_ppn=4)
+    assert rm.placement_policy == 'BEST_FIT'
+    assert rm.fragmentation() == (0, 0)
+
+    rm.get_allocation('comp0', 3, 0, False, False)
+    rm.get_allocation('comp0', 2, 1, False, False)
+    # 1, 2 and 4 cores available
+    assert rm.fragmentation() == (pytest.approx(300 / 7), pytest.approx(300 / 7))
+
+    expected = {'FIRST_FIT': ['dummy_node0', 'dummy_node1'],
+                'PACK': ['dummy_node1'],
+                'BEST_FIT': ['dummy_node1'],
+                'SOCKET_LOCAL': ['dummy_node1'],
+                'SPREAD': ['dummy_node2']}
+    for policy, nodes in expected.items():
+        rm.placement_policy = policy
+        assert rm.check_core_cap(2, 2) == (True, nodes)
+
+    rm.close_report()
+    metadata, usage = load(str(tmpdir.join('resource_usage.csv')))
+    assert metadata['placement_policy'] == 'BEST_FIT'
+    assert usage['node_frag'][-1] == 42.8571
+
+
+def test_node_socket_local():
+    node = Node('node0', 2, 8, 8)
+    assert node.allocate(False, False, 0, 'comp0', 3) == (3, ['0:0', '0:1', '0:2'])
+    assert node.allocate(False, False, 1, 'comp0', 2, socket_local=True) == (2, ['1:0', '1:1'])
+    # the socket with the fewest available cores that fits
+    assert node.allocate(False, False, 2, 'comp0', 1, socket_local=True) == (1, ['0:3'])
+    # the fewest sockets
+    assert node.allocate(False, False, 3, 'comp0', 2, socket_local=True) == (2, ['1:2', '1:3'])
+    node.release(0, 'comp0')
+    node.release(1, 'comp0')
+    assert node.allocate(False, False, 4, 'comp0', 5, socket_local=True) == (5, ['0:0', '0:1', '0:2', '1:0', '1:1'])
+
+    assert Node('node1', 2, 8, 8).allocate(False, False, 0, 'comp0', 2) == (2, ['0:0', '0:1'])
+
+
+def test_node_allocate_release():
+    node = Node('node0', 2, 8, 8)
+
+    assert node.allocate(False, False, 0, 'comp0', 3) == (3, ['0:0', '0:1', '0:2'])
+    assert node.allocate(False, True, 1, 'comp1', 4) == (4, ['1:0', '1:1', '1:2', '1:3'])
+    assert node.allocate(False, False, 2, 'comp0', 2) == (1, ['0:3'])
+    assert node.avail_cores == 0
+    assert node.task_ids == [0, 1, 2]
+    assert node.owners == ['comp0', 'comp1', 'comp0']
+    assert node.available == []
+    assert node.allocated == [0, 1]
+
+    assert node.release(0, 'comp0') == 3
+    assert node.sockets[0].available == [0, 1, 2]
+    assert node.sockets[0].allocated == [3]
+    assert node.sockets[0].task_ids == [2]
+    assert node.available == [0]
+
+    # released cores are reused first
+    assert node.allocate(False, False, 3, 'comp0', 2) == (2, ['0:0', '0:1'])
+    assert node.release(1, 'comp1') == 4
+    assert node.release(2, 'comp0') == 1
+    assert node.release(3, 'comp0') == 2
+    assert node.avail_cores == 8
+    assert node.tasks == {}
+
+    assert node.allocate(True, False, 4, 'comp0', 8) == (8, ['0:0', '0:1', '0:2', '0:3', '1:0', '1:1', '1:2', '1:3'])
+    with pytest.raises(RuntimeError):
+        node.sockets[0].allocate(True, 5, 'comp0', 4)
+
+
+def test_resource_usage(tmpdir):
+    file_name = str(tmpdir.join('resource_usage.csv'))
+    recorder = ResourceUsageRecorder(file_name, buffer_size=2)
+    recorder.begin({'host': 'HOST', 'total_nodes': 1, 'ppn': 4, 'accurate_nodes': True,
+                    'placement_policy': 'FIRST_FIT'})
+    recorder.record(0.5, 4, 0, 1000, 4, 0, 0, 0.0, 0.0, 0, 0, -1, 'init', 'initial state of resources')
+    assert load(file_name)[1]['time'] == array('d')
+    recorder.record(1.25, 4, 0, 1000, 1, 3, 3, 100.0, 0.0, 0, 500, 1, 'allocate', 'allocation for task 1 using partial nodes')
+    # the buffer is full
+    metadata, usage = load(file_name)
+    assert metadata['total_nodes'] == 1
+    assert usage['alloc_cores'] == array('q', [0, 3])
+    assert usage['event'] == ['init', 'allocate']
+    recorder.record(2.0, 4, 0, 1000, 4, 0, 0, 0.0, 0.0, 0, 0, 1, 'release', 'released nodes for task 1')
+    recorder.close()
+    assert load(file_name)[1]['task_id'] == array('q', [-1, 1, 1])
+
+    out = io.StringIO()
+    write_text(file_name, out)
+    lines = out.getvalue().splitlines()
+    assert lines[0] == '# host: HOST'
+    assert lines[-2].split() == ['1.25000', '|', '1', '|', '3', '|', '75.00', '|', '3', '|', '75.00', '|', '100.00', '|',
+                                 '0.00', '|', '0.00', '|', '50.00', '#', 'allocation', 'for', 'task', '1', 'using', 'partial', 'nodes']
@@ -0,0 +1,561 @@
+import glob
+import json
+import signal
+import subprocess
+import time
+from ipsframework import Framework
+from ipsframework.resource_usage import load
+from ipsframework.services import TaskCompletionNotifier
+
+
+def write_config_and_platform_files(tmpdir, driver, cores_per_node=2, transport='queue', mpirun='eval'):
+    test_component = tmpdir.join("test_component.py")
+
+    with open(test_component, 'w') as f:
+        f.write(driver)
+
+    platform_file = tmpdir.join('platform.conf')
+
+    platform = f"""MPIRUN = {mpirun}
+NODE_DETECTION = manual
+CORES_PER_NODE = {cores_per_node}
+SOCKETS_PER_NODE = 1
+NODE_ALLOCATION_MODE = shared
+MESSAGE_TRANSPORT = {transport}
+HOST =
+SCRATCH =
+"""
+
+    with open(platform_file, 'w') as f:
+        f.write(platform)
+
+    config_file = tmpdir.join('ips.config')
+
+    config = f"""RUN_COMMENT = testing
+SIM_NAME = test
+LOG_FILE = {str(tmpdir)}/sim.log
+SIM_ROOT = {str(tmpdir)}
+SIMULATION_MODE = NORMAL
+[PORTS]
+    NAMES = DRIVER
+    [[DRIVER]]
+        IMPLEMENTATION = test_driver
+[test_driver]
+    CLASS = driver
+    SUB_CLASS =
+    NAME = test_driver
+    NPROC = 1
+    BIN_PATH =
+    INPUT_DIR =
+    INPUT_FILES =
+    OUTPUT_FILES =
+    SCRIPT = {test_component}
+"""
+
+    with open(config_file, 'w') as f:
+        f.write(config)
+
+    return platform_file, config_file
+
+
+def run_framework(tmpdir, driver, cores_per_node=2, transport='queue', mpirun='eval'):
+    platform_file, config_file = write_config_and_platform_files(tmpdir, driver, cores_per_node, transport, mpirun)
+
+    framework = Framework(config_file_list=[str(config_file)],
+                          log_file_name=str(tmpdir.join('test.log')),
+                          platform_file_name=str(platform_file),
+                          debug=None,
+                          verbose_debug=None,
+                          cmd_nodes=0,
+                          cmd_ppn=0)
+
+    return framework.run()
+
+
+def test_invoke_many(tmpdir):
+    driver = f"""#!/usr/bin/env python3
+import json
+from ipsframework.component import Component
+class test_driver(Component):
+    def step(self, timestamp=0.0):
+        results = self.services.invoke_many([('get_config_parameter', 'SIM_NAME'),
+                                             ('get_config_parameter', 'RUN_COMMENT'),
+                                             ('not_a_service',)],
+                                            return_exceptions=True)
+        with self.services.service_batch() as batch:
+            batch.invoke(self.services.fwk.component_id, 'get_config_parameter', 'SIM_NAME')
+        with open('{tmpdir}/results.json', 'w') as f:
+            json.dump({{'names': results[:2],
+                       'error': str(results[2]),
+                       'batch': batch.results}}, f)
+"""
+
+    assert run_framework(tmpdir, driver)
+
+    with open(tmpdir.join('results.json')) as f:
+        results = json.load(f)
+
+    assert results['names'] == ['test', 'testing']
+    assert results['error'] == 'Unsupported method : not_a_service'
+    assert results['batch'] == ['test']
+
+
+def test_wait_tasklist_batch(tmpdir):
+    driver = f"""#!/usr/bin/env python3
+import json
+from ipsframework.component import Component
+from ipsframework.messages import ServiceRequestBatchMessage
+class test_driver(Component):
+    def step(self, timestamp=0.0):
+        task_ids = [self.services.launch_task(1, '{tmpdir}', 'sleep', '0.1') for _ in range(4)]
+        # record the finish_task requests sent to the framework
+        sent = []
+        put = self.services.fwk_in_q.put
+        def recording_put(msg, *args, **keywords):
+            if isinstance(msg, ServiceRequestBatchMessage):
+                sent.append([r.target_method for r in msg.requests])
+            elif msg.target_method == 'finish_task':
+                sent.append('finish_task')
+            return put(msg, *args, **keywords)
+        self.services.fwk_in_q.put = recording_put
+        ret_dict = self.services.wait_tasklist(task_ids)
+        self.services.fwk_in_q.put = put
+        with open('{tmpdir}/results.json', 'w') as f:
+            json.dump({{'retvals': sorted(ret_dict.values()),
+                       'tasks_left': len(self.services.task_map),
+                       'sent': sent}}, f)
+"""
+
+    assert run_framework(tmpdir, driver, cores_per_node=4)
+
+    with open(tmpdir.join('results.json')) as f:
+        results = json.load(f)
+
+    assert results['retvals'] == [0, 0, 0, 0]
+    assert results['tasks_left'] == 0
+    # the tasks were finalized in batches, never one request at a time
+    assert all(isinstance(batch, list) for batch in results['sent'])
+    assert sum(batch.count('finish_task') for batch in results['sent']) == 4
+
+    _, usage = load(str(tmpdir.join('resource_usage.csv')))
+    # all allocations were released
+    assert usage['alloc_cores'][-1] == 0
+
+
+def test_wait_tasklist_finalize_failure(tmpdir):
+    driver = f"""#!/usr/bin/env python3
+import json
+import time
+from ipsframework.component import Component
+class test_driver(Component):
+    def step(self, timestamp=0.0):
+        task_ids = [self.services.launch_task(1, '{tmpdir}', 'sleep', '0.1') for _ in range(4)]
+        # let all the tasks finish so they are finalized in the same pass
+        time.sleep(1)
+        wait_task = self.services.wait_task
+        def failing_wait_task(task_id, *args, **keywords):
+            if task_id == task_ids[-1]:
+                raise RuntimeError('failed to finalize task')
+            return wait_task(task_id, *args, **keywords)
+        self.services.wait_task = failing_wait_task
+        try:
+            self.services.wait_tasklist(task_ids)
+        except RuntimeError as e:
+            error = str(e)
+        self.services.wait_task = wait_task
+        tasks_left = list(self.services.task_map)
+        # the cores of the tasks finalized before the failure were released,
+        # so 3 of the 4 cores are free
+        task_id = self.services.launch_task(3, '{tmpdir}', 'true', block=False)
+        self.services.wait_tasklist([task_id, task_ids[-1]])
+        with open('{tmpdir}/results.json', 'w') as f:
+            json.dump({{'error': error,
+                       'tasks_left': tasks_left == [task_ids[-1]]}}, f)
+"""
+
+    assert run_framework(tmpdir, driver, cores_per_node=4)
+
+    with open(tmpdir.join('results.json')) as f:
+        results = json.load(f)
+
+    assert results == {'error': 'failed to finalize task', 'tasks_left': True}
+
+    _, usage = load(str(tmpdir.join('resource_usage.csv')))
+    # all allocations were released
+    assert usage['alloc_cores'][-1] == 0
+
+
+def test_send_portal_event_one_way(tmpdir):
+    driver = f"""#!/usr/bin/env python3
+import json
+from ipsframework.component import Component
+class test_driver(Component):
+    def step(self, timestamp=0.0):
+        responses = []
+        class CountingCalls(dict):
+            def get(self, msg_id, default=None):
+                responses.append(msg_id)
+                return super().get(msg_id, default)
+        requests = []
+        invoke_service = self.services._invoke_service
+        def counting_invoke_service(*args, **keywords):
+            requests.append(args[1])
+            return invoke_service(*args, **keywords)
+        self.services.send_portal_event(event_comment='event 0')
+        self.services.incomplete_calls = CountingCalls(self.services.incomplete_calls)
+        self.services._invoke_service = counting_invoke_service
+        for i in range(1, 200):
+            self.services.send_portal_event(event_comment=f'event {{i}}')
+        self.services._invoke_service = invoke_service
+        pending_calls = len(self.services.incomplete_calls)
+        # the framework handles messages in order, so any response to the
+        # events would be received before the response to this request
+        self.services.get_port('DRIVER')
+        with open('{tmpdir}/results.json', 'w') as f:
+            json.dump({{'requests': requests,
+                       'pending_calls': pending_calls,
+                       'responses': len(responses)}}, f)
+"""
+
+    assert run_framework(tmpdir, driver)
+
+    with open(tmpdir.join('results.json')) as f:
+        results = json.load(f)
+
+    # no response was expected or received for the events
+    assert results == {'requests': [], 'pending_calls': 0, 'responses': 1}
+
+    json_files = glob.glob(str(tmpdir.join("simulation_log").join("*.json")))
+    assert len(json_files) == 1
+    with open(json_files[0], 'r') as json_file:
+        events = [json.loads(line) for line in json_file.readlines()]
+
+    comments = [e['comment'] for e in events if e['eventtype'] == 'COMPONENT_EVENT']
+    assert comments == [f'event {i}' for i in range(200)]
+
+
+def test_invoke_service_async(tmpdir):
+    driver = f"""#!/usr/bin/env python3
+import json
+from ipsframework.component import Component
+class test_driver(Component):
+    def step(self, timestamp=0.0):
+        futures = [self.services.invoke_service_async('get_config_parameter', 'SIM_NAME'),
+                   self.services.invoke_service_async('get_config_parameter', 'NOT_A_PARAMETER'),
+                   self.services.invoke_service_async('get_config_parameter', 'CORES_PER_NODE')]
+        results = [futures[0].result(), repr(futures[1].exception()), futures[2].result()]
+        # blocking requests are not affected by the outstanding ones
+        results.append(self.services.get_port('DRIVER') is not None)
+        with open('{tmpdir}/results.json', 'w') as f:
+            json.dump({{'results': results,
+                       'pending_calls': len(self.services.incomplete_calls)}}, f)
+"""
+
+    assert run_framework(tmpdir, driver)
+
+    with open(tmpdir.join('results.json')) as f:
+        results = json.load(f)
+
+    assert results == {'results': ['test', "KeyError('NOT_A_PARAMETER')", 2, True], 'pending_calls': 0}
+
+
+def test_pipe_transport(tmpdir):
+    driver = f"""#!/usr/bin/env python3
+import json
+from ipsframework.component import Component
+class test_driver(Component):
+    def step(self, timestamp=0.0):
+        task_id = self.services.launch_task(1, '{tmpdir}', 'true')
+        retval = self.services.wait_task(task_id)
+        futures = [self.services.invoke_service_async('get_config_parameter', 'SIM_NAME')
+                   for _ in range(100)]
+        results = self.services.invoke_many([('get_config_parameter', 'MESSAGE_TRANSPORT'),
+                                             ('not_a_service',)],
+                                            return_exceptions=True)
+        with open('{tmpdir}/results.json', 'w') as f:
+            json.dump({{'transport': type(self.services.fwk_in_q).__name__,
+                       'retval': retval,
+                       'sim_names': set(future.result() for future in futures) == {{'test'}},
+                       'results': [str(r) for r in results]}}, f)
+"""
+
+    assert run_framework(tmpdir, driver, transport='pipe')
+
+    with open(tmpdir.join('results.json')) as f:
+        results = json.load(f)
+
+    assert results == {'transport': 'PipeQueue',
+                       'retval': 0,
+                       'sim_names': True,
+                       'results': ['pipe', "Unsupported method : not_a_service"]}
+
+
+def test_get_framework_metrics(tmpdir):
+    driver = f"""#!/usr/bin/env python3
+import json
+from ipsframework.component import Component
+class test_driver(Component):
+    def step(self, timestamp=0.0):
+        task_id = self.services.launch_task(1, '{tmpdir}', 'true')
+        self.services.wait_task(task_id)
+        metrics = self.services.get_framework_metrics()
+        with open('{tmpdir}/results.json', 'w') as f:
+            json.dump(metrics, f)
+"""
+
+    assert run_framework(tmpdir, driver)
+
+    with open(tmpdir.join('results.json')) as f:
+        metrics = json.load(f)
+
+    assert metrics['services']['init_task']['count'] == 1
+    assert metrics['services']['finish_task']['count'] == 1
+    assert sorted(metrics['operations']) == ['ResourceManager.get_allocation', 'TaskManager.build_launch_cmd']
+    assert metrics['in_queue']['messages'] >= metrics['in_queue']['wakeups'] > 0
+
+    # the final metrics are written to SIM_ROOT
+    with open(tmpdir.join('framework_metrics.json')) as f:
+        final_metrics = json.load(f)
+
+    assert final_metrics['services']['get_framework_metrics']['count'] == 1
+    assert final_metrics['in_queue']['messages'] > metrics['in_queue']['messages']
+
+
+def test_task_completion_notifier():
+    for use_pidfd in (True, False):
+        previous = signal.getsignal(signal.SIGCHLD)
+        notifier = TaskCompletionNotifier()
+        if not use_pidfd and notifier.use_pidfd:
+            notifier.use_pidfd = False
+            notifier._install_sigchld_handler()
+        try:
+            process = subprocess.Popen(['sleep', '0.2'])
+            assert process.poll() is None
+            notifier.watch(1, process)
+            start = time.time()
+            notifier.wait(10)
+            # woken up when the process exited, not at the timeout
+            assert time.time() - start < 5
+            assert process.wait(1) == 0
+            notifier.forget(1)
+            assert notifier.pidfds == {}
+        finally:
+            signal.signal(signal.SIGCHLD, previous)
+
+
+def test_wait_any_task(tmpdir):
+    driver = f"""#!/usr/bin/env python3
+import json
+import time
+from ipsframework.component import Component
+class test_driver(Component):
+    def step(self, timestamp=0.0):
+        short_task = self.services.launch_task(1, '{tmpdir}', 'sleep', '0.2')
+        long_task = self.services.launch_task(1, '{tmpdir}', 'sleep', '60')
+        timeout_task = self.services.launch_task(1, '{tmpdir}', 'sleep', '60', timeout=1)
+        start = time.time()
+        first = self.services.wait_any_task([short_task, long_task])
+        first_time = time.time() - start
+        nothing = self.services.wait_any_task([long_task], timeout=0.1)
+        timed_out = self.services.wait_any_task([long_task, timeout_task])
+        self.services.kill_task(long_task)
+        with open('{tmpdir}/results.json', 'w') as f:
+            json.dump({{'first': first == {{short_task: 0}},
+                       'first_time': first_time < 5,
+                       'nothing': nothing,
+                       'timed_out': timed_out == {{timeout_task: -1}},
+                       'tasks_left': len(self.services.task_map)}}, f)
+"""
+
+    assert run_framework(tmpdir, driver, cores_per_node=3)
+
+    with open(tmpdir.join('results.json')) as f:
+        results = json.load(f)
+
+    assert results == {'first': True, 'first_time': True, 'nothing': {}, 'timed_out': True, 'tasks_left': 0}
+
+
+def test_iter_finished(tmpdir):
+    driver = f"""#!/usr/bin/env python3
+import json
+import time
+from ipsframework.component import Component
+class test_driver(Component):
+    def step(self, timestamp=0.0):
+        self.services.create_task_pool('pool')
+        self.services.add_task('pool', 'long', 1, '{tmpdir}', 'sleep', '2')
+        for i in range(4):
+            self.services.add_task('pool', f'short{{i}}', 1, '{tmpdir}', 'sleep', '0.1')
+        # only the first two tasks fit on the two cores
+        submitted = self.services.submit_tasks('pool', block=False)
+        start = time.time()
+        finished = []
+        for task_name, exit_status, timing in self.services.iter_finished('pool'):
+            finished.append([task_name, exit_status, time.time() - start < 1.5,
+                             timing['end_time'] - timing['start_time'] == timing['elapsed_time']])
+        with open('{tmpdir}/results.json', 'w') as f:
+            json.dump({{'submitted': submitted, 'finished': finished}}, f)
+"""
+
+    assert run_framework(tmpdir, driver)
+
+    with open(tmpdir.join('results.json')) as f:
+        results = json.load(f)
+
+    assert results['submitted'] == 2
+    # the short tasks ran one after the other next to the long one, and each
+    # was returned as soon as it finished
+    assert results['finished'] == [[f'short{i}', 0, True, True] for i in range(4)] + [['long', 0, False, True]]
+
+
+def test_task_pool_policy(tmpdir):
+    driver = f"""#!/usr/bin/env python3
+import json
+from ipsframework.component import Component
+class test_driver(Component):
+    def step(self, timestamp=0.0):
+        order = {{}}
+        for policy in ('fifo', 'largest_first', 'shortest_first'):
+            self.services.create_task_pool(policy, policy)
+            self.services.add_task(policy, 'small0', 1, '{tmpdir}', 'sleep', '0.1', estimated_runtime=2)
+            self.services.add_task(policy, 'small1', 1, '{tmpdir}', 'sleep', '0.1', estimated_runtime=2)
+            self.services.add_task(policy, 'large', 2, '{tmpdir}', 'sleep', '0.1', estimated_runtime=1)
+            order[policy] = [task_name for task_name, _, _ in self.services.iter_finished(policy)]
+        try:
+            self.services.create_task_pool('pool', 'random')
+        except ValueError as e:
+            error = str(e)
+        with open('{tmpdir}/results.json', 'w') as f:
+            json.dump({{'order': order, 'error': error}}, f)
+"""
+
+    assert run_framework(tmpdir, driver)
+
+    with open(tmpdir.join('results.json')) as f:
+        results = json.load(f)
+
+    assert sorted(results['order']['fifo'][:2]) == ['small0', 'small1']
+    assert results['order']['fifo'][2] == 'large'
+    assert results['order']['largest_first'][0] == 'large'
+    assert results['order']['shortest_first'][0] == 'large'
+    assert results['error'] == 'Unknown task pool scheduling policy random'
+
+    _, usage = load(str(tmpdir.join('resource_usage.csv')))
+    assert any('task pool largest_first of' in notes for notes in usage['notes'])
+
+
+def test_agent_launch(tmpdir):
+    driver = f"""#!/usr/bin/env python3
+import json
+from ipsframework.component import Component
+class test_driver(Component):
+    def step(self, timestamp=0.0):
+        task_id = self.services.launch_task(1, '{tmpdir}', 'echo', 'hello', logfile='{tmpdir}/echo.log')
+        process = type(self.services.task_map[task_id].process).__name__
+        retval = self.services.wait_task(task_id)
+        task_id = self.services.launch_task(1, '{tmpdir}', 'sleep', '60')
+        self.services.kill_task(task_id)
+        self.services.create_task_pool('pool')
+        for i in range(10):
+            self.services.add_task('pool', f'task{{i}}', 1, '{tmpdir}', 'test', i, '-lt', 5)
+        exit_status = {{task_name: status for task_name, status, _ in self.services.iter_finished('pool')}}
+        with open('{tmpdir}/results.json', 'w') as f:
+            json.dump({{'process': process,
+                       'retval': retval,
+                       'exit_status': exit_status}}, f)
+"""
+
+    assert run_framework(tmpdir, driver, mpirun='agent')
+
+    with open(tmpdir.join('results.json')) as f:
+        results = json.load(f)
+
+    assert results == {'process': 'AgentProcess',
+                       'retval': 0,
+                       'exit_status': {f'task{i}': int(i >= 5) for i in range(10)}}
+
+    with open(tmpdir.join('echo.log')) as f:
+        assert f.read() == 'hello\n'
+
+
+def test_task_pool_pack(tmpdir):
+    driver = f"""#!/usr/bin/env python3
+import json
+from ipsframework.component import Component
+class test_driver(Component):
+    def step(self, timestamp=0.0):
+        self.services.create_task_pool('pool', pack_size=4)
+        for i in range(6):
+            self.services.add_task('pool', f'task{{i}}', 1, '{tmpdir}', 'test', i, '-lt', 3)
+        self.services.add_task('pool', 'echo', 1, '{tmpdir}', 'echo', 'hello', logfile='{tmpdir}/echo.log')
+        self.services.add_task('pool', 'omp', 1, '{tmpdir}', 'true', omp=True)
+        task_pool = self.services.task_pools['pool']
+        task_pool._launch_queued_tasks()
+        launched = [[task.name for task in tasks] if isinstance(tasks, list) else [tasks.name]
+                    for tasks in task_pool.active_tasks.values()]
+        exit_status = {{}}
+        for task_name, status, timing in self.services.iter_finished('pool'):
+            exit_status[task_name] = status
+            assert timing['end_time'] >= timing['start_time']
+        with open('{tmpdir}/results.json', 'w') as f:
+            json.dump({{'launched': launched, 'exit_status': exit_status}}, f)
+"""
+
+    assert run_framework(tmpdir, driver, cores_per_node=8)
+
+    with open(tmpdir.join('results.json')) as f:
+        results = json.load(f)
+
+    assert sorted(results['launched']) == [['omp'], ['task0', 'task1', 'task2', 'task3'], ['task4', 'task5', 'echo']]
+    assert results['exit_status'] == dict({f'task{i}': int(i >= 3) for i in range(6)}, echo=0, omp=0)
+    assert not tmpdir.join('ips_task_pack_1.json').exists()
+
+    with open(tmpdir.join('echo.log')) as f:
+        assert f.read() == 'hello\n'
+
+
+def test_task_pool_executor(tmpdir):
+    driver = f"""#!/usr/bin/env python3
+import json
+from ipsframework.component import Component
+def square(x):
+    return int(x) ** 2
+class test_driver(Component):
+    def step(self, timestamp=0.0):
+        exit_status = {{}}
+        # the callables run in processes must be importable to be pickled
+        for executor, func in (('threads', square), ('processes', int)):
+            self.services.create_task_pool(executor)
+            for i in range(3):
+                self.services.add_task(executor, f'bin{{i}}', 1, '{tmpdir}', 'test', i, '-lt', 2)
+                self.services.add_task(executor, f'func{{i}}', 1, '{tmpdir}', func, i)
+            assert self.services.submit_tasks(executor, use_executor=executor) == 6
+            exit_status[executor] = self.services.get_finished_tasks(executor)
+        self.services.create_task_pool('pool')
+        self.services.add_task('pool', 'bin', 1, '{tmpdir}', 'true')
+        try:
+            self.services.submit_tasks('pool', use_executor='fibers')
+        except ValueError as e:
+            error = str(e)
+        with open('{tmpdir}/results.json', 'w') as f:
+            json.dump({{'exit_status': exit_status, 'error': error}}, f)
+"""
+
+    assert run_framework(tmpdir, driver)
+
+    with open(tmpdir.join('results.json')) as f:
+        results = json.load(f)
+
+    expected = {f'bin{i}': int(i >= 2) for i in range(3)}
+    assert results['exit_status'] == {'threads': dict(expected, **{f'func{i}': i * i for i in range(3)}),
+                                      'processes': dict(expected, **{f'func{i}': i for i in range(3)})}
+    assert results['error'] == 'Unknown task pool executor fibers'
+
+    json_files = glob.glob(str(tmpdir.join("simulation_log").join("*.json")))
+    assert len(json_files) == 1
+    with open(json_files[0]) as json_file:
+        events = [json.loads(line) for line in json_file]
+    comments = [e.get('comment') for e in events if e.get('eventtype') == 'IPS_LAUNCH_DASK_TASK']
+    assert len(comments) == 12
+    assert 'task_name = func2, Target = square(2)' in comments
+    assert len([e for e in events if e.get('eventtype') == 'IPS_TASK_END' and 'func' in e.get('comment')]) == 6
@@ -9,6 +9,7 @@ from ipsframework.ipsExceptions import (BadResourceRequestException,
                                         BlockedMessageException,
                                         InsufficientResourcesException,
                                         ResourceRequestUnequalPartitioningException)
+from ipsframework.resource_usage import load
 from ipsframework.taskManager import TaskInit
 
 
@@ -68,6 +69,28 @@ def test_build_launch_cmd_eval():
     assert cmd == ('executable 13 42', None)
 
 
+def test_build_launch_cmd_agent():
+
+    tm = TaskManager(mock.Mock())
+
+    tm.task_launch_cmd = 'agent'
+    tm.resource_mgr = mock.Mock(nodes=['node1', 'node2'])
+
+    cmd = tm.build_launch_cmd(nproc=1,
+                              binary='executable',
+                              cmd_args=('13', '42'),
+                              working_dir=None,
+                              ppn=None,
+                              max_ppn=None,
+                              nodes='node2,node1',
+                              accurateNodes=None,
+                              partial_nodes=None,
+                              task_id=None)
+
+    # run by the agent of the first node
+    assert cmd == ('agent node2 executable 13 42', None)
+
+
 @pytest.mark.skipif(not shutil.which('mpirun'), reason="missing mpirun")
 def test_build_launch_cmd_mpirun():
 
@@ -474,6 +497,42 @@ def test_build_launch_cmd_srun():
 
     assert cmd == ('srun -N 1 -n 1 -c 1 --threads-per-core=1 --cpu-bind=cores --gpus-per-task=4 executable 13 42', None)
 
+    # with the GPUs allocated by the resource manager
+
+    cmd = tm.build_launch_cmd(nproc=2,
+                              binary='executable',
+                              cmd_args=(),
+                              working_dir=None,
+                              ppn=1,
+                              max_ppn=None,
+                              nodes='n1,n2',
+                              accurateNodes=None,
+                              partial_nodes=False,
+                              task_id=None,
+                              cpp=1,
+                              gpp=2,
+                              omp=True,
+                              gpu_list=[('n1', [2, 3]), ('n2', [2, 3])])
+
+    assert cmd == ('srun -N 2 -n 2 -c 1 --threads-per-core=1 --cpu-bind=cores --gpus-per-task=2 executable ',
+                   {'OMP_PLACES': 'threads', 'OMP_PROC_BIND': 'spread', 'OMP_NUM_THREADS': '1',
+                    'CUDA_VISIBLE_DEVICES': '2,3', 'ROCR_VISIBLE_DEVICES': '2,3'})
+
+    cmd = tm.build_launch_cmd(nproc=2,
+                              binary='executable',
+                              cmd_args=(),
+                              working_dir=None,
+                              ppn=1,
+                              max_ppn=None,
+                              nodes='n1,n2',
+                              accurateNodes=None,
+                              partial_nodes=True,
+                              task_id=0,
+                              gpp=1,
+                              gpu_list=[('n1', [0]), ('n2', [1])])
+
+    assert cmd == ('srun -N 2 -n 2 executable ', None)
+
 
 def test_init_task_srun(tmpdir):
     # this will combine calls to ResourceManager.get_allocation and
@@ -837,3 +896,214 @@ def test_init_task_pool_srun(tmpdir):
            'task1': TaskInit(3, 'exe1', '/dir', 1, 0, 0, False, False, True, False, ('arg1',), None)}
     with pytest.raises(ResourceRequestMismatchException):
         init_final_task_pool(msg=msg)
+
+
+def test_blocked_requests_wait_conditions(tmpdir):
+    fwk = mock.Mock()
+    dm = mock.Mock()
+    cm = mock.Mock()
+    cm.fwk_sim_name = 'sim_name'
+    cm.sim_map = {'sim_name': mock.Mock(sim_root=str(tmpdir))}
+    cm.get_platform_parameter.return_value = 'HOST'
+
+    tm = TaskManager(fwk)
+    rm = ResourceManager(fwk)
+
+    tm.initialize(dm, rm, cm)
+    rm.initialize(dm, tm, cm,
+                  cmd_nodes=1,
+                  cmd_ppn=2)
+    tm.task_launch_cmd = 'eval'
+
+    task_id, _, _, _ = tm.init_task(ServiceRequestMessage('id', 'id', 'c', 'init_task',
+                                                          TaskInit(2, 'exe', '/dir', 0, 0,
+                                                                   0, True, True, False, False, [], None)))
+
+    # a blocked allocation reports the number of cores it waits for
+    with pytest.raises(BlockedMessageException) as e:
+        tm.init_task(ServiceRequestMessage('id', 'id', 'c', 'init_task',
+                                           TaskInit(1, 'exe', '/dir', 0, 0,
+                                                    0, True, True, False, False, [], None)))
+    assert e.value.nproc == 1
+    assert e.value.call_id is None
+
+    fwk.notify_resources_released.assert_not_called()
+    tm.finish_task(ServiceRequestMessage('id', 'id', 'c', 'finish_task', task_id, None))
+    fwk.notify_resources_released.assert_called_once_with()
+
+    # a blocked wait_call reports the call it waits for
+    tm.outstanding_calls['call1'] = ('id', None)
+    with pytest.raises(BlockedMessageException) as e:
+        tm.wait_call(ServiceRequestMessage('id', 'id', 'c', 'wait_call', 'call1', True))
+    assert e.value.call_id == 'call1'
+    assert e.value.nproc is None
+
+    fwk.notify_call_finished.assert_not_called()
+    tm.return_call(mock.Mock(call_id='call1'))
+    fwk.notify_call_finished.assert_called_once_with('call1')
+    assert 'call1' in tm.finished_calls
+
+
+def test_blocked_request_reservation(tmpdir):
+    fwk = mock.Mock()
+    dm = mock.Mock()
+    cm = mock.Mock()
+    cm.fwk_sim_name = 'sim_name'
+    cm.sim_map = {'sim_name': mock.Mock(sim_root=str(tmpdir))}
+    cm.get_platform_parameter.return_value = 'HOST'
+
+    tm = TaskManager(fwk)
+    rm = ResourceManager(fwk)
+
+    tm.initialize(dm, rm, cm)
+    rm.initialize(dm, tm, cm,
+                  cmd_nodes=2,
+                  cmd_ppn=2)
+    tm.task_launch_cmd = 'eval'
+
+    def init_task(nproc, block=False, runtime=None, msg=None):
+        msg = msg or ServiceRequestMessage('id', 'id', 'c', 'init_task',
+                                           TaskInit(nproc, 'exe', '/dir', 0, 0, 0, block, False, False, False, [], None,
+                                                    runtime=runtime))
+        return tm.init_task(msg)[0]
+
+    def finish_task(task_id):
+        tm.finish_task(ServiceRequestMessage('id', 'id', 'c', 'finish_task', task_id, None))
+
+    small0 = init_task(1, runtime=100)
+    small1 = init_task(1, runtime=100)
+    small2 = init_task(1)
+    big = ServiceRequestMessage('id', 'id', 'c', 'init_task',
+                                TaskInit(4, 'exe', '/dir', 0, 0, 0, True, False, False, False, [], None))
+    with pytest.raises(BlockedMessageException):
+        init_task(4, msg=big)
+    assert tm.reservation is None
+
+    # once the request has waited past the threshold, the freed nodes are
+    # reserved for it
+    tm.blocked_tasks[big.message_id] = (tm.blocked_tasks[big.message_id][0] - tm.reservation_threshold, 4, 0)
+    finish_task(small2)
+    assert tm.reservation == big.message_id
+    assert list(rm.reserved_nodes) == ['dummy_node1']
+    with pytest.raises(InsufficientResourcesException):
+        init_task(1)
+
+    finish_task(small0)
+    assert list(rm.reserved_nodes) == ['dummy_node1', 'dummy_node0']
+    assert rm.reserved_tasks() == {small1}
+    # only the tasks finishing before the reserved nodes are free are backfilled
+    with pytest.raises(InsufficientResourcesException):
+        init_task(1, runtime=1000)
+    backfilled = init_task(1, runtime=10)
+
+    finish_task(backfilled)
+    finish_task(small1)
+    init_task(4, msg=big)
+    assert tm.reservation is None
+    assert not rm.reserved_nodes
+    assert not tm.blocked_tasks
+
+
+def test_init_task_pool_policies(tmpdir):
+    fwk = mock.Mock()
+    dm = mock.Mock()
+    cm = mock.Mock()
+    cm.fwk_sim_name = 'sim_name'
+    cm.sim_map = {'sim_name': mock.Mock(sim_root=str(tmpdir))}
+    cm.get_platform_parameter.return_value = 'HOST'
+
+    tm = TaskManager(fwk)
+    rm = ResourceManager(fwk)
+
+    tm.initialize(dm, rm, cm)
+    rm.initialize(dm, tm, cm,
+                  cmd_nodes=1,
+                  cmd_ppn=6)
+    tm.task_launch_cmd = 'eval'
+
+    def task(nproc):
+        return TaskInit(nproc, 'exe', '/dir', 0, 0, 0, False, False, False, False, [], None)
+
+    def init_task_pool(tasks, *args):
+        return tm.init_task_pool(ServiceRequestMessage('id', 'id', 'c', 'init_task_pool', tasks, *args))
+
+    def finish(retval):
+        for task_id, _, _, _ in retval.values():
+            tm.finish_task(ServiceRequestMessage('id', 'id', 'c', 'finish_task', task_id, None))
+
+    tasks = {'a': task(1), 'b': task(1), 'c': task(6)}
+
+    # the default skips the tasks that do not fit
+    retval = init_task_pool(tasks)
+    assert sorted(retval) == ['a', 'b']
+    finish(retval)
+
+    retval = init_task_pool(tasks, 'largest_first', {})
+    assert sorted(retval) == ['c']
+    finish(retval)
+
+    tasks = {'a': task(2), 'b': task(2), 'c': task(2), 'd': task(2)}
+    retval = init_task_pool(tasks, 'shortest_first', {'a': 3, 'b': 1, 'c': 2})
+    assert sorted(retval) == ['a', 'b', 'c']
+    finish(retval)
+    retval = init_task_pool(tasks, 'shortest_first', {'a': 3, 'b': 1, 'd': 2})
+    assert sorted(retval) == ['a', 'b', 'd']
+    finish(retval)
+
+    # a running task estimated to end in 10 s leaves 4 cores free
+    running = init_task_pool({'r': task(2)}, 'backfill', {'r': 10}, 'pool')
+    tasks = {'head': task(6), 'short': task(2), 'long': task(2), 'unknown': task(2)}
+    hints = {'short': 5, 'long': 100}
+    retval = init_task_pool(tasks, 'fifo', hints, 'pool')
+    assert sorted(retval) == ['long', 'short']
+    finish(retval)
+    # the head task reserves all the cores in 10 s, only the task known to
+    # finish before then is backfilled
+    retval = init_task_pool(tasks, 'backfill', hints, 'pool')
+    assert sorted(retval) == ['short']
+    finish(retval)
+    finish(running)
+
+    rm.close_report()
+    _, usage = load(str(tmpdir.join('resource_usage.csv')))
+    assert 'task pool pool of id core utilization' in usage['notes'][-1]
+
+    with pytest.raises(ValueError):
+        init_task_pool(tasks, 'random')
+
+
+def test_init_task_pool_pack(tmpdir):
+    fwk = mock.Mock()
+    dm = mock.Mock()
+    cm = mock.Mock()
+    cm.fwk_sim_name = 'sim_name'
+    cm.sim_map = {'sim_name': mock.Mock(sim_root=str(tmpdir))}
+    cm.get_platform_parameter.return_value = 'HOST'
+
+    tm = TaskManager(fwk)
+    rm = ResourceManager(fwk)
+
+    tm.initialize(dm, rm, cm)
+    rm.initialize(dm, tm, cm,
+                  cmd_nodes=2,
+                  cmd_ppn=4)
+    tm.task_launch_cmd = 'srun'
+    tm.resource_mgr.ppn = 4
+
+    def task(nproc, omp=False):
+        return TaskInit(nproc, 'exe', '/dir', 0, 0, 0, False, omp, False, False, [], None)
+
+    tasks = {'a': task(1), 'b': task(1), 'c': task(2), 'd': task(1), 'e': task(1, omp=True), 'f': task(1), 'g': task(1)}
+    retval = tm.init_task_pool(ServiceRequestMessage('id', 'id', 'c', 'init_task_pool', tasks, 'fifo', {}, 'pool', 8))
+    assert sorted(retval) == ['a', 'b', 'c', 'd', 'e', 'f', 'g']
+
+    # the pack size is limited to the cores of a node
+    task_id, cmd, _, cores_allocated = retval['a']
+    assert [retval[task_name][0] for task_name in 'bdf'] == [task_id] * 3
+    assert retval['g'][0] not in (task_id, retval['c'][0], retval['e'][0])
+    assert cores_allocated == 4
+    assert cmd.startswith('srun -N 1 -n 1 ')
+    assert cmd.endswith(f'task_pack.py /dir/ips_task_pack_{task_id}.json')
+
+    for task_id in {task[0] for task in retval.values()}:
+        tm.finish_task(ServiceRequestMessage('id', 'id', 'c', 'finish_task', task_id, None))
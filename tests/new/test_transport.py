@@ -0,0 +1,81 @@
+import pickle
+import queue
+from multiprocessing import Process
+import pytest
+from ipsframework.componentRegistry import ComponentID
+from ipsframework.messages import ServiceRequestMessage, ServiceResponseMessage
+from ipsframework.transport import PipeQueue, new_queue
+from ipsframework.utils.transport_benchmark import benchmark
+
+
+def put_messages(q, count):
+    for i in range(count):
+        q.put(('message', i, 'x' * i))
+
+
+def test_pipe_queue():
+    q = PipeQueue()
+    assert q.empty()
+    with pytest.raises(queue.Empty):
+        q.get_nowait()
+    with pytest.raises(queue.Empty):
+        q.get(timeout=0.01)
+
+    # larger than the pipe buffer, so the producer waits for the reads
+    p = Process(target=put_messages, args=(q, 1000))
+    p.start()
+    assert [q.get(timeout=5) for _ in range(1000)] == [('message', i, 'x' * i) for i in range(1000)]
+    p.join()
+    assert p.exitcode == 0
+    assert q.empty()
+
+
+def test_new_queue():
+    assert isinstance(new_queue('pipe'), PipeQueue)
+    assert hasattr(new_queue(), 'get_nowait')
+    with pytest.raises(ValueError):
+        new_queue('shm')
+
+
+def test_component_id_pickle():
+    comp_id = ComponentID('test_driver', 'test_sim')
+    data = pickle.dumps(comp_id)
+    assert str(comp_id).encode() in data
+    assert b'class_name' not in data
+
+    # the id known by the process is reused
+    assert pickle.loads(data) is comp_id
+
+    # an unknown id is created without taking a sequence number
+    del ComponentID.all_ids[str(comp_id)]
+    seq_num = ComponentID.seq_num
+    new_id = pickle.loads(data)
+    assert new_id is not comp_id
+    assert new_id == comp_id
+    assert (new_id.get_sim_name(), new_id.get_class_name(), new_id.get_seq_num()) == ('test_sim', 'test_driver', comp_id.get_seq_num())
+    assert ComponentID.seq_num == seq_num
+    assert pickle.loads(data) is new_id
+
+
+def test_message_pickle():
+    sender = ComponentID('test_driver', 'test_sim')
+    fwk = ComponentID('Framework', 'FRAMEWORK')
+    msg = ServiceRequestMessage(sender, fwk, fwk, 'get_config_parameter', 'SIM_ROOT', block=True)
+    assert not hasattr(msg, '__dict__')
+
+    new_msg = pickle.loads(pickle.dumps(msg))
+    assert new_msg.sender_id is sender
+    assert new_msg.target_comp_id is fwk
+    assert (new_msg.message_id, new_msg.target_method, new_msg.args, new_msg.keywords) == \
+        (msg.message_id, 'get_config_parameter', ('SIM_ROOT',), {'block': True})
+
+    response = ServiceResponseMessage(fwk, sender, msg.message_id, ServiceResponseMessage.SUCCESS, '/tmp', 1)
+    new_response = pickle.loads(pickle.dumps(response))
+    assert repr(new_response) == repr(response)
+
+
+@pytest.mark.parametrize('transport', ['queue', 'pipe'])
+def test_benchmark(transport):
+    latency, rate = benchmark(transport, 100)
+    assert latency > 0
+    assert rate > 0